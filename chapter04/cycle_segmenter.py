@@ -0,0 +1,326 @@
+"""
+Cycle Segmenter — Chapter 4 add-on
+NOTE: Educational practice only — not a medical diagnosis.
+
+pcos_screen() needs avg_cycle_len_days and cycles_per_year, but users log
+daily notes, not cycle summaries. This module reads a continuous multi-month
+daily log in ONE pass, finds cycle boundaries, keeps per-user cycle-length
+distributions and feeds them straight into pcos_screen().
+
+Log lines (either form, users may be interleaved):
+  u00042<TAB>2025-03-01<TAB>Day 1: period heavy, cramps     (multi-user)
+  Day 14: BBT 36.70, OPK positive, CM eggwhite               (single user)
+
+A new cycle starts when
+  - the day counter resets (e.g. Day 33 -> Day 1), or
+  - a period marker appears after a non-bleeding day and at least
+    MIN_CYCLE_DAYS since the last start.
+Markers are whole words ("cd1" is not "cd14", "flow" is not "overflow") and
+a negated marker ("still no period", "no bleeding") does not count.
+Spotting alone does not start a cycle (pre-period spotting is common with
+PCOS); it is counted per user instead.
+"""
+
+import os
+import re
+import sys
+import time
+from array import array
+from datetime import date
+
+from pcos_screen_helper import pcos_screen
+
+PERIOD_MARKERS = ("period", "menses", "menstruation", "flow", "bleeding", "cd1")
+NEGATIONS = ("no", "not", "without", "never", "nor", "isn't", "hasn't", "didn't", "haven't")
+MIN_CYCLE_DAYS = 10
+DAYS_PER_YEAR = 365.25
+
+_day_re = re.compile(r"(?:\bday\s*|\bcd\s*|^d)(\d+)")
+_marker_re = re.compile(r"\b(?:" + "|".join(PERIOD_MARKERS) + r")\b")
+# a negation up to two words before the marker, within the same clause
+_negated_re = re.compile(r"\b(?:" + "|".join(re.escape(n) for n in NEGATIONS)
+                         + r")(?:\s+[\w']+){0,2}\s*$")
+_clause_re = re.compile(r"[,;.!?:]")
+
+
+def has_period_marker(lower):
+    """True if a lowercased note reports bleeding (whole-word, non-negated marker)."""
+    for m in _marker_re.finditer(lower):
+        before = _clause_re.split(lower[:m.start()])[-1]
+        if not _negated_re.search(before):
+            return True
+    return False
+
+
+class UserCycles:
+    """Compact per-user streaming state."""
+
+    __slots__ = ("last_abs", "last_day", "start_abs", "first_abs",
+                 "bleeding", "spotting_days", "lengths")
+
+    def __init__(self):
+        self.last_abs = None      # absolute day of the previous log line
+        self.last_day = None      # cycle-day counter of the previous line
+        self.start_abs = None     # absolute day the current cycle started
+        self.first_abs = None     # first logged absolute day
+        self.bleeding = False
+        self.spotting_days = 0
+        self.lengths = array("H")  # completed cycle lengths (days)
+
+    # --- streaming update ---
+
+    def add(self, note, when=None):
+        """Feed one daily note (`when` = date ordinal, if the log has dates)."""
+        lower = note.lower()
+        m = _day_re.search(lower)
+        day = int(m.group(1)) if m else None
+
+        # Work out an absolute day number for this line
+        if when is not None:
+            abs_day = when
+        elif self.last_abs is None:
+            abs_day = day or 1
+        elif day is not None and self.last_day is not None:
+            if day > self.last_day:
+                abs_day = self.last_abs + (day - self.last_day)
+            elif day == self.last_day:
+                abs_day = self.last_abs         # another note for the same day
+            else:
+                abs_day = self.last_abs + day   # counter reset: new cycle day N
+        else:
+            abs_day = self.last_abs + 1
+        if self.first_abs is None:
+            self.first_abs = abs_day
+
+        period = has_period_marker(lower)
+        reset = day is not None and self.last_day is not None and day < self.last_day
+        if "spotting" in lower and not period and abs_day != self.last_abs:
+            self.spotting_days += 1
+
+        if self.start_abs is None:
+            if reset or period or day == 1:
+                self.start_abs = abs_day - (day - 1 if day else 0)
+            elif day is not None:
+                # log starts mid-cycle: infer the start from the counter
+                self.start_abs = abs_day - (day - 1)
+        elif reset or (period and not self.bleeding
+                       and abs_day - self.start_abs >= MIN_CYCLE_DAYS):
+            start = abs_day - (day - 1 if reset and day else 0)
+            length = start - self.start_abs
+            if length > 0:
+                self.lengths.append(min(length, 65535))
+            self.start_abs = start
+
+        self.bleeding = period
+        self.last_abs = abs_day
+        if day is not None:
+            self.last_day = day
+
+    # --- summaries ---
+
+    def open_cycle_days(self):
+        if self.start_abs is None or self.last_abs is None:
+            return 0
+        return self.last_abs - self.start_abs + 1
+
+    def stats(self):
+        """Cycle-length distribution plus the two numbers pcos_screen needs."""
+        lengths = sorted(self.lengths)
+        n = len(lengths)
+        open_days = self.open_cycle_days()
+        span = (self.last_abs - self.first_abs + 1) if self.first_abs is not None else 0
+
+        if n:
+            mean = sum(lengths) / n
+            sd = (sum((x - mean) ** 2 for x in lengths) / n) ** 0.5
+            median = lengths[n // 2] if n % 2 else (lengths[n // 2 - 1] + lengths[n // 2]) / 2
+            avg_len = mean
+        else:
+            mean = sd = median = None
+            # no completed cycle: an already-long open cycle still tells us something
+            avg_len = open_days if open_days > 35 else 0.0
+        if open_days > 35 and n and open_days > avg_len:
+            avg_len = (sum(lengths) + open_days) / (n + 1)
+
+        if span >= 60 and n:
+            cycles_per_year = round(n * DAYS_PER_YEAR / span)
+        elif span and avg_len:
+            # too little history for a rate: count the open cycle as one more
+            # (an upper bound), so a long open cycle still reaches the rule
+            cycles_per_year = max(1, round((n + 1) * DAYS_PER_YEAR / span))
+        else:
+            cycles_per_year = 0
+        return {
+            "cycles": n,
+            "mean": round(mean, 1) if mean is not None else None,
+            "median": median,
+            "sd": round(sd, 1) if sd is not None else None,
+            "min": lengths[0] if n else None,
+            "max": lengths[-1] if n else None,
+            "open_cycle_days": open_days,
+            "spotting_days": self.spotting_days,
+            "days_logged_span": span,
+            "avg_cycle_len_days": round(avg_len, 1),
+            "cycles_per_year": cycles_per_year,
+        }
+
+
+# --- Single-pass driver ---
+
+def parse_log_line(line):
+    """Return (user_id, date ordinal or None, note) for one log line."""
+    parts = line.rstrip("\n").split("\t")
+    if len(parts) >= 3:
+        user, when, note = parts[0], parts[1].strip(), parts[2]
+        return user, (date.fromisoformat(when).toordinal() if when else None), note
+    return "me", None, line.strip()
+
+
+def segment_log(lines):
+    """Stream log lines once and return {user_id: UserCycles}."""
+    users = {}
+    get = users.get
+    for line in lines:
+        if not line.strip():
+            continue
+        user, when, note = parse_log_line(line)
+        state = get(user)
+        if state is None:
+            state = users[user] = UserCycles()
+        state.add(note, when)
+    return users
+
+
+def screen_users(users, signs=None):
+    """
+    Run pcos_screen() for every user from their segmented cycles.
+    `signs` optionally maps user_id -> extra pcos_screen kwargs
+    (hirsutism, acne, amh_high, weight_kg, ...).
+    """
+    signs = signs or {}
+    results = {}
+    for user, state in users.items():
+        st = state.stats()
+        results[user] = pcos_screen(
+            avg_cycle_len_days=st["avg_cycle_len_days"],
+            cycles_per_year=st["cycles_per_year"],
+            **signs.get(user, {})
+        )
+        results[user]["cycle_stats"] = st
+    return results
+
+
+# --- Synthetic logs / benchmark ---
+
+def write_synthetic_log(path, n_users=1000, days=365, seed=5):
+    """Write a year of interleaved daily logs for n_users (tab-separated)."""
+    import random
+    rng = random.Random(seed)
+    start = date(2025, 1, 1).toordinal()
+    plans = []
+    for u in range(n_users):
+        irregular = rng.random() < 0.3
+        plans.append((f"u{u:06d}", irregular, [1]))
+    with open(path, "w", encoding="utf-8") as fh:
+        for d in range(days):
+            iso = date.fromordinal(start + d).isoformat()
+            for user, irregular, cd in plans:
+                day = cd[0]
+                note = f"Day {day}: BBT 36.{rng.randint(30, 80):02d}"
+                if day <= 4:
+                    note += ", period"
+                fh.write(f"{user}\t{iso}\t{note}\n")
+                cycle_len = rng.randint(38, 60) if irregular else rng.randint(26, 31)
+                cd[0] = 1 if day >= cycle_len else day + 1
+
+
+def check_markers():
+    """Marker matching and segmentation on notes that used to be misread."""
+    for note in ("day 1: period heavy", "cd1 cramps", "flow light", "no cramps, period started",
+                 "bleeding since morning", "menses"):
+        assert has_period_marker(note), note
+    for note in ("day 35: still no period", "no bleeding", "cd14 opk negative", "cd10",
+                 "inbox overflow", "not on my period yet", "without flow",
+                 "periodic headache"):
+        assert not has_period_marker(note), note
+
+    # a 50-day cycle with "still no period" on day 35 stays one 50-day cycle
+    user = UserCycles()
+    for d in range(1, 51):
+        user.add(f"Day {d}: " + ("period" if d <= 3 else "still no period" if d == 35 else "bbt 36.5"))
+    user.add("Day 1: period")
+    assert list(user.lengths) == [50], list(user.lengths)
+
+    # "no bleeding" notes and cd1x counters never start a cycle
+    user = UserCycles()
+    start = date(2025, 1, 1).toordinal()
+    for d in range(60):
+        cd = d % 30 + 1
+        note = f"CD{cd}: " + ("period" if cd <= 2 else "no bleeding" if cd % 7 == 0 else "bbt")
+        user.add(note, start + d)
+    assert list(user.lengths) == [30], list(user.lengths)
+
+    # two notes for the same cycle day stay on that day: a 28-day cycle, not 42
+    user = UserCycles()
+    for d in range(1, 29):
+        user.add(f"Day {d}: " + ("period" if d <= 3 else "bbt 36.5"))
+        if d == 14:
+            user.add("Day 14: opk positive")
+    user.add("Day 1: period")
+    assert list(user.lengths) == [28], list(user.lengths)
+
+    # 90 days without a period is irregular even with no completed cycle
+    user = UserCycles()
+    for d in range(1, 91):
+        user.add(f"Day {d}: " + ("period" if d == 1 else "bbt 36.5"))
+    st = user.stats()
+    assert st["avg_cycle_len_days"] == 90 and st["cycles_per_year"] > 0, st
+    assert screen_users({"me": user})["me"]["cycle_irregularity"]
+    return True
+
+
+def benchmark(n_users=10000, days=365):
+    import tempfile
+    check_markers()
+    print("✅ period markers: whole words, negations ignored; repeated days; open-cycle amenorrhea")
+    path = os.path.join(tempfile.gettempdir(), "cycle_segmenter_bench.tsv")
+    write_synthetic_log(path, n_users, days)
+    start = time.perf_counter()
+    with open(path, encoding="utf-8") as fh:
+        users = segment_log(fh)
+    results = screen_users(users)
+    elapsed = time.perf_counter() - start
+    lines = n_users * days
+    flagged = sum(1 for r in results.values() if r["cycle_irregularity"])
+    print(f"{lines:,} log lines for {n_users:,} users in {elapsed:.1f}s "
+          f"({lines / elapsed:,.0f} lines/sec); irregular: {flagged:,}")
+    os.remove(path)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter daily log file name: ").strip()
+    if not fname:
+        fname = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "chapter08", "cycle_notes.txt")
+    with open(fname, encoding="utf-8") as fh:
+        users = segment_log(fh)
+
+    print("=== Cycle Segmentation → PCOS Screening ===")
+    for user, result in screen_users(users).items():
+        st = result["cycle_stats"]
+        print(f"\nUser {user}: {st['cycles']} complete cycles, "
+              f"open cycle {st['open_cycle_days']} days")
+        print(f"  lengths mean/median/sd: {st['mean']} / {st['median']} / {st['sd']}")
+        print(f"  avg_cycle_len_days={st['avg_cycle_len_days']} cycles_per_year={st['cycles_per_year']}")
+        print(f"  cycle_irregularity: {result['cycle_irregularity']}")
+        print(f"  meets_2_of_3_screen: {result['meets_2_of_3_screen']}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
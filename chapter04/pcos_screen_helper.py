@@ -1,9 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter05"))
+import screening_rules   # noqa: E402  (Chapter 5: the one copy of the thresholds)
+
 def cycle_irregularity(avg_cycle_len_days: float, cycles_per_year: int) -> bool:
     """Return True if cycles look oligo/irregular by simple rules."""
-    if avg_cycle_len_days <= 0 or cycles_per_year <= 0:
-        return False
-    # Simple flags: long cycles, very short cycles, or <8 cycles/year
-    return (avg_cycle_len_days > 35) or (avg_cycle_len_days < 21) or (cycles_per_year < 8)
+    # Long cycles, very short cycles, or too few cycles/year — thresholds live in screening_rules
+    return screening_rules.cycle_irregularity(avg_cycle_len_days, cycles_per_year)
 
 def hyperandrogenism_flags(hirsutism: bool, acne: bool, hair_thinning: bool) -> bool:
     """Return True if there’s any clinical hyperandrogenism sign."""
@@ -91,4 +95,6 @@ def demo():
         print(f"{k}: {v}")
 
 if __name__ == "__main__":
-    demo()
\ No newline at end of file
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(demo)
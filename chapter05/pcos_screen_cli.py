@@ -4,12 +4,13 @@ NOTE: Educational practice only — not a medical diagnosis.
 This script lets you run multiple screenings in one session using loops.
 """
 
+import screening_rules
+
 # --- Reuse the core logic from Chapter 4 (kept inline for simplicity) ---
 
 def cycle_irregularity(avg_cycle_len_days: float, cycles_per_year: int) -> bool:
-    if avg_cycle_len_days <= 0 or cycles_per_year <= 0:
-        return False
-    return (avg_cycle_len_days > 35) or (avg_cycle_len_days < 21) or (cycles_per_year < 8)
+    # thresholds (21 / 35 days, 8 cycles a year) come from the rule data
+    return screening_rules.cycle_irregularity(avg_cycle_len_days, cycles_per_year)
 
 def hyperandrogenism_flags(hirsutism: bool, acne: bool, hair_thinning: bool) -> bool:
     return bool(hirsutism or acne or hair_thinning)
@@ -163,4 +164,9 @@ def main():
             break
 
 if __name__ == "__main__":
-    main()
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,384 @@
+"""
+Compiled Screening Rules — Chapter 5 add-on
+-------------------------------------------
+NOTE: Educational practice only — not a medical diagnosis.
+
+The Rotterdam logic in pcos_screen() is a chain of hard-coded branches. Here
+each criteria set is plain data (JSON-compatible), so NIH, AE-PCOS or a
+local variant is a new dict rather than new code:
+
+    {"name": "nih_1990",
+     "criteria": {"ovulatory_dysfunction": <expr>, "hyperandrogenism": <expr>},
+     "meets": {"all": [{"ref": "ovulatory_dysfunction"}, {"ref": "hyperandrogenism"}]}}
+
+Expressions:
+    "hirsutism"                       truthy record field
+    ["total_testosterone", ">", 60]   comparison (False when the field is missing)
+    {"any": [...]}  {"all": [...]}  {"not": expr}
+    {"at_least": 2, "of": [...]}      Rotterdam-style k-of-n
+    {"ref": "criterion"}              an earlier criterion of the same set
+
+compile_rule_sets() turns any number of sets into one generated Python
+function (cached by a hash of the rule data). Identical criteria shared by
+several sets are computed once per record, and screen()/prevalence() run
+every set in a single pass over the cohort.
+"""
+
+import hashlib
+import json
+import operator
+import os
+import sys
+import time
+
+# --- Thresholds (educational) ---
+
+CYCLE_SHORT_DAYS = 21
+CYCLE_LONG_DAYS = 35
+MIN_CYCLES_PER_YEAR = 8
+AMH_HIGH_NG_ML = 4.7
+TESTOSTERONE_HIGH_NG_DL = 60.0
+FAI_HIGH = 5.0                   # free androgen index, %
+FOLLICLES_PER_OVARY = 20
+OVARIAN_VOLUME_ML = 10.0
+
+# --- Built-in criteria sets ---
+
+OVULATORY_DYSFUNCTION = {"all": [
+    ["avg_cycle_len_days", ">", 0], ["cycles_per_year", ">", 0],
+    {"any": [["avg_cycle_len_days", ">", CYCLE_LONG_DAYS],
+             ["avg_cycle_len_days", "<", CYCLE_SHORT_DAYS],
+             ["cycles_per_year", "<", MIN_CYCLES_PER_YEAR]]}]}
+BIOCHEMICAL_HYPERANDROGENISM = {"any": [
+    ["total_testosterone", ">", TESTOSTERONE_HIGH_NG_DL], ["fai", ">", FAI_HIGH]]}
+CLINICAL_OR_BIOCHEMICAL = {"any": [
+    "hirsutism", "acne", "hair_thinning", BIOCHEMICAL_HYPERANDROGENISM]}
+PCO_MORPHOLOGY = {"any": [
+    "known_pc_ovaries", "amh_high", ["amh", ">=", AMH_HIGH_NG_ML],
+    ["follicle_count", ">=", FOLLICLES_PER_OVARY], ["ovarian_volume", ">=", OVARIAN_VOLUME_ML]]}
+
+ROTTERDAM = {
+    "name": "rotterdam_2003",
+    "criteria": {"ovulatory_dysfunction": OVULATORY_DYSFUNCTION,
+                 "hyperandrogenism": CLINICAL_OR_BIOCHEMICAL,
+                 "pco_morphology": PCO_MORPHOLOGY},
+    "meets": {"at_least": 2, "of": [{"ref": "ovulatory_dysfunction"}, {"ref": "hyperandrogenism"},
+                                    {"ref": "pco_morphology"}]},
+}
+NIH = {
+    "name": "nih_1990",
+    "criteria": {"ovulatory_dysfunction": OVULATORY_DYSFUNCTION,
+                 "hyperandrogenism": CLINICAL_OR_BIOCHEMICAL},
+    "meets": {"all": [{"ref": "ovulatory_dysfunction"}, {"ref": "hyperandrogenism"}]},
+}
+AE_PCOS = {
+    "name": "ae_pcos_2006",
+    "criteria": {"hyperandrogenism": {"any": ["hirsutism", BIOCHEMICAL_HYPERANDROGENISM]},
+                 "ovarian_dysfunction": {"any": [OVULATORY_DYSFUNCTION, PCO_MORPHOLOGY]}},
+    "meets": {"all": [{"ref": "hyperandrogenism"}, {"ref": "ovarian_dysfunction"}]},
+}
+BUILTIN_RULE_SETS = [ROTTERDAM, NIH, AE_PCOS]
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+        "==": operator.eq, "!=": operator.ne}
+
+
+def rule_set_hash(rule_sets):
+    """Stable hash of the rule data (criteria order is part of the output layout)."""
+    blob = json.dumps(rule_sets, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- Reference interpreter (the spec the compiler must match) ---
+
+def evaluate_expr(expr, record, scope):
+    if isinstance(expr, str):
+        return bool(record.get(expr))
+    if isinstance(expr, list):
+        field, op, value = expr
+        x = record.get(field)
+        return x is not None and _OPS[op](x, value)
+    if "ref" in expr:
+        return scope[expr["ref"]]
+    if "not" in expr:
+        return not evaluate_expr(expr["not"], record, scope)
+    if "any" in expr:
+        return any(evaluate_expr(e, record, scope) for e in expr["any"])
+    if "all" in expr:
+        return all(evaluate_expr(e, record, scope) for e in expr["all"])
+    return sum(evaluate_expr(e, record, scope) for e in expr["of"]) >= expr["at_least"]
+
+
+def interpret(rule_set, record):
+    """{criterion: bool, ..., "meets": bool} by walking the rule data."""
+    scope = {}
+    for name, expr in rule_set["criteria"].items():
+        scope[name] = evaluate_expr(expr, record, scope)
+    scope["meets"] = evaluate_expr(rule_set["meets"], record, scope)
+    return scope
+
+
+# --- Compiler ---
+
+class _Codegen:
+    """Emits one straight-line block: field loads, then one local per distinct criterion."""
+
+    def __init__(self):
+        self.fields = {}            # record field -> local name
+        self.exprs = {}             # expression source -> local name
+        self.locals = set()
+        self.lines = []
+
+    def field(self, name):
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"bad field name: {name!r}")
+        local = self.fields.get(name)
+        if local is None:
+            local = self.fields[name] = f"f{len(self.fields)}"
+        return local
+
+    def intern(self, src):
+        if src in self.locals:
+            return src
+        local = self.exprs.get(src)
+        if local is None:
+            local = self.exprs[src] = f"c{len(self.exprs)}"
+            self.locals.add(local)
+            self.lines.append(f"{local} = {src}")
+        return local
+
+    def expr(self, e, scope):
+        src = self._expr(e, scope)
+        return self.exprs.get(src, src)     # reuse a criterion already computed above
+
+    def _expr(self, e, scope):
+        if isinstance(e, str):
+            return f"bool({self.field(e)})"
+        if isinstance(e, list):
+            if len(e) != 3 or e[1] not in _OPS:
+                raise ValueError(f"bad comparison: {e!r}")
+            field, op, value = e
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"comparison needs a number: {e!r}")
+            f = self.field(field)
+            return f"({f} is not None and {f} {op} {value!r})"
+        if not isinstance(e, dict) or len(e) not in (1, 2):
+            raise ValueError(f"bad expression: {e!r}")
+        if "ref" in e:
+            if e["ref"] not in scope:
+                raise ValueError(f"unknown criterion: {e['ref']!r}")
+            return scope[e["ref"]]
+        if "not" in e:
+            return f"(not {self.expr(e['not'], scope)})"
+        if "any" in e or "all" in e:
+            key, joiner = ("any", " or ") if "any" in e else ("all", " and ")
+            if not e[key]:
+                raise ValueError(f"empty {key!r}")
+            return "(" + joiner.join(self.expr(x, scope) for x in e[key]) + ")"
+        if "at_least" in e and "of" in e:
+            return ("(" + " + ".join(self.expr(x, scope) for x in e["of"])
+                    + f" >= {int(e['at_least'])})")
+        raise ValueError(f"bad expression: {e!r}")
+
+
+class CompiledRules:
+    """Several criteria sets compiled into one function over records (dicts)."""
+
+    def __init__(self, rule_sets):
+        self.key = rule_set_hash(rule_sets)
+        self.names = []
+        self.outputs = []           # (set name, criterion or "meets") per result slot
+        gen = _Codegen()
+        returned, meets = [], []
+        for rs in rule_sets:
+            name = rs["name"]
+            if name in self.names:
+                raise ValueError(f"duplicate rule set: {name!r}")
+            self.names.append(name)
+            scope = {}
+            for crit, expr in rs["criteria"].items():
+                scope[crit] = gen.intern(gen.expr(expr, scope))
+                self.outputs.append((name, crit))
+                returned.append(scope[crit])
+            local = gen.intern(gen.expr(rs["meets"], scope))
+            self.outputs.append((name, "meets"))
+            returned.append(local)
+            meets.append(local)
+
+        loads = [f"{local} = get({field!r})" for field, local in gen.fields.items()]
+        body = ["get = r.get"] + loads + gen.lines
+        result = "(" + ", ".join(returned) + ",)"
+        counters = [f"n{i}" for i in range(len(meets))]
+        src = ["def _one(r):"]
+        src += ["    " + line for line in body]
+        src += [f"    return {result}", "",
+                "def _many(records):",
+                "    out = []",
+                "    append = out.append",
+                "    for r in records:"]
+        src += ["        " + line for line in body]
+        src += [f"        append({result})", "    return out", "",
+                "def _count(records):",
+                f"    {' = '.join(counters)} = 0",
+                "    for r in records:"]
+        src += ["        " + line for line in body]
+        src += [f"        {n} += {m}" for n, m in zip(counters, meets)]
+        src += [f"    return ({', '.join(counters)},)"]
+        self.source = "\n".join(src) + "\n"
+        namespace = {}
+        exec(compile(self.source, f"<rules {self.key[:12]}>", "exec"), namespace)
+        self._one, self._many, self._count = namespace["_one"], namespace["_many"], namespace["_count"]
+        self.shared = len(self.outputs) - len(gen.exprs)    # slots answered by an earlier local
+
+    def evaluate(self, record):
+        """{set name: {criterion: bool, ..., "meets": bool}} for one record."""
+        out = {name: {} for name in self.names}
+        for (name, crit), value in zip(self.outputs, self._one(record)):
+            out[name][crit] = value
+        return out
+
+    def screen(self, records):
+        """One pass: a result tuple (laid out as self.outputs) per record."""
+        return self._many(records)
+
+    def prevalence(self, records):
+        """One pass: {set name: number of records meeting it}."""
+        return dict(zip(self.names, self._count(records)))
+
+
+_cache = {}
+
+
+def compile_rule_sets(rule_sets=None):
+    """Compile (or fetch from the cache) the given criteria sets; default: all built-ins."""
+    rule_sets = BUILTIN_RULE_SETS if rule_sets is None else rule_sets
+    key = rule_set_hash(rule_sets)
+    compiled = _cache.get(key)
+    if compiled is None:
+        compiled = _cache[key] = CompiledRules(rule_sets)
+    return compiled
+
+
+# --- Entry point for the Chapter 4/5 helpers ---
+
+CYCLE_RULES = {"name": "cycle",
+               "criteria": {"ovulatory_dysfunction": OVULATORY_DYSFUNCTION},
+               "meets": {"ref": "ovulatory_dysfunction"}}
+_cycle_check = None
+
+
+def cycle_irregularity(avg_cycle_len_days, cycles_per_year):
+    """OVULATORY_DYSFUNCTION for one patient; pcos_screen_helper / pcos_screen_cli delegate here."""
+    global _cycle_check
+    if _cycle_check is None:
+        _cycle_check = compile_rule_sets([CYCLE_RULES])._one
+    return _cycle_check({"avg_cycle_len_days": avg_cycle_len_days, "cycles_per_year": cycles_per_year})[0]
+
+
+def load_rule_sets(path):
+    """Criteria sets from a JSON file (a list of rule-set objects)."""
+    with open(path, encoding="utf-8") as fh:
+        rule_sets = json.load(fh)
+    if isinstance(rule_sets, dict):
+        rule_sets = [rule_sets]
+    return rule_sets
+
+
+# --- Checks & benchmark ---
+
+def synthetic_cohort(n, seed=5):
+    """pcos_screen()-style records plus optional lab values (None when not measured)."""
+    import random
+    rng = random.Random(seed)
+    cohort = []
+    for _ in range(n):
+        long_cycles = rng.random() < 0.3
+        avg = rng.uniform(36, 70) if long_cycles else rng.uniform(22, 34)
+        cohort.append({
+            "avg_cycle_len_days": round(avg, 1),
+            "cycles_per_year": int(365 / avg) if rng.random() < 0.95 else 0,
+            "hirsutism": rng.random() < 0.15, "acne": rng.random() < 0.25,
+            "hair_thinning": rng.random() < 0.08, "known_pc_ovaries": rng.random() < 0.1,
+            "amh_high": False,
+            "amh": round(rng.lognormvariate(1.0, 0.6), 2) if rng.random() < 0.5 else None,
+            "total_testosterone": round(rng.gauss(45, 18), 1) if rng.random() < 0.6 else None,
+            "fai": round(rng.lognormvariate(1.0, 0.7), 2) if rng.random() < 0.3 else None,
+            "follicle_count": rng.randint(4, 30) if rng.random() < 0.2 else None,
+            "ovarian_volume": None,
+        })
+    return cohort
+
+
+def check_equivalence(n=20000):
+    """Compiled output == interpreter for every set; Rotterdam == pcos_screen() on its inputs."""
+    from pcos_screen_cli import pcos_screen
+    cohort = synthetic_cohort(n, seed=11)
+    compiled = compile_rule_sets()
+    by_name = {rs["name"]: rs for rs in BUILTIN_RULE_SETS}
+    for rec, row in zip(cohort, compiled.screen(cohort)):
+        expected = [interpret(by_name[name], rec)[crit] for name, crit in compiled.outputs]
+        assert list(row) == expected, (rec, row, expected)
+
+        basic = {k: rec[k] for k in ("avg_cycle_len_days", "cycles_per_year", "hirsutism", "acne",
+                                     "hair_thinning", "known_pc_ovaries", "amh_high")}
+        legacy = pcos_screen(**basic)
+        ours = compiled.evaluate(basic)["rotterdam_2003"]
+        assert ours["meets"] == legacy["meets_2_of_3_screen"], basic
+        assert ours["ovulatory_dysfunction"] == legacy["cycle_irregularity"], basic
+    assert compile_rule_sets() is compiled
+    return True
+
+
+def benchmark(n=200000):
+    cohort = synthetic_cohort(n)
+    start = time.perf_counter()
+    _cache.clear()
+    compiled = compile_rule_sets()
+    t_compile = time.perf_counter() - start
+    start = time.perf_counter()
+    compile_rule_sets()
+    t_cached = time.perf_counter() - start
+    print(f"{len(BUILTIN_RULE_SETS)} criteria sets → {len(compiled.outputs)} outputs, "
+          f"{compiled.shared} shared with an earlier set; compile {t_compile * 1000:.2f} ms, "
+          f"cached lookup {t_cached * 1e6:.0f} µs")
+
+    start = time.perf_counter()
+    interpreted = {rs["name"]: sum(interpret(rs, rec)["meets"] for rec in cohort)
+                   for rs in BUILTIN_RULE_SETS}
+    t_interp = time.perf_counter() - start
+    start = time.perf_counter()
+    counts = compiled.prevalence(cohort)
+    t_count = time.perf_counter() - start
+    start = time.perf_counter()
+    compiled.screen(cohort)
+    t_screen = time.perf_counter() - start
+    assert counts == interpreted
+    print(f"{n:,} records:")
+    print(f"  interpreter, one pass per set : {t_interp:6.2f}s")
+    print(f"  compiled prevalence, one pass : {t_count:6.2f}s ({t_interp / t_count:.0f}x)")
+    print(f"  compiled full screen, one pass: {t_screen:6.2f}s")
+    print("  meets: " + ", ".join(f"{name} {c / n:.1%}" for name, c in counts.items()))
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    print("Compiled Screening Rules — Chapter 5\n(educational practice only)\n")
+    path = input("Rule set JSON file (Enter for Rotterdam / NIH / AE-PCOS): ").strip()
+    rule_sets = load_rule_sets(path) if path else None
+    compiled = compile_rule_sets(rule_sets)
+    print(f"🔑 rule-set hash {compiled.key[:16]} — {len(compiled.outputs)} outputs")
+    if rule_sets is None:
+        check_equivalence()
+        print("✅ compiled rules match the interpreter and pcos_screen()")
+    cohort = synthetic_cohort(10000)
+    for name, count in compiled.prevalence(cohort).items():
+        print(f"  • {name}: {count} of {len(cohort)} synthetic records meet the criteria")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
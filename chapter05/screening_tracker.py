@@ -0,0 +1,302 @@
+"""
+Longitudinal PCOS Screening Tracker — Chapter 5 add-on
+NOTE: Educational practice only — not a medical diagnosis.
+
+pcos_screen() is one-shot: every new cycle or lab value means rescreening a
+patient from scratch. This tracker keeps a small per-patient state (running
+cycle statistics plus the latest sign / lab / anthropometric flags), updates
+it in O(1) per event using the Chapter 5 helpers, and emits a change event
+only when a flag actually flips.
+
+Events:
+  cycle_start(pid, day)            day = date ordinal of cycle day 1
+  sign(pid, name, present)         hirsutism / acne / hair_thinning / known_pc_ovaries
+  lab(pid, name, value)            amh (ng/mL) / total_testosterone (ng/dL)
+  measure(pid, weight_kg, height_m)
+  tick(today)                      re-evaluate everyone as of `today` (daily job)
+
+The unfinished cycle since the last start counts, the way the Chapter 4
+cycle segmenter treats its open cycle: a long gap raises the average, and
+AMENORRHEA_DAYS without a period flags irregularity with no new event.
+"""
+
+import os
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+from pcos_screen_cli import (
+    bmi_category_from_value, bmi_value, cycle_irregularity,
+    hyperandrogenism_flags, ovarian_appearance, rotterdam_criteria
+)
+from screening_rules import AMH_HIGH_NG_ML, CYCLE_LONG_DAYS, TESTOSTERONE_HIGH_NG_DL
+
+WINDOW_DAYS = 365          # cycles are summarized over the trailing year
+MIN_SPAN_DAYS = 60         # need this much history before annualizing
+AMENORRHEA_DAYS = 120      # this long since the last period is irregular on its own
+
+# sign bits
+HIRSUTISM, ACNE, HAIR_THINNING, KNOWN_PCO, AMH_HIGH, HIGH_T = (1 << i for i in range(6))
+SIGN_BITS = {"hirsutism": HIRSUTISM, "acne": ACNE, "hair_thinning": HAIR_THINNING,
+             "known_pc_ovaries": KNOWN_PCO}
+
+# flag bits (bmi category is stored separately)
+F_IRREGULAR, F_HYPER, F_PCO, F_MEETS = (1 << i for i in range(4))
+FLAG_NAMES = ((F_IRREGULAR, "cycle_irregularity"), (F_HYPER, "hyperandrogenism"),
+              (F_PCO, "pco_morphology_proxy"), (F_MEETS, "meets_2_of_3_screen"))
+BMI_CATEGORIES = ("unknown", "underweight", "normal", "overweight", "obese")
+
+FlagChange = namedtuple("FlagChange", "patient flag old new")
+
+
+class PatientState:
+    """Compact per-patient state."""
+
+    __slots__ = ("starts", "first_start", "as_of", "signs", "flags", "bmi_cat", "weight", "height")
+
+    def __init__(self):
+        self.starts = array("I")    # cycle-start ordinals within the trailing window
+        self.first_start = 0
+        self.as_of = 0              # latest date seen (cycle start or tick)
+        self.signs = 0
+        self.flags = 0
+        self.bmi_cat = 0
+        self.weight = 0.0
+        self.height = 0.0
+
+    def open_cycle_days(self):
+        """Days since the last cycle start, as of the latest date seen."""
+        return self.as_of - self.starts[-1] if self.starts else 0
+
+    def cycle_summary(self):
+        """(avg_cycle_len_days, cycles_per_year) from the trailing window.
+
+        Consecutive gaps telescope, so the mean length is just
+        (last start - first start) / completed cycles. An open cycle already
+        longer than both CYCLE_LONG_DAYS and that mean is averaged in too.
+        """
+        k = len(self.starts) - 1
+        if k < 0:
+            return 0.0, 0
+        total = self.starts[-1] - self.starts[0]
+        span = self.starts[-1] - self.first_start
+        open_days = self.open_cycle_days()
+        if open_days > CYCLE_LONG_DAYS and (k < 1 or open_days > total / k):
+            avg_len = (total + open_days) / (k + 1)
+            span += open_days
+        elif k < 1:
+            return 0.0, 0
+        else:
+            avg_len = total / k
+        if span >= WINDOW_DAYS:
+            per_year = k
+        elif span >= MIN_SPAN_DAYS:
+            per_year = round(k * WINDOW_DAYS / span)
+        else:
+            per_year = 0
+        return avg_len, per_year
+
+
+class ScreeningTracker:
+    """Holds every patient's state and turns events into flag changes."""
+
+    def __init__(self, on_change=None):
+        self.patients = {}
+        self.on_change = on_change
+
+    def _state(self, pid):
+        st = self.patients.get(pid)
+        if st is None:
+            st = self.patients[pid] = PatientState()
+        return st
+
+    # --- re-evaluation ---
+
+    def _reevaluate(self, pid, st):
+        avg_len, per_year = st.cycle_summary()
+        s = st.signs
+        irregular = (cycle_irregularity(avg_len, per_year)
+                     or (bool(st.starts) and st.open_cycle_days() >= AMENORRHEA_DAYS))
+        hyper = hyperandrogenism_flags(bool(s & HIRSUTISM), bool(s & ACNE),
+                                       bool(s & HAIR_THINNING)) or bool(s & HIGH_T)
+        pco = ovarian_appearance(bool(s & KNOWN_PCO), bool(s & AMH_HIGH))
+        meets, _tally = rotterdam_criteria(irregular, hyper, pco)
+        flags = ((F_IRREGULAR if irregular else 0) | (F_HYPER if hyper else 0)
+                 | (F_PCO if pco else 0) | (F_MEETS if meets else 0))
+
+        changes = []
+        flipped = flags ^ st.flags
+        if flipped:
+            for bit, name in FLAG_NAMES:
+                if flipped & bit:
+                    changes.append(FlagChange(pid, name, bool(st.flags & bit), bool(flags & bit)))
+            st.flags = flags
+
+        cat = BMI_CATEGORIES.index(bmi_category_from_value(bmi_value(st.weight, st.height)))
+        if cat != st.bmi_cat:
+            changes.append(FlagChange(pid, "bmi_category", BMI_CATEGORIES[st.bmi_cat], BMI_CATEGORIES[cat]))
+            st.bmi_cat = cat
+
+        if changes and self.on_change:
+            for c in changes:
+                self.on_change(c)
+        return changes
+
+    # --- events ---
+
+    def cycle_start(self, pid, day):
+        st = self._state(pid)
+        starts = st.starts
+        if starts and day <= starts[-1]:
+            return []                      # duplicate / out-of-order start
+        if not starts:
+            st.first_start = day
+        starts.append(day)
+        self._advance(st, day)
+        return self._reevaluate(pid, st)
+
+    def tick(self, today, pid=None):
+        """Re-evaluate one patient (or all) as of `today`; returns the flag changes.
+
+        Run daily so a period that never comes still flips the flags.
+        """
+        pids = self.patients if pid is None else (pid,)
+        changes = []
+        for p in pids:
+            st = self.patients[p]
+            if today > st.as_of:
+                self._advance(st, today)
+                changes += self._reevaluate(p, st)
+        return changes
+
+    @staticmethod
+    def _advance(st, day):
+        starts = st.starts
+        st.as_of = max(st.as_of, day)
+        while len(starts) > 2 and day - starts[1] >= WINDOW_DAYS:
+            starts.pop(0)                  # a year's worth of starts at most
+
+    def sign(self, pid, name, present=True):
+        st = self._state(pid)
+        bit = SIGN_BITS[name]
+        st.signs = (st.signs | bit) if present else (st.signs & ~bit)
+        return self._reevaluate(pid, st)
+
+    def lab(self, pid, name, value):
+        st = self._state(pid)
+        if name == "amh":
+            bit, high = AMH_HIGH, value >= AMH_HIGH_NG_ML
+        elif name == "total_testosterone":
+            bit, high = HIGH_T, value > TESTOSTERONE_HIGH_NG_DL
+        else:
+            raise ValueError(f"unknown lab: {name}")
+        st.signs = (st.signs | bit) if high else (st.signs & ~bit)
+        return self._reevaluate(pid, st)
+
+    def measure(self, pid, weight_kg=None, height_m=None):
+        st = self._state(pid)
+        if weight_kg is not None:
+            st.weight = weight_kg
+        if height_m is not None:
+            st.height = height_m
+        return self._reevaluate(pid, st)
+
+    # --- snapshot ---
+
+    def snapshot(self, pid):
+        """Current pcos_screen-style result for one patient."""
+        st = self.patients[pid]
+        avg_len, per_year = st.cycle_summary()
+        result = {name: bool(st.flags & bit) for bit, name in FLAG_NAMES}
+        result.update({
+            "avg_cycle_len_days": round(avg_len, 1),
+            "cycles_per_year": per_year,
+            "open_cycle_days": st.open_cycle_days(),
+            "bmi_category": BMI_CATEGORIES[st.bmi_cat],
+        })
+        return result
+
+
+# --- Checks / benchmark ---
+
+def check_open_cycle():
+    """A period that stops coming flips cycle_irregularity via tick() alone."""
+    tracker = ScreeningTracker()
+    day = 739000
+    for _ in range(6):
+        tracker.cycle_start("p", day)
+        day += 28
+    day -= 28
+    assert not tracker.snapshot("p")["cycle_irregularity"]
+    assert tracker.tick(day + 30) == []                       # a couple of late days: fine
+    changes = tracker.tick(day + 100)                         # open interval now drags the mean
+    assert [(c.flag, c.new) for c in changes] == [("cycle_irregularity", True)], changes
+    snap = tracker.snapshot("p")
+    assert snap["open_cycle_days"] == 100 and snap["avg_cycle_len_days"] > 35, snap
+
+    # one recorded start, then 120+ days of nothing: amenorrhea
+    tracker.cycle_start("q", 739000)
+    assert tracker.tick(739000 + AMENORRHEA_DAYS - 1, "q") == []
+    changes = tracker.tick(739000 + AMENORRHEA_DAYS, "q")
+    assert [(c.flag, c.new) for c in changes] == [("cycle_irregularity", True)], changes
+
+    # the next period closes the long cycle; it still counts in the average
+    tracker.cycle_start("q", 739000 + 150)
+    assert tracker.snapshot("q")["avg_cycle_len_days"] == 150
+    return True
+
+
+def benchmark(n_patients=1000000, cycles=6):
+    import random
+    check_open_cycle()
+    print("✅ open cycle / amenorrhea re-evaluated by tick()")
+    rng = random.Random(4)
+    tracker = ScreeningTracker()
+    start = time.perf_counter()
+    events = changes = 0
+    for p in range(n_patients):
+        day = 738000 + rng.randint(0, 30)
+        long_cycles = p % 4 == 0
+        for _ in range(cycles):
+            changes += len(tracker.cycle_start(p, day))
+            day += rng.randint(40, 70) if long_cycles else rng.randint(26, 32)
+        if p % 3 == 0:
+            changes += len(tracker.sign(p, "acne"))
+        changes += len(tracker.measure(p, 55 + p % 40, 1.62))
+        events += cycles + 1 + (p % 3 == 0)
+    elapsed = time.perf_counter() - start
+    print(f"{events:,} events for {n_patients:,} patients in {elapsed:.1f}s "
+          f"({events / elapsed:,.0f} events/sec), {changes:,} flag changes")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    print("Longitudinal PCOS Screening Tracker — Chapter 5\n(educational practice only)\n")
+    tracker = ScreeningTracker(on_change=lambda c: print(f"  ⚑ {c.flag}: {c.old} → {c.new}"))
+    day = 739000
+    timeline = [("measure", 62, 1.54)]
+    for gap in (29, 31, 45, 52, 40, 61, 38):
+        timeline.append(("cycle_start", day))
+        day += gap
+    timeline += [("sign", "hirsutism"), ("lab", "amh", 5.2), ("measure", 72, 1.54)]
+
+    timeline += [("tick", day + 125)]
+
+    for event in timeline:
+        print(f"Event: {event}")
+        kind, args = event[0], event[1:]
+        if kind == "tick":
+            tracker.tick(*args)
+        else:
+            getattr(tracker, kind)("patient-1", *args)
+    print("\nCurrent status:", tracker.snapshot("patient-1"))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
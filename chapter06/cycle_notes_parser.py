@@ -118,4 +118,9 @@ def demo():
         print(result)
 
 if __name__ == "__main__":
-    demo()
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(demo)
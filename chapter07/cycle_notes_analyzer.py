@@ -1,47 +1,38 @@
 # Chapter 7 Practice: Cycle Notes Analyzer (robust BBT parsing)
-import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from cycle_records import open_records   # noqa: E402  (Chapter 8: columnar records)
 
 def analyze_cycle_notes(filename):
+    # BBT entries, fertile signs (eggwhite / OPK positive) and cramp days, read from the
+    # Chapter 8 columnar records (only lines appended since the last run are parsed)
     try:
-        with open(filename, "r", encoding="utf-8") as fh:
-            lines = fh.readlines()
+        recs = open_records(filename)
     except FileNotFoundError:
         print("File not found:", filename)
         return
 
-    temps = []
-    fertile_days = []
-    symptom_days = []
-
-    for line in lines:
-        raw = line.strip()
-        if not raw:
-            continue
-
-        lower = raw.lower()
-        day = raw.split(":", 1)[0].strip()
-
-        # ---- Robust BBT capture: matches 'BBT 36.70' even if followed by commas ----
-        m = re.search(r'bbt\s*([0-9]+(?:\.[0-9]+)?)', lower)
-        if m:
-            temps.append(float(m.group(1)))
-
-        # Fertile signs
-        if "eggwhite" in lower or "opk positive" in lower:
-            fertile_days.append(day)
-
-        # Symptoms
-        if "cramp" in lower:
-            symptom_days.append(day)
+    with recs:
+        n_temps, _low, _high, mean = recs.bbt_summary()
+        fertile_days = [recs.day_label(i) for i in recs.rows_where(opk="positive", cm=("eggwhite",))]
+        symptom_days = [recs.day_label(i) for i in recs.rows_where(symptom="cramp")]
 
     print("=== Cycle Notes Report ===")
-    print("Total BBT entries:", len(temps))
-    if temps:
-        avg = round(sum(temps) / len(temps), 2)
+    print("Total BBT entries:", n_temps)
+    if n_temps:
+        avg = round(mean, 2)
         print("Average BBT:", avg)
     print("Possible fertile days:", fertile_days)
     print("Days with cramps:", symptom_days)
 
 
-if __name__ == "__main__":
+def main():
     analyze_cycle_notes("cycle_notes.txt")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,367 @@
+# Chapter 8 add-on: Compact delta-encoded storage for BBT time series
+# A year of daily temperatures per user moves by hundredths of a degree from
+# day to day, so instead of boxed floats (or text) each series is stored as:
+#   - values quantized to 0.01 °C (lossless for the two-decimal readings
+#     parse_line() produces: q / 100 gives back exactly float("36.43")).
+#     Finer readings are rounded: 36.456 is stored and read back as 36.46,
+#     so compare decoded values with quantize(v), not v
+#   - one varint token per day: zigzag(delta from the previous reading) << 1,
+#     or (missing-run length - 1) << 1 | 1 for a stretch of missing days
+#   - blocks of BLOCK_DAYS days, each with its byte offset and the reading the
+#     first delta is taken from, so any day or window decodes only its blocks
+# rolling_mean() and ovulation_index_sustained() run block by block.
+
+import os
+import struct
+import sys
+import time
+from array import array
+
+from list_cycle_summary import ovulation_index_sustained, parse_file, rolling_mean
+
+BLOCK_DAYS = 128
+DEFAULT_REF = 3650              # 36.50 °C: reference for the very first delta
+MAGIC = b"BBTS"
+VERSION = 1
+SERIES_HEADER = struct.Struct("<iII")        # start day, n_days, n_blocks
+STORE_HEADER = struct.Struct("<4sHI")        # magic, version, n_series
+
+
+def quantize(v):
+    """A reading as the store keeps it: the nearest 0.01 °C (None stays None)."""
+    return None if v is None else round(v * 100) / 100
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(z):
+    return (z >> 1) ^ -(z & 1)
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def encode_block(values, ref):
+    """Encode one block of floats/None; return (bytes, reference for the next block)."""
+    out = bytearray()
+    missing = 0
+    for v in values:
+        if v is None:
+            missing += 1
+            continue
+        if missing:
+            _put_varint(out, (missing - 1) << 1 | 1)
+            missing = 0
+        q = round(v * 100)
+        _put_varint(out, _zigzag(q - ref) << 1)
+        ref = q
+    if missing:
+        _put_varint(out, (missing - 1) << 1 | 1)
+    return bytes(out), ref
+
+
+def decode_block(data, start, end, ref):
+    """Decode the block stored in data[start:end] to a list of floats/None."""
+    out = []
+    i = start
+    while i < end:
+        shift = token = 0
+        while True:
+            b = data[i]
+            i += 1
+            token |= (b & 0x7F) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        if token & 1:
+            out.extend([None] * ((token >> 1) + 1))
+        else:
+            ref += _unzigzag(token >> 1)
+            out.append(ref / 100)
+    return out
+
+
+class BBTSeries:
+    """One user's daily BBT series (day numbers start at `start`)."""
+
+    def __init__(self, start=0):
+        self.start = start
+        self.n_days = 0
+        self.offsets = array("I", [0])      # block i is data[offsets[i]:offsets[i+1]]
+        self.refs = array("h")              # reference reading (hundredths) for block i
+        self.data = bytearray()
+        self._cached = (None, None)         # (block index, decoded values)
+
+    @classmethod
+    def from_values(cls, values, start=0):
+        series = cls(start)
+        series.extend(values)
+        return series
+
+    # --- writing ---
+
+    def extend(self, values):
+        """Append readings (float or None per day). Only the last, partial block is re-encoded."""
+        values = list(values)
+        if not values:
+            return
+        if self.n_days % BLOCK_DAYS:                     # reopen the partial last block
+            last = len(self.refs) - 1
+            values = self.block(last) + values
+            self.refs.pop()
+            self.offsets.pop()
+            del self.data[self.offsets[-1]:]
+            self.n_days -= self.n_days % BLOCK_DAYS
+        ref = self._ref_after(len(self.refs) - 1)
+        for i in range(0, len(values), BLOCK_DAYS):
+            chunk = values[i:i + BLOCK_DAYS]
+            encoded, next_ref = encode_block(chunk, ref)
+            self.refs.append(ref)
+            self.data += encoded
+            self.offsets.append(len(self.data))
+            self.n_days += len(chunk)
+            ref = next_ref
+        self._cached = (None, None)
+
+    def append(self, value):
+        self.extend([value])
+
+    def _ref_after(self, b):
+        """Reference carried out of block b (its last reading, else its own reference)."""
+        if b < 0:
+            return DEFAULT_REF
+        for v in reversed(self.block(b)):
+            if v is not None:
+                return round(v * 100)
+        return self.refs[b]
+
+    # --- reading ---
+
+    def __len__(self):
+        return self.n_days
+
+    def block(self, b):
+        """Decoded values of block b (the most recent one is cached)."""
+        if self._cached[0] == b:
+            return self._cached[1]
+        values = decode_block(self.data, self.offsets[b], self.offsets[b + 1], self.refs[b])
+        self._cached = (b, values)
+        return values
+
+    def get(self, day):
+        """Reading for one day number (None if missing or out of range)."""
+        i = day - self.start
+        if not 0 <= i < self.n_days:
+            return None
+        return self.block(i // BLOCK_DAYS)[i % BLOCK_DAYS]
+
+    def window(self, first, last):
+        """Readings for day numbers first..last inclusive (clipped to the series)."""
+        lo = max(first - self.start, 0)
+        hi = min(last - self.start + 1, self.n_days)
+        if lo >= hi:
+            return []
+        out = []
+        for b in range(lo // BLOCK_DAYS, (hi - 1) // BLOCK_DAYS + 1):
+            out += self.block(b)
+        base = (lo // BLOCK_DAYS) * BLOCK_DAYS
+        return out[lo - base:hi - base]
+
+    def iter_blocks(self):
+        """Yield (index of first day, decoded values) block by block."""
+        for b in range(len(self.refs)):
+            yield b * BLOCK_DAYS, decode_block(self.data, self.offsets[b], self.offsets[b + 1], self.refs[b])
+
+    def values(self):
+        out = []
+        for _first, vals in self.iter_blocks():
+            out += vals
+        return out
+
+    def nbytes(self):
+        """Serialized size: header + per-block (length, reference) + payload."""
+        return SERIES_HEADER.size + 4 * len(self.refs) + len(self.data)
+
+    # --- serialization ---
+
+    def to_bytes(self):
+        # on disk a block is indexed by its u16 byte length (<= BLOCK_DAYS * 3 bytes)
+        lengths = array("H", (self.offsets[b + 1] - self.offsets[b] for b in range(len(self.refs))))
+        refs = array("h", self.refs)
+        if sys.byteorder != "little":
+            lengths.byteswap()
+            refs.byteswap()
+        return (SERIES_HEADER.pack(self.start, self.n_days, len(self.refs))
+                + lengths.tobytes() + refs.tobytes() + bytes(self.data))
+
+    @classmethod
+    def from_bytes(cls, buf, pos=0):
+        """Return (series, position after it)."""
+        start, n_days, n_blocks = SERIES_HEADER.unpack_from(buf, pos)
+        pos += SERIES_HEADER.size
+        series = cls(start)
+        series.n_days = n_days
+        lengths = array("H")
+        lengths.frombytes(buf[pos:pos + 2 * n_blocks])
+        pos += 2 * n_blocks
+        series.refs = array("h")
+        series.refs.frombytes(buf[pos:pos + 2 * n_blocks])
+        pos += 2 * n_blocks
+        if sys.byteorder != "little":
+            lengths.byteswap()
+            series.refs.byteswap()
+        for n in lengths:
+            series.offsets.append(series.offsets[-1] + n)
+        series.data = bytearray(buf[pos:pos + series.offsets[-1]])
+        return series, pos + series.offsets[-1]
+
+
+# --- Many users in one file ---
+
+def save_store(path, store):
+    """Write {user: BBTSeries} to one file."""
+    parts = [STORE_HEADER.pack(MAGIC, VERSION, len(store))]
+    for user, series in store.items():
+        name = user.encode("utf-8")
+        parts += [struct.pack("<H", len(name)), name, series.to_bytes()]
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(b"".join(parts))
+    os.replace(tmp, path)
+
+
+def load_store(path):
+    with open(path, "rb") as fh:
+        buf = fh.read()
+    magic, version, n = STORE_HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} BBT store")
+    pos = STORE_HEADER.size
+    store = {}
+    for _ in range(n):
+        (length,) = struct.unpack_from("<H", buf, pos)
+        user = buf[pos + 2:pos + 2 + length].decode("utf-8")
+        store[user], pos = BBTSeries.from_bytes(buf, pos + 2 + length)
+    return store
+
+
+# --- Chapter 8 analyses over decoded blocks ---
+
+def rolling_mean_blocks(series, window=3):
+    """Same output as rolling_mean(series.values(), window), one block in memory at a time."""
+    out = []
+    carry = []
+    for _first, vals in series.iter_blocks():
+        rolled = rolling_mean(carry + vals, window=window)
+        out += rolled[len(carry):]
+        carry = (carry + vals)[-(window - 1):] if window > 1 else []
+    return out
+
+
+def ovulation_index_blocks(series, lookback=6, rise=0.25, sustain_days=3):
+    """Same result as ovulation_index_sustained(series.values(), ...), decoded block by block."""
+    buf, buf_start = [], 0          # buf holds days buf_start.. (tail + current block)
+    next_candidate = lookback
+    for _first, vals in series.iter_blocks():
+        buf += vals
+        end = buf_start + len(buf)
+        if end - sustain_days < next_candidate:
+            continue
+        sub_from = next_candidate - lookback
+        idx = ovulation_index_sustained(buf[sub_from - buf_start:], lookback, rise, sustain_days)
+        if idx is not None:
+            return sub_from + idx
+        next_candidate = end - sustain_days + 1
+        keep = next_candidate - lookback
+        buf = buf[keep - buf_start:]
+        buf_start = keep
+    return None
+
+
+# --- Benchmark ---
+
+def synthetic_year(rng, days=365, missing_rate=0.08):
+    """A biphasic BBT year: ~28-day cycles, 0.3 °C luteal rise, daily noise, missed days."""
+    out = []
+    cycle_len, day = rng.randint(26, 34), 0
+    for _ in range(days):
+        day += 1
+        if day > cycle_len:
+            cycle_len, day = rng.randint(26, 34), 1
+        if rng.random() < missing_rate:
+            out.append(None)
+            continue
+        temp = 36.35 + (0.3 if day > cycle_len - 14 else 0.0) + rng.gauss(0, 0.08)
+        out.append(round(temp, 2))
+    return out
+
+
+def benchmark(n_users=1000):
+    import random
+    rng = random.Random(8)
+    years = [synthetic_year(rng) for _ in range(n_users)]
+    start = time.perf_counter()
+    store = {f"user{u:05d}": BBTSeries.from_values(v) for u, v in enumerate(years)}
+    t_encode = time.perf_counter() - start
+
+    days = n_users * 365
+    packed = sum(s.nbytes() for s in store.values())
+    as_array = days * 8
+    boxed = sum(sys.getsizeof(v) + sum(sys.getsizeof(x) for x in v if x is not None) for v in years)
+    as_text = sum(len(f"BBT {x:.2f}\n") if x is not None else 1 for v in years for x in v)
+    print(f"{n_users:,} users x 365 days, encode {t_encode:.2f}s")
+    print(f"  delta/varint store : {packed / days:5.2f} bytes/day")
+    print(f"  array('d') floats  : {as_array / days:5.2f} bytes/day ({as_array / packed:.1f}x larger)")
+    print(f"  list of floats     : {boxed / days:5.2f} bytes/day ({boxed / packed:.1f}x larger)")
+    print(f"  'BBT 36.43' text   : {as_text / days:5.2f} bytes/day ({as_text / packed:.1f}x larger)")
+
+    series = [store[f"user{u:05d}"] for u in range(n_users)]
+    start = time.perf_counter()
+    for s, v in zip(series, years):
+        assert s.values() == v
+    t_decode = time.perf_counter() - start
+    start = time.perf_counter()
+    for k in range(100000):
+        series[k % n_users].get(k % 365)
+    t_get = (time.perf_counter() - start) / 100000
+    print(f"  decode all {t_decode:.2f}s (lossless), random get(day) {t_get * 1e6:.1f} µs")
+
+    start = time.perf_counter()
+    for s, v in zip(series[:200], years[:200]):
+        assert rolling_mean_blocks(s) == rolling_mean(v)
+        assert ovulation_index_blocks(s) == ovulation_index_sustained(v)
+    print(f"  rolling_mean / ovulation over blocks match the list versions "
+          f"(200 users, {time.perf_counter() - start:.2f}s)")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter log file name: ").strip() or "cycle_notes.txt"
+    days, bbt, opk, cm, symptoms = parse_file(fname)
+    series = BBTSeries.from_values(bbt)
+    assert series.values() == [quantize(v) for v in bbt], "BBT values do not round-trip at 0.01 °C"
+    rounded = sum(1 for v in bbt if v is not None and quantize(v) != v)
+    if rounded:
+        print(f"⚠️ {rounded} reading(s) had more than two decimals and are stored rounded to 0.01 °C")
+    save_store(fname + ".bbt", {"me": series})
+    print("=== BBT Series Store ===")
+    print(f"{len(series)} days → {series.nbytes()} bytes ({fname}.bbt), "
+          f"{len(bbt) * 8} bytes as float64")
+    print("3-day rolling mean (first 10):", rolling_mean_blocks(series)[:10])
+    ovu = ovulation_index_blocks(series)
+    print("Ovulation cue at index:", ovu, "→ cycle day", days[ovu] if ovu is not None else None)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
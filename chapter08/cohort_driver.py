@@ -0,0 +1,244 @@
+# Chapter 8 add-on: Directory-scale cycle analytics across per-user log files
+# Walks a directory tree of per-patient logs, farms files out to a process
+# pool, runs the Chapter 8 summaries and the Chapter 9 symptom counter on each
+# one, streams per-user rows into a CSV or SQLite sink and merges cohort totals.
+
+import csv
+import fnmatch
+import os
+import sqlite3
+import sys
+import time
+from multiprocessing import Pool
+
+from list_cycle_summary import (
+    bbt_stats, fertile_indices, ovulation_index_sustained, parse_line
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter09"))
+from symptom_counter import count_symptoms   # noqa: E402  (Chapter 9)
+
+SYMPTOMS = ["cramp", "spotting", "breast", "nausea", "bloat", "headache", "mood"]
+FIELDS = ["user", "rows", "bbt_min", "bbt_max", "bbt_avg", "fertile_days",
+          "first_fertile_day", "ovulation_index", "ovulation_day"] + SYMPTOMS
+SQL_TYPES = {"user": "TEXT PRIMARY KEY", "bbt_min": "REAL", "bbt_max": "REAL", "bbt_avg": "REAL"}
+
+
+# --- Discovery ---
+
+def find_logs(root, pattern="*.txt"):
+    """Yield (user_id, path) for every file under root matching pattern."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if fnmatch.fnmatch(name, pattern):
+                path = os.path.join(dirpath, name)
+                user = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, "/")
+                yield user, path
+
+
+# --- Per-file worker ---
+
+def analyze_log(job):
+    """
+    Run the per-user analyses on one log file. The file is read once: each
+    line goes through parse_line() (the body of parse_file) and the lowercased
+    lines go to count_symptoms().
+    """
+    user, path = job
+    days, bbt, opk, cm, lowered = [], [], [], [], []
+    try:
+        with open(path, encoding="utf-8") as fh:
+            for raw in fh:
+                line = raw.strip()
+                if not line:
+                    continue
+                day, temp, opk_val, cm_val, _sym = parse_line(line)
+                days.append(day)
+                bbt.append(temp)
+                opk.append(opk_val)
+                cm.append(cm_val)
+                lowered.append(line.lower())
+    except (OSError, UnicodeDecodeError) as e:
+        return {"user": user, "error": str(e)}
+
+    mn, mx, avg = bbt_stats(bbt)
+    fert = fertile_indices(opk, cm)
+    ovu = ovulation_index_sustained(bbt, lookback=6, rise=0.25, sustain_days=3)
+    temps = [x for x in bbt if isinstance(x, float)]
+    row = {
+        "user": user,
+        "rows": len(days),
+        "bbt_min": mn, "bbt_max": mx, "bbt_avg": avg,
+        "fertile_days": len(fert),
+        "first_fertile_day": days[fert[0]] if fert else None,
+        "ovulation_index": ovu,
+        "ovulation_day": days[ovu] if ovu is not None else None,
+        # extra fields for cohort merging (not written to the sink)
+        "_bbt_sum": sum(temps), "_bbt_count": len(temps),
+    }
+    counts = count_symptoms(lowered)
+    for s in SYMPTOMS:
+        row[s] = counts.get(s, 0)
+    return row
+
+
+# --- Sinks ---
+
+class CsvSink:
+    def __init__(self, path):
+        self.fh = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.fh, fieldnames=FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.fh.close()
+
+
+class SqliteSink:
+    def __init__(self, path, batch=1000):
+        self.conn = sqlite3.connect(path)
+        self.cur = self.conn.cursor()
+        cols = ", ".join(f"{f} {SQL_TYPES.get(f, 'INTEGER')}" for f in FIELDS)
+        self.cur.execute(f"CREATE TABLE IF NOT EXISTS cycle_summary ({cols})")
+        self.sql = (f"INSERT OR REPLACE INTO cycle_summary ({', '.join(FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(FIELDS))})")
+        self.batch = batch
+        self.pending = []
+
+    def write(self, row):
+        self.pending.append([row[f] for f in FIELDS])
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.cur.executemany(self.sql, self.pending)
+            self.conn.commit()
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def open_sink(path):
+    if path.endswith((".sqlite", ".db")):
+        return SqliteSink(path)
+    return CsvSink(path)
+
+
+# --- Cohort aggregation ---
+
+def new_cohort():
+    return {"users": 0, "errors": 0, "rows": 0, "bbt_sum": 0.0, "bbt_count": 0,
+            "bbt_min": None, "bbt_max": None, "ovulation_detected": 0,
+            "users_with_fertile_signs": 0, "symptoms": {s: 0 for s in SYMPTOMS}}
+
+
+def merge_row(cohort, row):
+    """Fold one per-user result into the cohort totals."""
+    if "error" in row:
+        cohort["errors"] += 1
+        return
+    cohort["users"] += 1
+    cohort["rows"] += row["rows"]
+    cohort["bbt_sum"] += row["_bbt_sum"]
+    cohort["bbt_count"] += row["_bbt_count"]
+    if row["bbt_min"] is not None:
+        cohort["bbt_min"] = row["bbt_min"] if cohort["bbt_min"] is None else min(cohort["bbt_min"], row["bbt_min"])
+        cohort["bbt_max"] = row["bbt_max"] if cohort["bbt_max"] is None else max(cohort["bbt_max"], row["bbt_max"])
+    cohort["ovulation_detected"] += row["ovulation_index"] is not None
+    cohort["users_with_fertile_signs"] += row["fertile_days"] > 0
+    for s in SYMPTOMS:
+        cohort["symptoms"][s] += row[s]
+
+
+# --- Driver ---
+
+def run_cohort(root, out_path, pattern="*.txt", workers=None, chunksize=64):
+    """Analyze every matching log under root; return (cohort totals, seconds)."""
+    workers = workers or os.cpu_count() or 1
+    cohort = new_cohort()
+    sink = open_sink(out_path)
+    start = time.perf_counter()
+    try:
+        jobs = find_logs(root, pattern)
+        if workers == 1:
+            results = map(analyze_log, jobs)
+            for row in results:
+                merge_row(cohort, row)
+                if "error" not in row:
+                    sink.write(row)
+        else:
+            with Pool(workers) as pool:
+                for row in pool.imap_unordered(analyze_log, jobs, chunksize=chunksize):
+                    merge_row(cohort, row)
+                    if "error" not in row:
+                        sink.write(row)
+    finally:
+        sink.close()
+    cohort["bbt_avg"] = round(cohort["bbt_sum"] / cohort["bbt_count"], 2) if cohort["bbt_count"] else None
+    return cohort, time.perf_counter() - start
+
+
+def write_synthetic_cohort(root, n_users=2000, days=90, seed=9):
+    """Create n_users per-patient logs (nested folders) for benchmarking."""
+    import random
+    rng = random.Random(seed)
+    for u in range(n_users):
+        folder = os.path.join(root, f"clinic{u % 10}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"patient{u:06d}.txt"), "w", encoding="utf-8") as fh:
+            for d in range(days):
+                day = d % 30 + 1
+                temp = 36.4 + (0.35 if day > 15 else 0) + rng.random() * 0.1
+                opk = "positive" if day in (13, 14) else "negative"
+                cm = "eggwhite" if day in (12, 13, 14) else "dry"
+                extra = ", cramps" if day in (1, 2) else (", bloating" if rng.random() < 0.1 else "")
+                fh.write(f"Day {day}: BBT {temp:.2f}, OPK {opk}, CM {cm}{extra}\n")
+
+
+def benchmark(n_users=2000):
+    import shutil
+    import tempfile
+    root = tempfile.mkdtemp(prefix="cohort_bench_")
+    try:
+        write_synthetic_cohort(root, n_users)
+        out = os.path.join(root, "summary.csv")
+        for w in sorted({1, os.cpu_count() or 1}):
+            cohort, secs = run_cohort(root, out, pattern="patient*.txt", workers=w)
+            print(f"workers={w}: {cohort['users']:,} users / {cohort['rows']:,} rows "
+                  f"in {secs:.2f}s ({cohort['users'] / secs:,.0f} files/sec)")
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    default_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    root = input("Folder of per-user logs: ").strip() or default_root
+    pattern = input("File pattern (default cycle_notes*.txt): ").strip() or "cycle_notes*.txt"
+    out = input("Output file (.csv or .sqlite, default cohort_summary.csv): ").strip() or "cohort_summary.csv"
+
+    cohort, secs = run_cohort(root, out, pattern)
+    print("\n=== Cohort Cycle Analytics ===")
+    print(f"Users analyzed: {cohort['users']} (errors: {cohort['errors']}) in {secs:.2f}s")
+    print("Rows parsed:", cohort["rows"])
+    print("BBT min/max/avg:", (cohort["bbt_min"], cohort["bbt_max"], cohort["bbt_avg"]))
+    print("Users with fertile signs:", cohort["users_with_fertile_signs"])
+    print("Users with ovulation cue:", cohort["ovulation_detected"])
+    print("Symptom counts:", cohort["symptoms"])
+    print(f"\n💾 Per-user results written to {out}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,486 @@
+# Chapter 8 add-on: Compact binary (columnar) storage for parsed cycle records
+# Parse cycle_notes.txt once (memoized by parse_cache), write the columns into
+# a small versioned binary file, and let later analyses memory-map it instead
+# of regex-parsing text again: open_records() hands the Chapter 7/8/9/10
+# reports a CycleRecords whose aggregates (symptom counts, BBT summary, fertile
+# rows) run over the mapped columns without building per-record lists. If
+# pyarrow is installed, the same columns can be exported to Arrow / Parquet.
+#
+# Users only append a line a day, so the file also remembers the text file's
+# identity and the byte offset its last complete line ended at: when the log
+# grew, open_records() parses only the new bytes and rewrites the columns
+# around them; a truncated, rotated or replaced log is rebuilt from scratch.
+#
+# File layout (little-endian, version 2):
+#   header   : magic "PCOSREC1", version u16, n_columns u16, n_records u64,
+#              source size u64, source mtime_ns u64
+#   directory: per column -> name 8s, typecode 1s, pad 7x, offset u64, nbytes u64
+#   meta     : JSON {"users": user ids (the "user" column indexes into it),
+#                    "source": {"identity", "offset", "records"} or null}
+#   columns  : raw arrays, each 8-byte aligned
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+
+from incremental_notes import file_identity, same_file
+from list_cycle_summary import parse_file, parse_line
+from parse_cache import parse_lines_memo
+
+MAGIC = b"PCOSREC1"
+VERSION = 2
+HEADER = struct.Struct("<8sHHQQQ")
+COLUMN_ENTRY = struct.Struct("<8ss7xQQ")
+
+NO_DAY = 0xFFFF
+NO_BBT = -32768
+OPK_CODES = (None, "positive", "negative")
+CM_CODES = (None, "eggwhite", "slippery", "watery", "creamy", "sticky", "dry")
+SYMPTOM_BITS = ("cramp", "spotting", "breast", "nausea", "bloat", "headache", "mood")
+
+_opk_index = {v: i for i, v in enumerate(OPK_CODES)}
+_cm_index = {v: i for i, v in enumerate(CM_CODES)}
+_sym_bit = {s: 1 << i for i, s in enumerate(SYMPTOM_BITS)}
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional
+    pyarrow = None
+
+
+# --- Encoding helpers ---
+
+def encode_symptoms(sym):
+    mask = 0
+    for s in sym or ():
+        mask |= _sym_bit[s]
+    return mask
+
+
+def decode_symptoms(mask):
+    if not mask:
+        return None
+    return [s for s in SYMPTOM_BITS if mask & _sym_bit[s]]
+
+
+def _bbt_column(values):
+    """Store BBT as int16 hundredths when that is lossless, else float64."""
+    out = array("h")
+    for v in values:
+        if v is None:
+            out.append(NO_BBT)
+            continue
+        q = round(v * 100)
+        if q / 100 != v or not -32767 <= q <= 32767:
+            return array("d", (float("nan") if x is None else x for x in values))
+        out.append(q)
+    return out
+
+
+def _extend_bbt(col, values):
+    """BBT column `col` followed by `values`; switches both to float64 if either needs it."""
+    new = _bbt_column(values)
+    if new.typecode == col.typecode:
+        col.extend(new)
+        return col
+    out = array("d")
+    for part in (col, new):
+        if part.typecode == "h":
+            out.extend(float("nan") if v == NO_BBT else v / 100 for v in part)
+        else:
+            out.extend(part)
+    return out
+
+
+# --- Writing ---
+
+def _new_columns():
+    return {"user": array("I"), "day": array("H"), "opk": array("B"), "cm": array("B"),
+            "symptoms": array("B")}
+
+
+def _add_rows(cols, users, rows):
+    """Append (user, day, bbt, opk, cm, symptoms) rows to the columns; return their BBT values."""
+    bbt_vals = []
+    for user, day, bbt, opk, cm, sym in rows:
+        cols["user"].append(users.setdefault(user, len(users)))
+        cols["day"].append(NO_DAY if day is None else day)
+        bbt_vals.append(bbt)
+        cols["opk"].append(_opk_index[opk])
+        cols["cm"].append(_cm_index[cm])
+        cols["symptoms"].append(encode_symptoms(sym))
+    return bbt_vals
+
+
+def write_records(path, rows, source=None, stamp=(0, 0)):
+    """
+    Write rows of (user, day, bbt, opk, cm, symptoms) to a records file.
+    `source` ({"identity", "offset", "records"}) and `stamp` (size, mtime_ns)
+    describe the text file the rows came from, so later runs can tell a
+    stale file and what was appended since.
+    """
+    cols, users = _new_columns(), {}
+    bbt = _bbt_column(_add_rows(cols, users, rows))
+    _write_columns(path, list(users), cols, bbt, source, stamp)
+
+
+def _write_columns(path, users, cols, bbt, source, stamp):
+    columns = [("user", cols["user"]), ("day", cols["day"]), ("bbt", bbt),
+               ("opk", cols["opk"]), ("cm", cols["cm"]), ("symptoms", cols["symptoms"])]
+    if sys.byteorder != "little":
+        for _, col in columns:
+            col.byteswap()
+
+    meta_blob = json.dumps({"users": users, "source": source}).encode("utf-8")
+    pos = HEADER.size + COLUMN_ENTRY.size * (len(columns) + 1)
+    entries = [(b"meta", b"j", pos, len(meta_blob))]
+    pos += len(meta_blob)
+    for name, col in columns:
+        pos += -pos % 8
+        nbytes = len(col) * col.itemsize
+        entries.append((name.encode(), col.typecode.encode(), pos, nbytes))
+        pos += nbytes
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, len(entries), len(cols["user"]), *stamp))
+        for entry in entries:
+            fh.write(COLUMN_ENTRY.pack(*entry))
+        fh.write(meta_blob)
+        for (name, col), entry in zip(columns, entries[1:]):
+            fh.write(b"\0" * (entry[2] - fh.tell()))
+            fh.write(col.tobytes())
+    os.replace(tmp, path)
+
+
+def _read_text(fname, offset):
+    """
+    (identity, stamp, complete lines, partial last line, offset after the last
+    newline) for fname from byte `offset`. The stamp is taken before reading,
+    so text appended meanwhile makes the next run see the file as grown.
+    """
+    identity = file_identity(fname)
+    with open(fname, "rb") as fh:
+        st = os.fstat(fh.fileno())
+        fh.seek(offset)
+        data = fh.read()
+    cut = data.rfind(b"\n") + 1
+    lines = [ln.decode("utf-8") for ln in data[:cut].split(b"\n")[:-1]]
+    partial = data[cut:].decode("utf-8", errors="replace")
+    return identity, (st.st_size, st.st_mtime_ns), lines, partial, offset + cut
+
+
+def convert_text(fname, path=None, user="me"):
+    """Parse a whole cycle_notes text file and write its records file."""
+    path = path or fname + ".rec"
+    identity, stamp, lines, partial, offset = _read_text(fname, 0)
+    parsed = parse_lines_memo(lines + [partial], fname)
+    source = {"identity": identity, "offset": offset, "records": sum(1 for ln in lines if ln.strip())}
+    write_records(path, ((user,) + p for p in parsed), source, stamp)
+    return path
+
+
+def append_text(fname, recs, path=None, user="me"):
+    """
+    Rewrite `recs` (open on fname's records file) with the lines appended to
+    fname since it was written; only those lines are parsed. A partial last
+    line is stored but parsed again next time, once it is complete. Closes recs.
+    """
+    path = path or fname + ".rec"
+    src = recs.source
+    n = src["records"]
+    identity, stamp, lines, partial, offset = _read_text(fname, src["offset"])
+    parsed = [parse_line(line) for line in (ln.strip() for ln in lines + [partial]) if line]
+    users = {u: i for i, u in enumerate(recs.users)}
+    cols = {name: array(_typecode(col), col[:n]) for name, col in recs.columns.items()}
+    recs.close()
+    bbt = _extend_bbt(cols.pop("bbt"), _add_rows(cols, users, ((user,) + p for p in parsed)))
+    source = {"identity": identity, "offset": offset,
+              "records": n + sum(1 for ln in lines if ln.strip())}
+    _write_columns(path, list(users), cols, bbt, source, stamp)
+    return path
+
+
+def _typecode(col):
+    return col.typecode if isinstance(col, array) else col.format
+
+
+# --- Reading (memory-mapped) ---
+
+class CycleRecords:
+    """Memory-mapped, read-only view of a records file; columns are memoryviews."""
+
+    def __init__(self, path):
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_cols, n, src_size, src_mtime = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a cycle records file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported records version {version}")
+        self.n_records = n
+        self.source_stamp = (src_size, src_mtime)
+        self.source = None
+        self.refresh = None             # set by open_records()
+        self.columns = {}
+        self._views = []
+        view = memoryview(self._mm)
+        self._views.append(view)
+        for i in range(n_cols):
+            name, code, off, nbytes = COLUMN_ENTRY.unpack_from(self._mm, HEADER.size + i * COLUMN_ENTRY.size)
+            name = name.rstrip(b"\0").decode()
+            code = code.decode()
+            if code == "j":
+                meta = json.loads(bytes(view[off:off + nbytes]))
+                self.users, self.source = meta["users"], meta["source"]
+            elif sys.byteorder == "little":
+                raw = view[off:off + nbytes]
+                self.columns[name] = raw.cast(code)
+                self._views += [raw, self.columns[name]]
+            else:
+                col = array(code, view[off:off + nbytes])
+                col.byteswap()
+                self.columns[name] = col
+
+    def close(self):
+        """Release the column views and unmap the file."""
+        self.columns = {}
+        for v in reversed(self._views):
+            v.release()
+        self._views = []
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_records
+
+    # --- parse_file-shaped access ---
+
+    def days(self):
+        return [None if d == NO_DAY else d for d in self.columns["day"]]
+
+    def bbt(self):
+        col = self.columns["bbt"]
+        if getattr(col, "format", None) == "h" or getattr(col, "typecode", None) == "h":
+            return [None if v == NO_BBT else v / 100 for v in col]
+        return [None if v != v else v for v in col]
+
+    def opk(self):
+        return [OPK_CODES[c] for c in self.columns["opk"]]
+
+    def cm(self):
+        return [CM_CODES[c] for c in self.columns["cm"]]
+
+    def symptoms(self):
+        return [decode_symptoms(m) for m in self.columns["symptoms"]]
+
+    def as_parsed(self):
+        """Same five lists parse_file() returns (builds every list: for round-trip checks)."""
+        return self.days(), self.bbt(), self.opk(), self.cm(), self.symptoms()
+
+    # --- column aggregates (no per-record lists) ---
+
+    def day_label(self, i):
+        d = self.columns["day"][i]
+        return None if d == NO_DAY else f"Day {d}"
+
+    def symptom_counts(self):
+        """{symptom: records mentioning it}, in order of first appearance (like count_symptoms)."""
+        counts = {}
+        for mask, n in Counter(self.columns["symptoms"]).items():
+            for s in SYMPTOM_BITS:
+                if mask & _sym_bit[s]:
+                    counts[s] = counts.get(s, 0) + n
+        return counts
+
+    def bbt_summary(self):
+        """(count, min, max, mean) of the recorded temperatures; count 0 if none."""
+        col = self.columns["bbt"]
+        if getattr(col, "format", None) == "h" or getattr(col, "typecode", None) == "h":
+            vals = [v for v in col if v != NO_BBT]
+            scale = 100
+        else:
+            vals = [v for v in col if v == v]
+            scale = 1
+        if not vals:
+            return 0, None, None, None
+        return len(vals), min(vals) / scale, max(vals) / scale, sum(vals) / scale / len(vals)
+
+    def rows_where(self, opk=None, cm=(), symptom=None):
+        """Indexes of records with that OPK result, OR one of those CM values, OR that symptom."""
+        opk_code = _opk_index[opk] if opk else -1
+        cm_codes = {_cm_index[c] for c in cm}
+        bit = _sym_bit[symptom] if symptom else 0
+        return [i for i, (o, c, m) in enumerate(zip(self.columns["opk"], self.columns["cm"],
+                                                    self.columns["symptoms"]))
+                if o == opk_code or c in cm_codes or m & bit]
+
+    def to_arrow(self):
+        """Return a pyarrow.Table (requires pyarrow)."""
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        days, bbt, opk, cm, symptoms = self.as_parsed()
+        return pyarrow.table({
+            "user": [self.users[u] for u in self.columns["user"]],
+            "day": days, "bbt": bbt, "opk": opk, "cm": cm,
+            "symptom_mask": list(self.columns["symptoms"]),
+        })
+
+    def write_parquet(self, path):
+        pyarrow.parquet.write_table(self.to_arrow(), path)
+
+
+def open_records(fname):
+    """
+    CycleRecords for a cycle-notes text file, kept in <fname>.rec: reused when
+    up to date, extended with only the appended lines when the log grew, and
+    rebuilt when it was truncated, rotated or replaced. The result's `refresh`
+    says which ("reused", "appended" or "rebuilt"). Raises FileNotFoundError
+    if fname does not exist.
+    """
+    rec_path = fname + ".rec"
+    st = os.stat(fname)
+    try:
+        recs = CycleRecords(rec_path)
+    except (OSError, ValueError):      # missing, empty, not a records file or an older version
+        recs = None
+    if recs is not None and recs.source_stamp == (st.st_size, st.st_mtime_ns):
+        recs.refresh = "reused"
+        return recs
+    if recs is not None and recs.source and same_file(fname, recs.source):
+        append_text(fname, recs, rec_path)
+        refresh = "appended"
+    else:
+        if recs is not None:
+            recs.close()
+        convert_text(fname, rec_path)
+        refresh = "rebuilt"
+    recs = CycleRecords(rec_path)
+    recs.refresh = refresh
+    return recs
+
+
+# --- Round-trip check & benchmark ---
+
+def verify_round_trip(fname):
+    """Assert a records file reproduces parse_file(fname) exactly."""
+    expected = parse_file(fname)
+    path = convert_text(fname, fname + ".rec.check")
+    try:
+        with CycleRecords(path) as recs:
+            assert recs.as_parsed() == expected, "records do not match parse_file output"
+    finally:
+        os.remove(path)
+    return True
+
+
+def check_append(folder):
+    """Appends parse only new lines; partial lines, truncation and rotation stay exact."""
+    fname = os.path.join(folder, "cycle_records_check.txt")
+
+    def expect(refresh):
+        with open_records(fname) as recs:
+            assert recs.refresh == refresh, (recs.refresh, refresh)
+            assert recs.as_parsed() == parse_file(fname), refresh
+            return len(recs)
+
+    with open(fname, "w", encoding="utf-8") as fh:
+        fh.write("Day 1: BBT 36.40, CM dry, cramps\n\nDay 2: BBT 36.45, OPK negative\nDay 3: BBT 36.4")
+    assert expect("rebuilt") == 3
+    assert expect("reused") == 3
+    with open(fname, "a", encoding="utf-8") as fh:
+        fh.write("2, CM creamy\nDay 4: BBT 36.50\n")             # completes the partial line
+    assert expect("appended") == 4
+    with open(fname, "a", encoding="utf-8") as fh:
+        fh.write("Day 5: BBT 36.875, OPK positive, mood\n")       # BBT column turns float64
+    assert expect("appended") == 5
+    with open(fname, "r+", encoding="utf-8") as fh:
+        fh.truncate(40)                                             # truncated: rebuild
+    expect("rebuilt")
+    os.remove(fname)
+    with open(fname, "w", encoding="utf-8") as fh:                 # rotated: a new file
+        fh.write("Day 1: BBT 36.30\n")
+    assert expect("rebuilt") == 1
+    for leftover in (fname, fname + ".rec", os.path.join(folder, "parse_cache.json")):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    return True
+
+
+def benchmark(n=1000000):
+    import random
+    import tempfile
+    folder = tempfile.mkdtemp(prefix="cycle_records_")
+    check_append(folder)
+    os.rmdir(folder)
+    print("✅ open_records: reuse, append (incl. partial lines), rebuild on truncation / rotation")
+    rng = random.Random(2)
+    rows = []
+    for i in range(n):
+        rows.append((f"u{i // 365:05d}", i % 35 + 1, round(36.2 + rng.random() * 0.8, 2),
+                     rng.choice(OPK_CODES), rng.choice(CM_CODES),
+                     rng.choice([None, ["cramp"], ["cramp", "bloat"], ["mood"]])))
+    path = os.path.join(tempfile.gettempdir(), "cycle_records_bench.rec")
+    start = time.perf_counter()
+    write_records(path, rows)
+    t_write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recs = CycleRecords(path)
+    col = recs.columns["bbt"]
+    t_open = time.perf_counter() - start
+    start = time.perf_counter()
+    total = sum(col)
+    t_scan = time.perf_counter() - start
+    start = time.perf_counter()
+    counts = recs.symptom_counts()
+    t_counts = time.perf_counter() - start
+    start = time.perf_counter()
+    as_lists = recs.symptoms()
+    t_lists = time.perf_counter() - start
+    del as_lists
+    size = os.path.getsize(path)
+    recs.close()
+    os.remove(path)
+    print(f"{n:,} records: write {t_write:.2f}s, file {size / n:.1f} bytes/record "
+          f"({size / 1e6:.1f} MB)")
+    print(f"  open + map columns: {t_open * 1000:.2f} ms, "
+          f"sum of BBT column: {t_scan * 1000:.1f} ms (mean {total / n / 100:.2f})")
+    print(f"  symptom_counts on the mask column: {t_counts * 1000:.1f} ms "
+          f"(decoding to lists first: {t_lists * 1000:.1f} ms); cramp = {counts['cramp']:,}")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter log file name: ").strip() or "cycle_notes.txt"
+    verify_round_trip(fname)
+    with open_records(fname) as recs:
+        n = len(recs)
+    print("=== Cycle Records (binary) ===")
+    print(f"Round trip vs parse_file: OK — {n} records in {fname}.rec "
+          f"({os.path.getsize(fname + '.rec')} bytes, text {os.path.getsize(fname)} bytes)")
+    if pyarrow is not None:
+        with CycleRecords(fname + ".rec") as recs:
+            recs.write_parquet(fname + ".parquet")
+        print(f"Parquet copy written to {fname}.parquet")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
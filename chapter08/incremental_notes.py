@@ -0,0 +1,40 @@
+# Chapter 8 add-on: Incremental re-analysis of append-only logs
+# Users append one line a day, so a later run only needs the bytes added
+# since the last one. A reader remembers the log's identity (device, inode and
+# a hash of its first bytes) plus the byte offset it reached; same_file() then
+# says whether the log is still that file, only appended to, or whether it was
+# truncated, rotated or replaced and has to be read again from the start.
+#
+# open_records() (cycle_records) keeps this next to the parsed columns of
+# cycle_notes.txt, so the Chapter 7/8/9/10 reports parse only appended lines;
+# mention_trends, forum_topics and diary_import resume their inputs the same way.
+
+import hashlib
+import os
+
+HEAD_BYTES = 256          # fingerprint of the file start, to spot rotation
+
+
+def file_identity(fname, length=HEAD_BYTES):
+    """(device, inode, sha1 of the first `length` bytes) for a log file."""
+    st = os.stat(fname)
+    with open(fname, "rb") as fh:
+        head = fh.read(length)
+    return {"dev": st.st_dev, "ino": st.st_ino, "head_len": len(head),
+            "head_sha1": hashlib.sha1(head).hexdigest()}
+
+
+def same_file(fname, saved):
+    """True if `fname` is the same, only-appended-to log `saved` ({"identity", "offset"}) saw."""
+    try:
+        st = os.stat(fname)
+    except FileNotFoundError:
+        return False
+    ident = saved["identity"]
+    if (st.st_dev, st.st_ino) != (ident["dev"], ident["ino"]):
+        return False                      # rotated / replaced
+    if st.st_size < saved["offset"]:
+        return False                      # truncated
+    with open(fname, "rb") as fh:
+        head = fh.read(ident["head_len"])
+    return hashlib.sha1(head).hexdigest() == ident["head_sha1"]
@@ -3,6 +3,45 @@
 
 import re
 
+def parse_line(line):
+    """
+    Parse one stripped, non-empty line like:
+      Day 14: BBT 36.70, OPK positive, CM eggwhite, cramps
+    Returns a tuple: (day, bbt, opk, cm, symptoms)
+    """
+    # Day (e.g., "Day 14: ...")
+    mday = re.match(r"Day\s+(\d+)\s*:", line, flags=re.I)
+    day = int(mday.group(1)) if mday else None
+
+    lower = line.lower()
+
+    # BBT (e.g., "BBT 36.70") — robust to trailing commas
+    mbbt = re.search(r"bbt\s*([0-9]+(?:\.[0-9]+)?)", lower)
+    bbt = float(mbbt.group(1)) if mbbt else None
+
+    # OPK (positive/negative)
+    if "opk positive" in lower:
+        opk = "positive"
+    elif "opk" in lower and "negative" in lower:
+        opk = "negative"
+    else:
+        opk = None
+
+    # CM (dry/sticky/creamy/eggwhite/watery/slippery)
+    cm_val = None
+    for tag in ["eggwhite", "slippery", "watery", "creamy", "sticky", "dry"]:
+        if tag in lower:
+            cm_val = tag
+            break
+
+    # Symptoms (simple flags list)
+    sym = []
+    for s in ["cramp", "spotting", "breast", "nausea", "bloat", "headache", "mood"]:
+        if s in lower:
+            sym.append(s)
+
+    return day, bbt, opk, cm_val, (sym if sym else None)
+
 def parse_file(fname):
     """
     Parse a simple text file with lines like:
@@ -17,38 +56,12 @@ def parse_file(fname):
                 if not line:
                     continue
 
-                # Day (e.g., "Day 14: ...")
-                mday = re.match(r"Day\s+(\d+)\s*:", line, flags=re.I)
-                days.append(int(mday.group(1)) if mday else None)
-
-                lower = line.lower()
-
-                # BBT (e.g., "BBT 36.70") — robust to trailing commas
-                mbbt = re.search(r"bbt\s*([0-9]+(?:\.[0-9]+)?)", lower)
-                bbt.append(float(mbbt.group(1)) if mbbt else None)
-
-                # OPK (positive/negative)
-                if "opk positive" in lower:
-                    opk.append("positive")
-                elif "opk" in lower and "negative" in lower:
-                    opk.append("negative")
-                else:
-                    opk.append(None)
-
-                # CM (dry/sticky/creamy/eggwhite/watery/slippery)
-                cm_val = None
-                for tag in ["eggwhite", "slippery", "watery", "creamy", "sticky", "dry"]:
-                    if tag in lower:
-                        cm_val = tag
-                        break
+                day, temp, opk_val, cm_val, sym = parse_line(line)
+                days.append(day)
+                bbt.append(temp)
+                opk.append(opk_val)
                 cm.append(cm_val)
-
-                # Symptoms (simple flags list)
-                sym = []
-                for s in ["cramp", "spotting", "breast", "nausea", "bloat", "headache", "mood"]:
-                    if s in lower:
-                        sym.append(s)
-                symptoms.append(sym if sym else None)
+                symptoms.append(sym)
 
         return days, bbt, opk, cm, symptoms
 
@@ -103,8 +116,16 @@ def ovulation_index_sustained(bbt, lookback=6, rise=0.25, sustain_days=3):
     return None
 
 def main():
-    # Read from a local text file in the same folder
-    days, bbt, opk, cm, symptoms = parse_file("cycle_notes.txt")
+    # Read the local cycle_notes.txt through its records file (parsed once, then memory-mapped);
+    # cycle_records imports this module, so it is imported here rather than at the top
+    from cycle_records import open_records
+    fname = "cycle_notes.txt"
+    try:
+        with open_records(fname) as recs:
+            days, bbt, opk, cm = recs.days(), recs.bbt(), recs.opk(), recs.cm()
+    except FileNotFoundError:
+        print("File not found:", fname)
+        days, bbt, opk, cm = [], [], [], []
 
     print("=== Chapter 8: List-Powered Cycle Summaries ===")
     print("Rows parsed:", len(days))
@@ -128,4 +149,9 @@ def main():
         print("(Tip: ensure enough pre-ovulation temps; consider lookback=5, rise=0.20 if data are sparse.)")
 
 if __name__ == "__main__":
-    main()
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
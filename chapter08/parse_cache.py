@@ -0,0 +1,288 @@
+# Chapter 8 add-on: Memoized parsing of cycle notes (bounded LRU cache)
+# Most notes are templates ("Day N: BBT x, OPK negative, CM dry"), so after
+# the day token many lines are identical. This layer caches the parsed
+# fields keyed on that suffix, re-reads only the day, reports hit ratios and
+# can persist the cache so re-processing old archives mostly skips parsing.
+# convert_text() in cycle_records goes through parse_lines_memo(), so a full
+# (re)build of a log's .rec file only parses line shapes it has not seen;
+# appended lines are parsed directly (a few lines do not repay loading it).
+# Cached values are tuples: a caller editing a result cannot change the cache.
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+from list_cycle_summary import parse_line
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter06"))
+from cycle_notes_parser import parse_note   # noqa: E402  (Chapter 6)
+
+CACHE_VERSION = 1
+DEFAULT_SIZE = 50000
+
+# Chapter 8 keys on the exact text after "Day N:", which parse_line reads
+# the same way. Chapter 6's extractors look at the whole note ("D14 BBT 36.45"
+# and "BBT 36.45" parse differently), so parse_note is keyed on the full note.
+# Collapsing case/whitespace would change what the parsers match ("OPK
+# positive" is not "opk positive"), so keys are deliberately not normalized.
+_ch8_day = re.compile(r"Day\s+(\d+)\s*:", re.I)
+CACHE_FILE = "parse_cache.json"
+
+
+def parser_fingerprint(*funcs):
+    """Hash of the parser bytecode, so a saved cache from older code is ignored."""
+    h = hashlib.sha1()
+    for f in funcs:
+        h.update(f.__code__.co_code)
+        h.update(repr(f.__code__.co_consts).encode())
+    return h.hexdigest()
+
+
+class LRUCache:
+    """A bounded least-recently-used cache with hit / miss / eviction stats."""
+
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    # --- persistence ---
+
+    def save(self, path, fingerprint):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"version": CACHE_VERSION, "parser": fingerprint,
+                       "items": list(self.data.items())}, fh)
+        os.replace(tmp, path)
+
+    def load(self, path, fingerprint):
+        """Load a saved cache if it matches this parser; return True if loaded."""
+        if not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as fh:
+            saved = json.load(fh)
+        if saved.get("version") != CACHE_VERSION or saved.get("parser") != fingerprint:
+            return False
+        for key, value in saved["items"][-self.maxsize:]:
+            self.data[key] = _freeze(value)
+        return True
+
+
+def _freeze(value):
+    """JSON lists back to the tuples the cache stores."""
+    return tuple(_freeze(v) for v in value) if isinstance(value, list) else value
+
+
+# --- Chapter 8 (parse_line / parse_file) ---
+
+CH8_FINGERPRINT = parser_fingerprint(parse_line)
+
+
+def parse_line_cached(line, cache):
+    """parse_line memoized on the post-day suffix; symptoms come back as a tuple."""
+    m = _ch8_day.match(line)
+    key = line[m.end():] if m else line
+    fields = cache.get(key)
+    if fields is None:
+        day, bbt, opk, cm, sym = parse_line(line)
+        fields = (bbt, opk, cm, tuple(sym) if sym else None)
+        cache.put(key, fields)
+        return (day,) + fields
+    return ((int(m.group(1)) if m else None),) + fields
+
+
+def parse_file_cached(fname, cache):
+    """list_cycle_summary.parse_file through the cache (symptoms as tuples)."""
+    days, bbt, opk, cm, symptoms = [], [], [], [], []
+    try:
+        with open(fname, "r", encoding="utf-8") as fh:
+            for raw in fh:
+                line = raw.strip()
+                if not line:
+                    continue
+                day, temp, opk_val, cm_val, sym = parse_line_cached(line, cache)
+                days.append(day)
+                bbt.append(temp)
+                opk.append(opk_val)
+                cm.append(cm_val)
+                symptoms.append(sym)
+        return days, bbt, opk, cm, symptoms
+    except FileNotFoundError:
+        print("File not found:", fname)
+        return [], [], [], [], []
+
+
+def parse_lines_memo(lines, fname, cache_file=None):
+    """
+    [(day, bbt, opk, cm, symptoms)] for the non-blank `lines` of fname, through
+    the persisted cache (default: parse_cache.json beside fname).
+    """
+    cache_file = cache_file or os.path.join(os.path.dirname(os.path.abspath(fname)), CACHE_FILE)
+    cache = LRUCache(DEFAULT_SIZE)
+    cache.load(cache_file, CH8_FINGERPRINT)
+    parsed = [parse_line_cached(line, cache) for line in (ln.strip() for ln in lines) if line]
+    if parsed:
+        cache.save(cache_file, CH8_FINGERPRINT)
+    return parsed
+
+
+# --- Chapter 6 (parse_note) ---
+
+CH6_FIELDS = ("day", "opk", "bbt", "cm", "symptoms")
+CH6_FINGERPRINT = parser_fingerprint(parse_note)
+
+
+def parse_note_cached(note, cache):
+    """cycle_notes_parser.parse_note memoized on the full note; symptoms come back as a tuple."""
+    fields = cache.get(note)
+    if fields is None:
+        result = parse_note(note)
+        result["symptoms"] = tuple(result["symptoms"])
+        cache.put(note, tuple(result[k] for k in CH6_FIELDS))
+        return result
+    result = dict(zip(CH6_FIELDS, fields))
+    result["raw"] = note.strip()
+    return result
+
+
+# --- Checks & benchmark ---
+
+def frozen(parsed):
+    """A plain parse_line / parse_note result with symptoms as a tuple, for comparisons."""
+    if isinstance(parsed, dict):
+        return {**parsed, "symptoms": tuple(parsed["symptoms"])}
+    *head, sym = parsed
+    return (*head, tuple(sym) if sym else None)
+
+
+def check_cache():
+    """Day prefixes, shared entries and persistence keep the uncached results."""
+    import tempfile
+    notes = ["D14 BBT 36.45", "BBT 36.45", "Day 3 OPK negative; cm creamy; cramps",
+             "Day 4 OPK negative; cm creamy; cramps", "D14 BBT 36.45"]
+    cache = LRUCache()
+    for note in notes + notes:
+        assert parse_note_cached(note, cache) == frozen(parse_note(note)), note
+    assert cache.stats()["entries"] == 4
+
+    lines = ["Day 1: BBT 36.40, OPK negative, CM dry, cramps",
+             "Day 2: BBT 36.40, OPK negative, CM dry, cramps", "BBT 36.40, CM dry"]
+    cache = LRUCache()
+    for line in lines + lines:
+        assert parse_line_cached(line, cache) == frozen(parse_line(line)), line
+    assert isinstance(parse_line_cached(lines[0], cache)[4], tuple)
+
+    path = os.path.join(tempfile.gettempdir(), "parse_cache_check.json")
+    cache.save(path, CH8_FINGERPRINT)
+    loaded = LRUCache()
+    assert loaded.load(path, CH8_FINGERPRINT) and loaded.data == cache.data
+    os.remove(path)
+    return True
+
+
+def synthetic_lines(n, dup_rate, seed=11):
+    """n note lines where roughly `dup_rate` of them repeat an earlier suffix."""
+    import random
+    rng = random.Random(seed)
+    seen = []
+    lines = []
+    for i in range(n):
+        if seen and rng.random() < dup_rate:
+            suffix = rng.choice(seen)
+        else:
+            suffix = (f"BBT 36.{rng.randint(0, 99):02d}, OPK {rng.choice(['negative', 'positive'])}, "
+                      f"CM {rng.choice(['dry', 'sticky', 'creamy', 'eggwhite'])}"
+                      f"{rng.choice(['', ', cramps', ', bloating', ', mood low'])}, note {i}")
+            seen.append(suffix)
+        lines.append(f"Day {i % 35 + 1}: {suffix}")
+    return lines
+
+
+def benchmark(n=200000):
+    """Compare uncached vs cached parsing at realistic duplication rates."""
+    check_cache()
+    print("✅ cached parses match parse_line / parse_note (day prefixes, reloaded cache)")
+    print(f"Parsing {n:,} lines (Chapter 8 parse_line / Chapter 6 parse_note)")
+    for rate in (0.5, 0.8, 0.95):
+        lines = synthetic_lines(n, rate)
+        notes = [ln.replace("Day ", "D", 1) for ln in lines]
+        for name, plain_fn, cached_fn, items in (
+            ("parse_line", parse_line, parse_line_cached, lines),
+            ("parse_note", parse_note, parse_note_cached, notes),
+        ):
+            start = time.perf_counter()
+            plain = [plain_fn(x) for x in items]
+            t_plain = time.perf_counter() - start
+
+            cache = LRUCache(DEFAULT_SIZE)
+            start = time.perf_counter()
+            cached = [cached_fn(x, cache) for x in items]
+            t_cold = time.perf_counter() - start
+
+            # re-processing the same archive with the (persisted) warm cache
+            start = time.perf_counter()
+            for x in items[-DEFAULT_SIZE:]:
+                cached_fn(x, cache)
+            t_warm = (time.perf_counter() - start) * len(items) / min(len(items), DEFAULT_SIZE)
+
+            assert [frozen(p) for p in plain] == cached
+            print(f"  dup {rate:.0%} {name}: plain {t_plain:.2f}s | cold cache {t_cold:.2f}s "
+                  f"({t_plain / t_cold:.1f}x, hits {cache.stats()['hit_ratio']}) | "
+                  f"warm cache ~{t_warm:.2f}s ({t_plain / t_warm:.1f}x)")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter log file name: ").strip() or "cycle_notes.txt"
+    cache_file = "parse_cache.json"
+    cache = LRUCache(DEFAULT_SIZE)
+    if cache.load(cache_file, CH8_FINGERPRINT):
+        print(f"Loaded {len(cache.data)} cached parses from {cache_file}")
+
+    days, bbt, opk, cm, symptoms = parse_file_cached(fname, cache)
+    cache.save(cache_file, CH8_FINGERPRINT)
+
+    print("=== Memoized Cycle Note Parsing ===")
+    print("Rows parsed:", len(days))
+    print("Cache:", cache.stats())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -1,5 +1,11 @@
 # Chapter 9: Dictionaries — Symptom Frequency Counter (PCOS-themed)
 
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from cycle_records import open_records   # noqa: E402  (Chapter 8: columnar records)
+
 def parse_file(fname):
     """Read all lines from cycle_notes.txt into a list (lowercased)."""
     try:
@@ -34,13 +40,31 @@ def fertile_days(lines):
                 fert_dict[day].append("CM fertile")
     return fert_dict
 
-def main():
-    lines = parse_file("cycle_notes.txt")
+def fertile_days_from_records(recs):
+    """fertile_days() computed from the Chapter 8 records columns."""
+    opk_pos = set(recs.rows_where(opk="positive"))
+    cm_fertile = set(recs.rows_where(cm=("eggwhite", "slippery", "watery")))
+    fert_dict = {}
+    for i in range(len(recs)):
+        day = recs.day_label(i)
+        if day:
+            fert_dict[day] = (["OPK+"] if i in opk_pos else []) + (["CM fertile"] if i in cm_fertile else [])
+    return fert_dict
 
+def main():
     print("=== Chapter 9: Dictionary Practice ===")
 
+    # Parsed once into the Chapter 8 columnar records, then reused
+    try:
+        recs = open_records("cycle_notes.txt")
+    except FileNotFoundError:
+        print("File not found:", "cycle_notes.txt")
+        return
+    with recs:
+        sym_counts = recs.symptom_counts()
+        fert = fertile_days_from_records(recs)
+
     # Symptom dictionary
-    sym_counts = count_symptoms(lines)
     print("\nSymptom counts:", sym_counts)
 
     if sym_counts:
@@ -48,11 +72,12 @@ def main():
         print("Most common symptom:", most_common, "(", sym_counts[most_common], "times )")
 
     # Fertile dictionary
-    fert = fertile_days(lines)
     print("\nFertile day signals:")
     for k, v in fert.items():
         if v:
             print(f"{k}: {', '.join(v)}")
 
 if __name__ == "__main__":
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
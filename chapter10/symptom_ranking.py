@@ -1,5 +1,11 @@
 # Chapter 10: Tuples — Ranking Symptoms (PCOS-themed)
 
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from cycle_records import open_records   # noqa: E402  (Chapter 8: columnar records)
+
 def parse_file(fname):
     """Read all lines from cycle_notes.txt into a list (lowercased)."""
     try:
@@ -29,11 +35,15 @@ def rank_symptoms(counts):
     return tuples
 
 def main():
-    lines = parse_file("cycle_notes.txt")
     print("=== Chapter 10: Tuple Practice ===")
 
-    # Step 1: dictionary
-    sym_counts = count_symptoms(lines)
+    # Step 1: dictionary (counted on the Chapter 8 records' symptom column)
+    try:
+        with open_records("cycle_notes.txt") as recs:
+            sym_counts = recs.symptom_counts()
+    except FileNotFoundError:
+        print("File not found:", "cycle_notes.txt")
+        sym_counts = {}
     print("\nSymptom dictionary:", sym_counts)
 
     # Step 2: convert to tuples and sort
@@ -48,4 +58,6 @@ def main():
               "(", ranked[0][0], "times )")
 
 if __name__ == "__main__":
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -3,36 +3,57 @@
 
 import re
 
-fname = input("Enter file name: ")
-if len(fname) < 1:
-    fname = "forum_posts.txt"
-fh = open(fname)
-
 # Keywords to track (medications, treatments, symptoms)
 keywords = [
-    "clomid", "metformin", "letrozole", 
+    "clomid", "metformin", "letrozole",
     "ivf", "iui",
     "cramps", "sore boobs", "acne", "spotting"
 ]
 
-# Initialize counts
-counts = {k: 0 for k in keywords}
 
-# Process each line
-for line in fh:
-    line = line.strip().lower()
-    if not line:
-        continue
+def read_posts(fh):
+    """Yield cleaned, lowercased posts (one per line), skipping blanks."""
+    for line in fh:
+        line = line.strip().lower()
+        if not line:
+            continue
+
+        # Clean up line: remove punctuation
+        yield re.sub(r'[^a-z0-9\s]', '', line)
+
 
-    # Clean up line: remove punctuation
-    line = re.sub(r'[^a-z0-9\s]', '', line)
+def count_mentions(posts, keywords=keywords):
+    """Count how many posts mention each keyword (whole-word match)."""
+    # Initialize counts
+    counts = {k: 0 for k in keywords}
+    patterns = [(k, re.compile(r'\b' + re.escape(k) + r'\b')) for k in keywords]
 
     # Count keyword mentions
-    for k in keywords:
-        if re.search(r'\b' + re.escape(k) + r'\b', line):
-            counts[k] += 1
-
-# Print results
-print("Mentions Count:")
-for k, v in counts.items():
-    print(f"{k}: {v}")
+    for line in posts:
+        for k, pat in patterns:
+            if pat.search(line):
+                counts[k] += 1
+    return counts
+
+
+def main():
+    fname = input("Enter file name: ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+
+    with open(fname) as fh:
+        counts = count_mentions(read_posts(fh))
+
+    # Print results
+    print("Mentions Count:")
+    for k, v in counts.items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
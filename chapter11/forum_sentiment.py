@@ -0,0 +1,237 @@
+# Chapter 11 add-on: Offline sentiment & emotion scoring for PCOS forum posts
+# Uses the bundled pcos_lexicon.tsv (no downloads) with VADER-style negation
+# and intensifier handling, scores posts in batches, and fans batches out to a
+# process pool while streaming the corpus from disk.
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
+from PCOS_data_miner import read_posts
+
+LEXICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pcos_lexicon.tsv")
+
+# Emotional tones from the chapter00 research questions
+EMOTIONS = ("frustration", "hope", "motivation", "confusion")
+POSITIVE_EMOTIONS = (EMOTIONS.index("hope"), EMOTIONS.index("motivation"))
+FRUSTRATION = EMOTIONS.index("frustration")
+
+NEGATION_SCALAR = -0.74     # same dampened flip VADER uses
+LOOKBACK = 3                # negators / intensifiers up to 3 words back
+DISTANCE_DECAY = (1.0, 0.95, 0.9)
+NORMALIZE_ALPHA = 15        # compound = s / sqrt(s^2 + alpha)
+
+_lexicon = None
+
+
+# --- Lexicon ---
+
+def load_lexicon(path=LEXICON_FILE):
+    """
+    Read the TSV lexicon into three lookups:
+      words:        term -> (valence, emotion index or -1)
+      negators:     set of terms
+      intensifiers: term -> weight
+    """
+    words, negators, intensifiers = {}, set(), {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            kind, term, weight = parts[0], parts[1], float(parts[2])
+            if kind == "word":
+                emotion = parts[3] if len(parts) > 3 else ""
+                words[term] = (weight, EMOTIONS.index(emotion) if emotion else -1)
+            elif kind == "negator":
+                negators.add(term)
+            elif kind == "intensifier":
+                intensifiers[term] = weight
+    return words, negators, intensifiers
+
+
+def _get_lexicon():
+    """Load the lexicon once per process (pool workers call this too)."""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = load_lexicon()
+    return _lexicon
+
+
+# --- Scoring ---
+
+def score_batch(posts, lexicon=None):
+    """
+    Score a batch of cleaned posts (see PCOS_data_miner.read_posts).
+    Returns one tuple per post: (compound, positive, negative, emotion label)
+    where compound is in [-1, 1] and label is an EMOTIONS entry or "neutral".
+    """
+    words, negators, intensifiers = lexicon or _get_lexicon()
+    get_word = words.get
+    get_boost = intensifiers.get
+    n_emotions = len(EMOTIONS)
+    out = []
+    append = out.append
+
+    for post in posts:
+        tokens = post.split()
+        pos = neg = 0.0
+        emo = [0.0] * n_emotions
+        for i, tok in enumerate(tokens):
+            entry = get_word(tok)
+            if entry is None:
+                continue
+            valence, emotion = entry
+            scalar = 1.0
+            negated = False
+            for d in range(1, min(LOOKBACK, i) + 1):
+                prev = tokens[i - d]
+                if prev in negators:
+                    negated = not negated
+                    continue
+                boost = get_boost(prev)
+                if boost is not None:
+                    scalar += boost * DISTANCE_DECAY[d - 1]
+            valence *= scalar
+            if negated:
+                valence *= NEGATION_SCALAR
+            if valence > 0:
+                pos += valence
+            else:
+                neg -= valence
+            if emotion >= 0:
+                if not negated:
+                    emo[emotion] += abs(valence)
+                elif emotion in POSITIVE_EMOTIONS:
+                    # "no hope", "not motivated" read as frustration
+                    emo[FRUSTRATION] += abs(valence)
+
+        total = pos - neg
+        compound = total / (total * total + NORMALIZE_ALPHA) ** 0.5
+        best = max(range(n_emotions), key=emo.__getitem__)
+        label = EMOTIONS[best] if emo[best] > 0 else "neutral"
+        append((round(compound, 4), round(pos, 3), round(neg, 3), label))
+    return out
+
+
+def _score_raw_batch(lines):
+    """Pool task: clean + score a batch of raw lines."""
+    return score_batch(list(read_posts(lines)))
+
+
+# --- Streaming over a corpus ---
+
+def iter_line_batches(fh, batch_size):
+    """Yield lists of raw lines, at most batch_size at a time."""
+    batch = []
+    for line in fh:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def score_corpus(fname, workers=None, batch_size=2000):
+    """
+    Stream `fname` from disk and yield per-batch result lists in file order.
+    At most 2 batches per worker are in flight, so memory stays constant
+    no matter how large the corpus is. workers=1 scores in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(fname, encoding="utf-8") as fh:
+        batches = iter_line_batches(fh, batch_size)
+        if workers == 1:
+            for batch in batches:
+                yield _score_raw_batch(batch)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_get_lexicon) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(_score_raw_batch, batch))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+def summarize(batches):
+    """Fold batch results into {"posts", "mean_compound", "labels": {...}}."""
+    n = 0
+    compound_sum = 0.0
+    labels = {e: 0 for e in EMOTIONS + ("neutral",)}
+    for results in batches:
+        for compound, _pos, _neg, label in results:
+            n += 1
+            compound_sum += compound
+            labels[label] += 1
+    return {
+        "posts": n,
+        "mean_compound": round(compound_sum / n, 4) if n else 0.0,
+        "labels": labels,
+    }
+
+
+# --- Benchmark ---
+
+def benchmark(n_posts=200000, workers=None, batch_size=2000):
+    """Score a synthetic corpus streamed from a temp file; print posts/sec."""
+    import random
+    import tempfile
+
+    samples = [
+        "I tried everything but the weight wont budge so frustrated",
+        "Finally ovulated this month small victories count",
+        "My period hasnt come in two months and Im scared its normal",
+        "Doctor dismissed me again told to just lose weight",
+        "Not hopeful after another bfn on letrozole",
+        "Really excited metformin is finally working",
+        "Is anyone else confused about clomid vs letrozole dosing",
+        "Day 3 started clomid 50mg",
+    ]
+    rng = random.Random(42)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as tmp:
+        for _ in range(n_posts):
+            tmp.write(f'"{rng.choice(samples)} {rng.choice(samples)}"\n')
+        path = tmp.name
+    try:
+        for w in sorted({1, workers or os.cpu_count() or 1}):
+            start = time.perf_counter()
+            summary = summarize(score_corpus(path, workers=w, batch_size=batch_size))
+            elapsed = time.perf_counter() - start
+            print(f"workers={w}: {summary['posts']} posts in {elapsed:.2f}s "
+                  f"→ {summary['posts'] / elapsed:,.0f} posts/sec")
+    finally:
+        os.remove(path)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter file name: ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+
+    print("=== Forum Post Sentiment & Emotion ===")
+    with open(fname, encoding="utf-8") as fh:
+        posts = list(read_posts(fh))
+    results = score_batch(posts)
+    for post, (compound, _pos, _neg, label) in list(zip(posts, results))[:20]:
+        print(f"{compound:+.2f} {label:<12} {post[:60]}")
+
+    summary = summarize([results])
+    print("\nPosts scored:", summary["posts"])
+    print("Mean compound sentiment:", summary["mean_compound"])
+    print("Emotional tones:", summary["labels"])
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,340 @@
+# Chapter 11 add-on: Incremental topic modeling for PCOS forum posts
+# Hashing vectorizer (no vocabulary kept in memory) + online variational LDA
+# (Hoffman, Blei & Bach 2010) that can partial_fit new batches of posts and
+# save/load its state, so new posts update the topics without a full refit.
+# The state also records which file it was fed and how far (identity + byte
+# offset, as in mention_trends), so each run trains only on appended posts.
+
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+
+from PCOS_data_miner import read_posts
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from incremental_notes import file_identity, same_file   # noqa: E402  (Chapter 8)
+
+STATE_FILE = "forum_topics.json"
+
+STOPWORDS = {
+    "the", "and", "for", "but", "not", "you", "your", "with", "this", "that",
+    "have", "has", "had", "was", "were", "are", "its", "im", "ive", "been",
+    "just", "from", "they", "them", "then", "than", "what", "when", "will",
+    "would", "about", "after", "before", "into", "any", "all", "can", "did",
+    "does", "dont", "out", "our", "there", "their", "also", "one", "get", "got",
+    "since", "still", "yet", "now", "how", "who", "she", "her", "him", "his",
+}
+
+
+# --- Hashing vectorizer ---
+
+def hash_tokens(post, n_features, bucket_words=None):
+    """
+    Map a cleaned post to {bucket: count} using crc32(token) % n_features.
+    If `bucket_words` is given, remember one example word per bucket so topics
+    can be printed (bounded by n_features, not by corpus vocabulary).
+    """
+    counts = {}
+    for tok in post.split():
+        if len(tok) < 3 or tok in STOPWORDS or tok.isdigit():
+            continue
+        b = zlib.crc32(tok.encode()) % n_features
+        counts[b] = counts.get(b, 0) + 1
+        if bucket_words is not None and b not in bucket_words:
+            bucket_words[b] = tok
+    return counts
+
+
+# --- Math helpers ---
+
+def digamma(x):
+    """Digamma function via recurrence + asymptotic series."""
+    result = 0.0
+    while x < 6.0:
+        result -= 1.0 / x
+        x += 1.0
+    f = 1.0 / (x * x)
+    return result + math.log(x) - 0.5 / x - f * (
+        1 / 12 - f * (1 / 120 - f * (1 / 252 - f * (1 / 240 - f / 132))))
+
+
+def exp_dirichlet_expectation(row):
+    """exp(E[log X]) for X ~ Dirichlet(row)."""
+    psi_total = digamma(sum(row))
+    return [math.exp(digamma(v) - psi_total) for v in row]
+
+
+# --- Online LDA ---
+
+class OnlineTopicModel:
+    """Online LDA over hashed term buckets."""
+
+    def __init__(self, n_topics=8, n_features=4096, alpha=None, eta=None,
+                 tau0=64.0, kappa=0.7, max_iter=30, tol=1e-3, seed=0):
+        self.n_topics = n_topics
+        self.n_features = n_features
+        self.alpha = alpha if alpha is not None else 1.0 / n_topics
+        self.eta = eta if eta is not None else 1.0 / n_topics
+        self.tau0 = tau0
+        self.kappa = kappa
+        self.max_iter = max_iter
+        self.tol = tol
+        self.n_updates = 0
+        self.n_docs_seen = 0
+        self.bucket_words = {}
+        self.source = None         # {"identity", "offset"} of the input file
+        rng = random.Random(seed)
+        # lambda: topic-term variational parameters (K x V)
+        self.lam = [[rng.gammavariate(100.0, 0.01) for _ in range(n_features)]
+                    for _ in range(n_topics)]
+
+    # --- E-step ---
+
+    def _e_step(self, docs, exp_elog_beta, collect_stats):
+        """Fit per-document topic weights; optionally gather sufficient stats."""
+        K = self.n_topics
+        alpha = self.alpha
+        sstats = [dict() for _ in range(K)] if collect_stats else None
+        gammas = []
+        for doc in docs:
+            if not doc:
+                gammas.append([alpha] * K)
+                continue
+            ids = list(doc)
+            cts = [doc[w] for w in ids]
+            beta_d = [[eb[w] for w in ids] for eb in exp_elog_beta]
+            gamma = [1.0] * K
+            exp_theta = exp_dirichlet_expectation(gamma)
+            for _ in range(self.max_iter):
+                phinorm = [sum(exp_theta[k] * beta_d[k][j] for k in range(K)) + 1e-100
+                           for j in range(len(ids))]
+                ratio = [c / p for c, p in zip(cts, phinorm)]
+                new_gamma = [alpha + exp_theta[k] * sum(r * b for r, b in zip(ratio, beta_d[k]))
+                             for k in range(K)]
+                change = sum(abs(a - b) for a, b in zip(new_gamma, gamma)) / K
+                gamma = new_gamma
+                exp_theta = exp_dirichlet_expectation(gamma)
+                if change < self.tol:
+                    break
+            gammas.append(gamma)
+            if collect_stats:
+                phinorm = [sum(exp_theta[k] * beta_d[k][j] for k in range(K)) + 1e-100
+                           for j in range(len(ids))]
+                for k in range(K):
+                    row = sstats[k]
+                    et = exp_theta[k]
+                    for j, w in enumerate(ids):
+                        row[w] = row.get(w, 0.0) + et * cts[j] / phinorm[j] * beta_d[k][j]
+        return gammas, sstats
+
+    def _exp_elog_beta(self):
+        return [exp_dirichlet_expectation(row) for row in self.lam]
+
+    # --- Public API ---
+
+    def vectorize(self, posts):
+        return [hash_tokens(p, self.n_features, self.bucket_words) for p in posts]
+
+    def partial_fit(self, posts):
+        """Update the topics with one mini-batch of cleaned posts."""
+        docs = self.vectorize(posts)
+        if not docs:
+            return self
+        self.n_docs_seen += len(docs)
+        exp_elog_beta = self._exp_elog_beta()
+        _, sstats = self._e_step(docs, exp_elog_beta, collect_stats=True)
+
+        # M-step: blend the batch estimate into lambda with step size rho
+        rho = (self.tau0 + self.n_updates) ** -self.kappa
+        scale = self.n_docs_seen / len(docs)
+        keep = 1.0 - rho
+        base = rho * self.eta
+        for k in range(self.n_topics):
+            lam_k = self.lam[k]
+            for w in range(self.n_features):
+                lam_k[w] = keep * lam_k[w] + base
+            stats_k = sstats[k]
+            for w, s in stats_k.items():
+                lam_k[w] += rho * scale * s
+        self.n_updates += 1
+        return self
+
+    def transform(self, posts):
+        """Return normalized topic proportions for each post."""
+        docs = [hash_tokens(p, self.n_features) for p in posts]
+        gammas, _ = self._e_step(docs, self._exp_elog_beta(), collect_stats=False)
+        out = []
+        for g in gammas:
+            total = sum(g)
+            out.append([round(v / total, 3) for v in g])
+        return out
+
+    def top_terms(self, n=8):
+        """Return [(topic, [word, ...]), ...] using the remembered bucket words."""
+        topics = []
+        for k, row in enumerate(self.lam):
+            ranked = sorted(range(self.n_features), key=row.__getitem__, reverse=True)
+            words = [self.bucket_words[w] for w in ranked if w in self.bucket_words][:n]
+            topics.append((k, words))
+        return topics
+
+    # --- Persistence ---
+
+    def save(self, path=STATE_FILE):
+        """Write model state to JSON (atomically via a temp file)."""
+        state = {
+            "version": 1,
+            "params": {
+                "n_topics": self.n_topics, "n_features": self.n_features,
+                "alpha": self.alpha, "eta": self.eta, "tau0": self.tau0,
+                "kappa": self.kappa, "max_iter": self.max_iter, "tol": self.tol,
+            },
+            "n_updates": self.n_updates,
+            "n_docs_seen": self.n_docs_seen,
+            "source": self.source,
+            "bucket_words": {str(b): w for b, w in self.bucket_words.items()},
+            "lambda": [[round(v, 6) for v in row] for row in self.lam],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATE_FILE):
+        with open(path, encoding="utf-8") as fh:
+            state = json.load(fh)
+        model = cls(**state["params"])
+        model.n_updates = state["n_updates"]
+        model.n_docs_seen = state["n_docs_seen"]
+        model.source = state.get("source")
+        model.bucket_words = {int(b): w for b, w in state["bucket_words"].items()}
+        model.lam = state["lambda"]
+        return model
+
+
+# --- Streaming driver ---
+
+def update_from_file(model, fname, batch_size=1000):
+    """
+    partial_fit the posts appended to `fname` since the model last saw it, in
+    mini-batches of lines. A partial last line is left for the next run.
+    """
+    src = model.source
+    if src and not same_file(fname, src):
+        raise ValueError(f"{fname} is not the file this model was trained on (or was rewritten); "
+                         "start a new state file")
+    offset = src["offset"] if src else 0
+    lines = []
+    with open(fname, "rb") as fh:
+        fh.seek(offset)
+        for raw in fh:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            lines.append(raw.decode("utf-8", errors="replace"))
+            if len(lines) >= batch_size:
+                _fit_lines(model, lines)
+                lines = []
+    _fit_lines(model, lines)
+    model.source = {"identity": file_identity(fname), "offset": offset}
+    return model
+
+
+def _fit_lines(model, lines):
+    posts = list(read_posts(lines))
+    if posts:
+        model.partial_fit(posts)
+
+
+def check_update(folder):
+    """Re-running on a grown file trains only on the appended posts."""
+    path = os.path.join(folder, "forum_topics_check.txt")
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("metformin helped my cycle\nclomid round two\n\nletrozole ovulated\n")
+    model = OnlineTopicModel(n_topics=2, n_features=64)
+    update_from_file(model, path)
+    assert model.n_docs_seen == 3, model.n_docs_seen
+    update_from_file(model, path)
+    assert model.n_docs_seen == 3 and model.n_updates == 1, (model.n_docs_seen, model.n_updates)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("spotting again\nhalf a li")
+    update_from_file(model, path)
+    assert model.n_docs_seen == 4, model.n_docs_seen
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("ne finished\n")
+    state = os.path.join(folder, "forum_topics_check.json")
+    model.save(state)
+    model = OnlineTopicModel.load(state)
+    update_from_file(model, path)
+    assert model.n_docs_seen == 5, model.n_docs_seen
+    os.remove(state)
+    os.remove(path)
+    return True
+
+
+def benchmark(n_posts=10000, batch_size=1000):
+    """Time one partial_fit pass over n_posts synthetic posts."""
+    import tempfile
+    check_update(tempfile.gettempdir())
+    print("✅ re-runs train only on appended posts (partial last line waits)")
+    themes = [
+        "cycle missed spotting period late irregular months",
+        "metformin diet weight acne insulin budge",
+        "doctor diagnosis dismissed appointment blood tests",
+        "letrozole clomid ovulated positive opk follicle",
+        "community hope progress support victories",
+    ]
+    rng = random.Random(1)
+    posts = []
+    for _ in range(n_posts):
+        words = rng.choice(themes).split() + rng.choice(themes).split()[:2]
+        rng.shuffle(words)
+        posts.append(" ".join(words))
+    model = OnlineTopicModel(n_topics=5)
+    start = time.perf_counter()
+    for i in range(0, n_posts, batch_size):
+        model.partial_fit(posts[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    print(f"partial_fit over {n_posts} posts: {elapsed:.2f}s")
+    for k, words in model.top_terms(6):
+        print(f"  Topic {k}: {', '.join(words)}")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter file name: ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+
+    if os.path.exists(STATE_FILE):
+        model = OnlineTopicModel.load(STATE_FILE)
+        print(f"Loaded topic model ({model.n_docs_seen} posts seen so far)")
+    else:
+        model = OnlineTopicModel()
+        print("Starting a new topic model")
+
+    try:
+        update_from_file(model, fname)
+    except (OSError, ValueError) as e:
+        print("❌", e)
+        return
+    model.save(STATE_FILE)
+
+    print("=== Forum Topics ===")
+    for k, words in model.top_terms():
+        print(f"Topic {k}: {', '.join(words)}")
+    print(f"\n💾 Model updated ({model.n_docs_seen} posts) and saved to {STATE_FILE}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,489 @@
+# Chapter 11 add-on: Windowed keyword trends over timestamped forum posts
+# PCOS_data_miner prints one all-time count per keyword, so "did letrozole
+# overtake clomid this year?" means rescanning everything per period. This
+# aggregator streams posts of the form "YYYY-MM-DD[Thh:mm...]<TAB>post" and
+# keeps, per keyword:
+#   - tumbling day / week / month counts in fixed-size ring buffers
+#     (one array row per period, oldest rows reused)
+#   - sliding 7- and 30-day totals, updated as days enter and leave the window
+#   - a spike alert when a period closes well above its recent baseline
+# State is saved with the byte offset reached in the input file, so appending
+# new posts only processes the new lines.
+
+import datetime
+import json
+import math
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+from PCOS_data_miner import keywords
+from stream_sketches import keyword_pattern
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from incremental_notes import file_identity, same_file   # noqa: E402  (Chapter 8)
+
+CAPACITY = {"day": 400, "week": 156, "month": 60}       # periods kept per granularity
+SLIDING_DAYS = (7, 30)
+BASELINE = 14             # previous periods a closing period is compared with
+SPIKE_Z = 4.0             # standard deviations above the baseline mean ...
+SPIKE_RATIO = 2.0         # ... and at least this multiple of it
+MIN_SPIKE_COUNT = 5
+MAGIC = b"TRND"
+
+Spike = namedtuple("Spike", "keyword granularity period count baseline")
+
+_clean = re.compile(r"[^a-z0-9\s]")
+
+
+def period_of(granularity, day):
+    """Period id of a date: day ordinal, Monday-aligned week number or month number."""
+    if granularity == "day":
+        return day.toordinal()
+    if granularity == "week":
+        return (day.toordinal() - 1) // 7         # ordinal 1 (0001-01-01) is a Monday
+    return day.year * 12 + day.month - 1
+
+
+def period_label(granularity, period):
+    if granularity == "day":
+        return datetime.date.fromordinal(period).isoformat()
+    if granularity == "week":
+        year, week, _ = datetime.date.fromordinal(period * 7 + 1).isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{period // 12}-{period % 12 + 1:02d}"
+
+
+class PeriodRing:
+    """Counts per (period, keyword) for the latest `capacity` periods of one granularity."""
+
+    def __init__(self, n_keys, capacity):
+        self.n_keys = n_keys
+        self.capacity = capacity
+        self.counts = array("I", bytes(4 * n_keys * capacity))
+        self.first = -1           # earliest period ever seen
+        self.latest = -1          # current (open) period; -1 before any data
+
+    def _row(self, period):
+        return (period % self.capacity) * self.n_keys
+
+    def holds(self, period):
+        return self.latest - self.capacity < period <= self.latest
+
+    def advance(self, period):
+        """Open `period`: clear the rows it and any skipped periods reuse."""
+        if self.latest < 0:
+            self.first = period
+        n = self.n_keys
+        for p in range(max(self.latest + 1, period - self.capacity + 1), period + 1):
+            r = self._row(p)
+            self.counts[r:r + n] = array("I", bytes(4 * n))
+        self.latest = period
+
+    def add(self, period, key, n=1):
+        self.counts[self._row(period) + key] += n
+
+    def get(self, period, key):
+        if not self.holds(period) or period < self.first:
+            return 0
+        return self.counts[self._row(period) + key]
+
+
+class MentionTrends:
+    """Streaming tumbling/sliding keyword counts with spike alerts."""
+
+    def __init__(self, keywords=keywords, capacity=None, sliding=SLIDING_DAYS, baseline=BASELINE,
+                 z=SPIKE_Z, ratio=SPIKE_RATIO, min_count=MIN_SPIKE_COUNT, on_alert=None):
+        self.keywords = list(keywords)
+        self.index = {kw: i for i, kw in enumerate(self.keywords)}
+        self.capacity = dict(CAPACITY, **(capacity or {}))
+        if max(sliding, default=0) >= self.capacity["day"] or baseline >= min(self.capacity.values()):
+            raise ValueError("sliding windows and baseline must fit inside the ring capacity")
+        self.rings = {g: PeriodRing(len(self.keywords), c) for g, c in self.capacity.items()}
+        self.sliding = {w: array("I", bytes(4 * len(self.keywords))) for w in sliding}
+        self.baseline = baseline
+        self.z = z
+        self.ratio = ratio
+        self.min_count = min_count
+        self.on_alert = on_alert
+        self.alerts = []
+        self.posts = 0
+        self.late_dropped = 0      # posts too old for at least one ring
+        self.source = None         # {"identity", "offset"} of the input file
+        self._pattern = keyword_pattern(self.keywords)
+
+    # --- ingest ---
+
+    def add(self, day, text):
+        """Count one cleaned post dated `day`; return the spikes this closed."""
+        self.posts += 1
+        spikes = []
+        hits = [self.index[kw] for kw in set(self._pattern.findall(text))]
+        dropped = False
+        for g, ring in self.rings.items():
+            period = period_of(g, day)
+            if period > ring.latest:
+                if ring.latest >= 0:
+                    spikes += self._close(g, ring)
+                if g == "day":
+                    self._slide(ring, period)
+                ring.advance(period)
+            elif not ring.holds(period):
+                dropped = True
+                continue
+            for k in hits:
+                ring.add(period, k)
+            if g == "day":
+                for w, totals in self.sliding.items():
+                    if period > ring.latest - w:
+                        for k in hits:
+                            totals[k] += 1
+        self.late_dropped += dropped
+        if spikes:
+            self.alerts += spikes
+            if self.on_alert:
+                for s in spikes:
+                    self.on_alert(s)
+        return spikes
+
+    def add_posts(self, posts):
+        spikes = []
+        for day, text in posts:
+            spikes += self.add(day, text)
+        return spikes
+
+    def _slide(self, ring, new):
+        """Drop the days that leave each sliding window when day `new` opens."""
+        old = ring.latest
+        if old < 0:
+            return
+        n = ring.n_keys
+        for w, totals in self.sliding.items():
+            if new - old >= w:
+                totals[:] = array("I", bytes(4 * n))
+                continue
+            for d in range(max(old - w + 1, ring.first), new - w + 1):
+                r = ring._row(d)
+                for k in range(n):
+                    totals[k] -= ring.counts[r + k]
+
+    def _close(self, g, ring):
+        """Spike check for the period that is about to close (ring.latest)."""
+        p = ring.latest
+        spikes = []
+        history = [q for q in range(p - self.baseline, p) if q >= ring.first]
+        if len(history) < 3:
+            return spikes
+        for k, kw in enumerate(self.keywords):
+            count = ring.get(p, k)
+            if count < self.min_count:
+                continue
+            base = [ring.get(q, k) for q in history]
+            mean = sum(base) / len(base)
+            sd = math.sqrt(sum((b - mean) ** 2 for b in base) / len(base))
+            if count > mean + self.z * max(sd, math.sqrt(mean), 1.0) and count >= self.ratio * mean:
+                spikes.append(Spike(kw, g, period_label(g, p), count, round(mean, 1)))
+        return spikes
+
+    # --- queries ---
+
+    def series(self, keyword, granularity="month", n=12):
+        """[(period label, count)] for the last n periods (the newest may still be open)."""
+        ring, k = self.rings[granularity], self.index[keyword]
+        if ring.latest < 0:
+            return []
+        start = max(ring.latest - min(n, ring.capacity) + 1, ring.first)
+        return [(period_label(granularity, p), ring.get(p, k)) for p in range(start, ring.latest + 1)]
+
+    def sliding_counts(self):
+        """{window days: {keyword: posts in the trailing window ending today}}."""
+        return {w: dict(zip(self.keywords, totals)) for w, totals in self.sliding.items()}
+
+    def crossovers(self, a, b, granularity="month", n=None):
+        """Periods where keyword a rose above keyword b after being at or below it."""
+        ring = self.rings[granularity]
+        pairs = zip(self.series(a, granularity, n or ring.capacity),
+                    self.series(b, granularity, n or ring.capacity))
+        out, prev = [], None
+        for (label, ca), (_label, cb) in pairs:
+            if prev is not None and prev <= 0 < ca - cb:
+                out.append(label)
+            prev = ca - cb
+        return out
+
+    # --- persistence ---
+
+    def to_bytes(self):
+        header = {
+            "keywords": self.keywords, "capacity": self.capacity, "sliding": list(self.sliding),
+            "baseline": self.baseline, "z": self.z, "ratio": self.ratio, "min_count": self.min_count,
+            "posts": self.posts, "late_dropped": self.late_dropped, "source": self.source,
+            "rings": {g: [r.first, r.latest] for g, r in self.rings.items()},
+            "alerts": [list(s) for s in self.alerts[-100:]],
+        }
+        raw = json.dumps(header).encode("utf-8")
+        arrays = [self.rings[g].counts for g in self.capacity] + [self.sliding[w] for w in self.sliding]
+        body = b"".join(a.tobytes() for a in _little_endian(arrays))
+        return MAGIC + struct.pack("<I", len(raw)) + raw + body
+
+    @classmethod
+    def from_bytes(cls, buf):
+        if buf[:4] != MAGIC:
+            raise ValueError("not a mention-trends state file")
+        (length,) = struct.unpack_from("<I", buf, 4)
+        h = json.loads(buf[8:8 + length])
+        tr = cls(h["keywords"], h["capacity"], h["sliding"], h["baseline"], h["z"],
+                 h["ratio"], h["min_count"])
+        tr.posts, tr.late_dropped, tr.source = h["posts"], h["late_dropped"], h["source"]
+        tr.alerts = [Spike(*s) for s in h["alerts"]]
+        pos = 8 + length
+        arrays = [tr.rings[g].counts for g in tr.capacity] + [tr.sliding[w] for w in tr.sliding]
+        for arr in arrays:
+            size = arr.itemsize * len(arr)
+            arr[:] = array("I", buf[pos:pos + size])
+            pos += size
+        _little_endian(arrays, in_place=True)
+        for g, (first, latest) in h["rings"].items():
+            tr.rings[g].first, tr.rings[g].latest = first, latest
+        return tr
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fh:
+            return cls.from_bytes(fh.read())
+
+
+def _little_endian(arrays, in_place=False):
+    if sys.byteorder == "little":
+        return arrays
+    out = arrays if in_place else [array(a.typecode, a) for a in arrays]
+    for a in out:
+        a.byteswap()
+    return out
+
+
+# --- Reading ---
+
+def read_dated_posts(fh, stats=None):
+    """Yield (date, cleaned text) from binary lines 'timestamp<TAB>post'; skip undated lines."""
+    dates = {}
+    for raw in fh:
+        line = raw.decode("utf-8", errors="replace")
+        stamp, sep, text = line.partition("\t")
+        day = dates.get(stamp[:10]) if sep else None
+        if day is None and sep:
+            try:
+                day = dates[stamp[:10]] = datetime.date.fromisoformat(stamp[:10])
+            except ValueError:
+                day = None
+        if day is None:
+            if stats is not None:
+                stats["undated"] = stats.get("undated", 0) + 1
+            continue
+        yield day, _clean.sub("", text.strip().lower())
+
+
+def _complete_lines(fh):
+    """Lines ending in a newline; a partial last line is left for the next run."""
+    for line in fh:
+        if not line.endswith(b"\n"):
+            return
+        yield line
+
+
+def update_from_file(trends, fname, stats=None):
+    """Feed the lines appended to `fname` since the last update; return new spikes."""
+    src = trends.source
+    if src is None:
+        offset = 0
+    elif same_file(fname, src):
+        offset = src["offset"]            # may be 0: saved from an empty or partial-line file
+    else:
+        raise ValueError(f"{fname} is not the file this state was built from (or was rewritten); "
+                         "start a new state file")
+    with open(fname, "rb") as fh:
+        fh.seek(offset)
+        counted = _CountingLines(_complete_lines(fh))
+        spikes = trends.add_posts(read_dated_posts(counted, stats))
+    trends.source = {"identity": file_identity(fname), "offset": offset + counted.bytes}
+    return spikes
+
+
+class _CountingLines:
+    def __init__(self, lines):
+        self.lines = lines
+        self.bytes = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.bytes += len(line)
+            yield line
+
+
+# --- Benchmark ---
+
+def write_synthetic_posts(path, days=3 * 365, posts_per_day=600, seed=21):
+    """Clomid fades while letrozole grows; one planted metformin spike."""
+    import random
+    rng = random.Random(seed)
+    start = datetime.date(2022, 1, 1)
+    filler = ["cd21 no positive opk yet", "tww is so long", "bbt went up today", "feeling tired",
+              "doctor appointment next week", "cycle day 3 bloodwork"]
+    spike_day = days - 40
+    with open(path, "w", encoding="utf-8") as fh:
+        for d in range(days):
+            day = start + datetime.timedelta(days=d)
+            frac = d / days
+            for _ in range(posts_per_day):
+                words = [rng.choice(filler)]
+                if rng.random() < 0.06 * (1 - frac):
+                    words.append("started clomid")
+                if rng.random() < 0.01 + 0.06 * frac:
+                    words.append("switched to letrozole")
+                if rng.random() < (0.2 if d == spike_day else 0.02):
+                    words.append("metformin side effects")
+                fh.write(f"{day.isoformat()}T{rng.randint(0, 23):02d}:00\t{'. '.join(words)}\n")
+
+
+def check_against_rescan(trends, fname):
+    """Every retained period and sliding total must equal an exact rescan of the file."""
+    from collections import Counter
+    exact = {g: Counter() for g in trends.rings}
+    days = Counter()
+    pattern = keyword_pattern(trends.keywords)
+    with open(fname, "rb") as fh:
+        for day, text in read_dated_posts(fh):
+            for kw in set(pattern.findall(text)):
+                days[day.toordinal(), kw] += 1
+                for g in trends.rings:
+                    exact[g][period_of(g, day), kw] += 1
+    for g, ring in trends.rings.items():
+        for p in range(max(ring.latest - ring.capacity + 1, ring.first), ring.latest + 1):
+            for k, kw in enumerate(trends.keywords):
+                assert ring.get(p, k) == exact[g][p, kw], (g, p, kw)
+    today = trends.rings["day"].latest
+    for w, totals in trends.sliding_counts().items():
+        for kw, n in totals.items():
+            assert n == sum(days[d, kw] for d in range(today - w + 1, today + 1)), (w, kw)
+    return True
+
+
+def check_resume_from_start(folder):
+    """A state saved at offset 0 (empty file, or only a partial line) resumes, not raises."""
+    path = os.path.join(folder, "resume_check.txt")
+    state = os.path.join(folder, "resume_check.trends")
+    open(path, "w").close()
+    trends = MentionTrends()
+    update_from_file(trends, path)
+    assert trends.source["offset"] == 0
+    trends.save(state)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("2024-03-01\tstarted letro")             # no newline yet
+    trends = MentionTrends.load(state)
+    update_from_file(trends, path)
+    assert trends.source["offset"] == 0
+    trends.save(state)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("zole today\n2024-03-02\tclomid round 2\n")
+    trends = MentionTrends.load(state)
+    update_from_file(trends, path)
+    assert trends.sliding_counts()[7] == {kw: int(kw in ("letrozole", "clomid"))
+                                          for kw in trends.keywords}
+    os.remove(path)
+    os.remove(state)
+    return True
+
+
+def benchmark(days=3 * 365, posts_per_day=600):
+    import tempfile
+    folder = tempfile.mkdtemp(prefix="trends_")
+    path = os.path.join(folder, "dated_posts.txt")
+    state = os.path.join(folder, "dated_posts.trends")
+    write_synthetic_posts(path, days, posts_per_day)
+    n_posts = days * posts_per_day
+    try:
+        assert check_resume_from_start(folder)
+        print("✅ states saved from an empty or partial-line file resume")
+        start = time.perf_counter()
+        full = MentionTrends()
+        update_from_file(full, path)
+        t_full = time.perf_counter() - start
+        print(f"{n_posts:,} posts over {days} days: one pass {t_full:.2f}s "
+              f"({n_posts / t_full:,.0f} posts/sec), state {len(full.to_bytes()) / 1024:.0f} KB")
+        assert check_against_rescan(full, path)
+        print("  ring buffers and sliding totals match an exact rescan")
+
+        # the same data arriving in two parts: resume from the saved state
+        with open(path, "rb") as fh:
+            data = fh.read()
+        cut = data.index(b"\n", len(data) * 9 // 10) + 1
+        with open(path, "wb") as fh:
+            fh.write(data[:cut])
+        first = MentionTrends()
+        update_from_file(first, path)
+        first.save(state)
+        with open(path, "ab") as fh:
+            fh.write(data[cut:])
+        start = time.perf_counter()
+        resumed = MentionTrends.load(state)
+        update_from_file(resumed, path)
+        t_append = time.perf_counter() - start
+        same = (all(resumed.rings[g].counts == full.rings[g].counts for g in full.rings)
+                and resumed.sliding == full.sliding and resumed.alerts == full.alerts)
+        print(f"  append last 10%: {t_append:.2f}s vs {t_full:.2f}s rescan; "
+              f"state identical to one pass: {same}")
+
+        print("  spikes:", [f"{s.keyword} {s.granularity} {s.period} ({s.count} vs ~{s.baseline})"
+                            for s in full.alerts])
+        print("  letrozole overtook clomid in:", full.crossovers("letrozole", "clomid"))
+    finally:
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter dated posts file (lines of 'YYYY-MM-DD<TAB>post'): ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+    state_path = os.path.splitext(fname)[0] + ".trends"
+    trends = MentionTrends.load(state_path) if os.path.exists(state_path) else MentionTrends()
+    before = trends.posts
+    stats = {}
+    spikes = update_from_file(trends, fname, stats)
+    trends.save(state_path)
+
+    print("=== Mention Trends ===")
+    print(f"{trends.posts - before} new posts ({trends.posts} total), "
+          f"{stats.get('undated', 0)} undated lines skipped")
+    for kw in trends.keywords:
+        months = trends.series(kw, "month", 6)
+        if any(n for _, n in months):
+            print(f"  {kw:<11} " + "  ".join(f"{label}: {n}" for label, n in months))
+    for w, totals in trends.sliding_counts().items():
+        top = sorted(totals.items(), key=lambda kv: -kv[1])[:3]
+        print(f"  last {w} days: " + ", ".join(f"{kw} {n}" for kw, n in top))
+    for s in spikes:
+        print(f"  ⚠️ spike: {s.keyword} {s.count} posts in {s.granularity} {s.period} "
+              f"(baseline ~{s.baseline})")
+    print(f"\n💾 State saved to {state_path}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
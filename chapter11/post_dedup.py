@@ -0,0 +1,221 @@
+# Chapter 11 add-on: Near-duplicate post detection (MinHash + LSH banding)
+# Reposts and quoted replies inflate the keyword counts from PCOS_data_miner.
+# This stage streams the corpus once, signs each post with a one-permutation
+# MinHash over word shingles, looks it up in LSH band tables and drops posts
+# that are near-duplicates of a post it already kept.
+# Memory is fixed: at most `max_clusters` representative signatures are kept
+# (oldest evicted first), independent of corpus size.
+
+import operator
+import os
+import re
+import sys
+import time
+from array import array
+
+from PCOS_data_miner import count_mentions, read_posts
+from stream_sketches import hash64
+
+NUM_PERM = 64         # signature length
+BANDS = 16            # LSH bands x rows = NUM_PERM
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3           # word n-gram size
+THRESHOLD = 0.7       # estimated Jaccard needed to call two posts duplicates
+MAX_CLUSTERS = 200000
+
+EMPTY = (1 << 64) - 1
+
+_clean = re.compile(r"[^a-z0-9\s]")
+
+
+# --- Signatures ---
+
+def shingles(text, k=SHINGLE):
+    """Word k-gram shingles of a cleaned post (whole post if it is shorter)."""
+    words = text.split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(shingle_set, num_perm=NUM_PERM):
+    """
+    One-permutation MinHash: hash each shingle once (hash64, shared with
+    stream_sketches), use the low bits to pick a bin and keep the minimum per bin. Empty bins borrow from
+    the next non-empty bin (rotation densification) so every slot is filled.
+    """
+    sig = [EMPTY] * num_perm
+    for s in shingle_set:
+        h = hash64(s)
+        b = h % num_perm
+        if h < sig[b]:
+            sig[b] = h
+    if EMPTY in sig and any(v != EMPTY for v in sig):
+        for i in range(num_perm):
+            j = i
+            offset = 0
+            while sig[j] == EMPTY:
+                j = (j + 1) % num_perm
+                offset += 1
+            if offset:
+                sig[i] = (sig[j] + offset * 0x9E3779B97F4A7C15) & EMPTY
+    return array("Q", sig)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity from two signatures."""
+    return sum(map(operator.eq, sig_a, sig_b)) / len(sig_a)
+
+
+# --- Streaming deduplicator ---
+
+class Deduplicator:
+    """LSH index over kept posts with a bounded number of representatives."""
+
+    def __init__(self, bands=BANDS, rows=ROWS, threshold=THRESHOLD,
+                 max_clusters=MAX_CLUSTERS):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.tables = [dict() for _ in range(bands)]    # band key -> cluster id
+        self.signatures = {}                             # cluster id -> signature
+        self.sizes = {}                                  # cluster id -> posts seen
+        self.next_id = 0
+        self.seen = 0
+        self.duplicates = 0
+        self.evicted = 0
+        self.size_histogram = {}                         # size -> clusters (evicted)
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [hash(tuple(sig[b * r:(b + 1) * r])) for b in range(self.bands)]
+
+    def check(self, text):
+        """Return (is_duplicate, cluster_id) for a cleaned post and remember it."""
+        self.seen += 1
+        sig = minhash(shingles(text), self.bands * self.rows)
+        keys = self._band_keys(sig)
+        tried = set()
+        for b, key in enumerate(keys):
+            cid = self.tables[b].get(key)
+            if cid is None or cid in tried:
+                continue
+            tried.add(cid)
+            rep = self.signatures.get(cid)
+            if rep is not None and similarity(sig, rep) >= self.threshold:
+                self.sizes[cid] += 1
+                self.duplicates += 1
+                return True, cid
+        cid = self.next_id
+        self.next_id += 1
+        self.signatures[cid] = sig
+        self.sizes[cid] = 1
+        for b, key in enumerate(keys):
+            self.tables[b][key] = cid
+        if len(self.signatures) > self.max_clusters:
+            self._evict_oldest()
+        return False, cid
+
+    def _evict_oldest(self):
+        cid = next(iter(self.signatures))
+        sig = self.signatures.pop(cid)
+        size = self.sizes.pop(cid)
+        self.size_histogram[size] = self.size_histogram.get(size, 0) + 1
+        self.evicted += 1
+        for b, key in enumerate(self._band_keys(sig)):
+            if self.tables[b].get(key) == cid:
+                del self.tables[b][key]
+
+    def stats(self, top=5):
+        """Cluster statistics over everything seen so far."""
+        hist = dict(self.size_histogram)
+        for size in self.sizes.values():
+            hist[size] = hist.get(size, 0) + 1
+        largest = sorted(self.sizes.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "posts_seen": self.seen,
+            "unique_posts": self.seen - self.duplicates,
+            "duplicates_dropped": self.duplicates,
+            "clusters_with_duplicates": sum(n for size, n in hist.items() if size > 1),
+            "cluster_size_histogram": dict(sorted(hist.items())),
+            "largest_live_clusters": largest,
+            "evicted_representatives": self.evicted,
+        }
+
+
+def dedup_lines(lines, dedup=None):
+    """Yield raw lines whose cleaned text is not a near-duplicate of an earlier one."""
+    dedup = dedup or Deduplicator()
+    for line in lines:
+        text = _clean.sub("", line.strip().lower())
+        if not text.strip():
+            continue
+        is_dup, _ = dedup.check(text)
+        if not is_dup:
+            yield line
+
+
+# --- Benchmark ---
+
+def benchmark(n_posts=200000, dup_rate=0.3):
+    """Dedup a synthetic corpus with reposts / quoted replies; print throughput."""
+    import random
+
+    rng = random.Random(3)
+    vocab = ("clomid metformin letrozole ivf cramps acne spotting cycle doctor period "
+             "weight insulin hope tired ovulated opk positive negative month test "
+             "my the and after started day since told again really").split()
+    originals = []
+    lines = []
+    for _ in range(n_posts):
+        if originals and rng.random() < dup_rate:
+            words = rng.choice(originals).split()
+            if rng.random() < 0.5:
+                words = ["quote"] + words + ["same", "here"]
+            lines.append(" ".join(words) + "\n")
+        else:
+            post = " ".join(rng.choice(vocab) for _ in range(rng.randint(12, 30)))
+            originals.append(post)
+            lines.append(post + "\n")
+    dedup = Deduplicator()
+    start = time.perf_counter()
+    kept = sum(1 for _ in dedup_lines(lines, dedup))
+    elapsed = time.perf_counter() - start
+    print(f"{n_posts:,} posts → {kept:,} kept in {elapsed:.2f}s "
+          f"({n_posts / elapsed:,.0f} posts/sec); planted originals: {len(originals):,}")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    fname = input("Enter file name: ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+    out_name = os.path.splitext(fname)[0] + ".dedup.txt"
+
+    dedup = Deduplicator()
+    with open(fname, encoding="utf-8") as fh, open(out_name, "w", encoding="utf-8") as out:
+        for line in dedup_lines(fh, dedup):
+            out.write(line if line.endswith("\n") else line + "\n")
+
+    with open(fname, encoding="utf-8") as fh:
+        before = count_mentions(read_posts(fh))
+    with open(out_name, encoding="utf-8") as fh:
+        after = count_mentions(read_posts(fh))
+
+    print("=== Near-Duplicate Post Removal ===")
+    for k, v in dedup.stats().items():
+        print(f"{k}: {v}")
+    print("\nMentions Count (raw → deduplicated):")
+    for k in before:
+        print(f"{k}: {before[k]} → {after[k]}")
+    print(f"\n💾 Deduplicated posts written to {out_name}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
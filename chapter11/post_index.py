@@ -0,0 +1,815 @@
+# Chapter 11 add-on: On-disk inverted index with boolean + BM25 search
+# Indexes line-oriented text (forum posts, cycle-note logs) incrementally into
+# immutable segments. Posting lists are (doc-id gap, term frequency) pairs
+# stored as varints, so "letrozole AND spotting" no longer means rescanning
+# every file.
+#
+# Postings are cut into blocks of BLOCK entries; each block has a skip entry
+# (last doc id, end offset, max tf, min doc length). AND intersects the
+# shortest list first and leapfrogs the others through the skip entries, and
+# BM25 uses max-score pruning: once the top-k is full, terms whose upper
+# bounds cannot lift a document past the k-th score are only probed, never
+# scanned, and blocks whose bounds cannot reach the top-k are skipped.
+#
+# Measured with --bench on 1M synthetic posts (1 CPU, pure Python):
+#   linear regex scan                 1.6-2.3 s
+#   AND, rare + common term           ~10 ms   (whole-list sets: ~200 ms)
+#   BM25, rare + common term          30-45 ms (exhaustive: 340-530 ms)
+#   AND, three common terms           ~0.45 s  (whole-list sets: ~0.58 s)
+#   BM25, two common terms            ~0.7 s   (exhaustive: ~0.67 s)
+# Queries made only of common terms gain little: every list has to be
+# decoded, and on this uniform vocabulary no block bound drops below the
+# k-th score, so nothing can be skipped.
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+INDEX_DIR = "post_index"
+MANIFEST = "manifest.json"
+DOCS_FILE = "docs.bin"
+DOC_RECORD = struct.Struct("<IQI")      # source idx, byte offset, token count
+SEGMENT_DOCS = 200000                   # flush a segment every N documents
+FORMAT_VERSION = 2                      # 2: block skip tables (.skip files)
+BLOCK = 128                             # postings per skip entry
+END = 1 << 62                           # cursor position once a list is exhausted
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_clean = re.compile(r"[^a-z0-9\s]")
+
+
+def tokenize(text):
+    """Lowercase, strip punctuation (same cleanup as read_posts) and split."""
+    return _clean.sub("", text.lower()).split()
+
+
+# --- Varint encoding ---
+
+def encode_varint(n, out):
+    """Append unsigned int n to bytearray `out` as a LEB128 varint."""
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def decode_varints(buf, start, end):
+    """Decode every varint in buf[start:end] into a list of ints."""
+    values = []
+    n = shift = 0
+    for i in range(start, end):
+        b = buf[i]
+        n |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            values.append(n)
+            n = shift = 0
+    return values
+
+
+# --- Segments ---
+
+def _le(arr):
+    """Array bytes in little-endian order."""
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_segment(index_dir, name, postings, doc_lens):
+    """
+    Write {term: [(doc_id, tf), ...]} as:
+      <name>.post  concatenated varint postings, doc ids delta-encoded
+      <name>.skip  u32 skip table per term: the block last doc ids, then end
+                   offsets, then max tfs, then min doc lengths
+      <name>.terms varint term dictionary (term bytes, df, offset, length, skip index)
+    """
+    post = bytearray()
+    skip = array("I")
+    terms = bytearray()
+    for term in sorted(postings):
+        plist = postings[term]
+        start = len(post)
+        skip_at = len(skip)
+        prev = 0
+        lasts, ends, max_tfs, min_lens = [], [], [], []
+        for b in range(0, len(plist), BLOCK):
+            max_tf = 0
+            min_len = 0xFFFFFFFF
+            for doc_id, tf in plist[b:b + BLOCK]:
+                encode_varint(doc_id - prev, post)
+                encode_varint(tf, post)
+                prev = doc_id
+                if tf > max_tf:
+                    max_tf = tf
+                if doc_lens[doc_id] < min_len:
+                    min_len = doc_lens[doc_id]
+            lasts.append(prev)
+            ends.append(len(post) - start)
+            max_tfs.append(max_tf)
+            min_lens.append(min_len)
+        skip.extend(lasts)
+        skip.extend(ends)
+        skip.extend(max_tfs)
+        skip.extend(min_lens)
+        raw = term.encode("utf-8")
+        encode_varint(len(raw), terms)
+        terms.extend(raw)
+        encode_varint(len(plist), terms)
+        encode_varint(start, terms)
+        encode_varint(len(post) - start, terms)
+        encode_varint(skip_at, terms)
+    with open(os.path.join(index_dir, name + ".post"), "wb") as fh:
+        fh.write(post)
+    with open(os.path.join(index_dir, name + ".skip"), "wb") as fh:
+        fh.write(_le(skip))
+    with open(os.path.join(index_dir, name + ".terms"), "wb") as fh:
+        fh.write(terms)
+
+
+def read_skip_table(path):
+    """Load a .skip file into an array of u32."""
+    skip = array("I")
+    with open(path, "rb") as fh:
+        skip.frombytes(fh.read())
+    if sys.byteorder != "little":
+        skip.byteswap()
+    return skip
+
+
+def read_term_dict(path):
+    """Load a .terms file into {term: (df, offset, length, skip index)}."""
+    with open(path, "rb") as fh:
+        buf = fh.read()
+    out = {}
+    i = 0
+    n = len(buf)
+    while i < n:
+        vals = []
+        # term length, then term bytes, then df/offset/length/skip index
+        length = shift = 0
+        while True:
+            b = buf[i]
+            i += 1
+            length |= (b & 0x7F) << shift
+            if not b & 0x80:
+                break
+            shift += 7
+        term = buf[i:i + length].decode("utf-8")
+        i += length
+        for _ in range(4):
+            v = shift = 0
+            while True:
+                b = buf[i]
+                i += 1
+                v |= (b & 0x7F) << shift
+                if not b & 0x80:
+                    break
+                shift += 7
+            vals.append(v)
+        out[term] = tuple(vals)
+    return out
+
+
+# --- Cursors ---
+
+class PostingCursor:
+    """
+    Forward-only cursor over one term's postings in every segment. Only the
+    block holding the current position is decoded; advance() jumps whole
+    blocks (and whole segments) through the skip table.
+    """
+
+    __slots__ = ("parts", "df", "doc", "tf", "p", "buf", "start", "lasts", "ends",
+                 "blk", "docs", "tfs", "i", "bounds")
+
+    def __init__(self, parts, df):
+        self.parts = parts      # [(buf, start, lasts, ends), ...] in doc-id order
+        self.df = df
+        self.bounds = None      # per part, per block score bounds (set by search_bm25)
+        self._enter(0)
+
+    def _enter(self, p):
+        self.p = p
+        if p == len(self.parts):
+            self.doc = END
+            self.tf = 0
+            return False
+        self.buf, self.start, self.lasts, self.ends = self.parts[p]
+        self._load(0)
+        return True
+
+    def _load(self, blk):
+        self.blk = blk
+        lo = self.start + (self.ends[blk - 1] if blk else 0)
+        vals = decode_varints(self.buf, lo, self.start + self.ends[blk])
+        docs = list(accumulate(vals[0::2], initial=self.lasts[blk - 1] if blk else 0))
+        del docs[0]
+        self.docs = docs
+        self.tfs = vals[1::2]
+        self.i = 0
+        self.doc = docs[0]
+        self.tf = self.tfs[0]
+
+    def next(self):
+        i = self.i + 1
+        if i < len(self.docs):
+            self.i = i
+            self.doc = self.docs[i]
+            self.tf = self.tfs[i]
+        elif self.blk + 1 < len(self.lasts):
+            self._load(self.blk + 1)
+        else:
+            self._enter(self.p + 1)
+
+    def block_last(self):
+        return self.lasts[self.blk] if self.doc != END else END
+
+    def block_bound(self):
+        return self.bounds[self.p][self.blk]
+
+    def advance(self, target):
+        """Move to the first posting with doc id >= target (END if none)."""
+        if self.doc >= target:
+            return
+        while self.lasts[-1] < target:
+            if not self._enter(self.p + 1):
+                return
+        if self.lasts[self.blk] < target:
+            self._load(bisect_left(self.lasts, target, self.blk + 1))
+        i = bisect_left(self.docs, target, self.i)
+        self.i = i
+        self.doc = self.docs[i]
+        self.tf = self.tfs[i]
+
+
+class ListCursor:
+    """The PostingCursor interface over an already computed sorted doc-id list."""
+
+    __slots__ = ("ids", "df", "doc", "i")
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.df = len(ids)
+        self.i = 0
+        self.doc = ids[0] if ids else END
+
+    def next(self):
+        self.i += 1
+        self.doc = self.ids[self.i] if self.i < self.df else END
+
+    def advance(self, target):
+        if self.doc >= target:
+            return
+        self.i = bisect_left(self.ids, target, self.i)
+        self.doc = self.ids[self.i] if self.i < self.df else END
+
+
+def intersect(cursors):
+    """Doc ids present in every cursor; the rarest list leads, the others leapfrog."""
+    if not cursors:
+        return []
+    cursors = sorted(cursors, key=lambda c: c.df)
+    lead, others = cursors[0], cursors[1:]
+    out = []
+    doc = lead.doc
+    while doc != END:
+        for c in others:
+            c.advance(doc)
+            if c.doc != doc:
+                lead.advance(c.doc)
+                break
+        else:
+            out.append(doc)
+            lead.next()
+        doc = lead.doc
+    return out
+
+
+# --- Index ---
+
+class PostIndex:
+    """A directory of immutable segments plus a doc table and manifest."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        path = os.path.join(index_dir, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.manifest = json.load(fh)
+        else:
+            self.manifest = self._empty_manifest()
+        if self.manifest.get("version") != FORMAT_VERSION:
+            print(f"⚠️ {index_dir} was built by an older version — rebuilding it.")
+            self._reset()
+        self._segments = []
+        for name in self.manifest["segments"]:
+            self._open_segment(name)
+        self.doc_lens = array("I")
+        self._load_doc_lens()
+
+    # --- loading ---
+
+    @staticmethod
+    def _empty_manifest():
+        return {"version": FORMAT_VERSION, "n_docs": 0, "total_len": 0,
+                "segments": [], "sources": []}
+
+    def _reset(self):
+        for name in self.manifest.get("segments", ()):
+            for ext in (".post", ".skip", ".terms"):
+                path = os.path.join(self.index_dir, name + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+        path = os.path.join(self.index_dir, DOCS_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+        self.manifest = self._empty_manifest()
+        self._save_manifest()
+
+    def _open_segment(self, name):
+        terms = read_term_dict(os.path.join(self.index_dir, name + ".terms"))
+        skip = read_skip_table(os.path.join(self.index_dir, name + ".skip"))
+        post_path = os.path.join(self.index_dir, name + ".post")
+        if os.path.getsize(post_path):
+            with open(post_path, "rb") as fh:
+                buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = b""
+        self._segments.append((terms, skip, buf))
+
+    def _load_doc_lens(self):
+        path = os.path.join(self.index_dir, DOCS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as fh:
+            # records past n_docs are from a run that died before its manifest
+            data = fh.read(self.manifest["n_docs"] * DOC_RECORD.size)
+        self.doc_lens = array("I", (rec[2] for rec in DOC_RECORD.iter_unpack(data)))
+
+    def _save_manifest(self):
+        path = os.path.join(self.index_dir, MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1)
+        os.replace(path + ".tmp", path)
+
+    # --- building ---
+
+    def add_file(self, fname):
+        """
+        Index every non-blank line of `fname` as one document. Files are
+        treated as append-only logs: if the file was indexed before, only the
+        bytes after the previously indexed offset are read. A last line
+        without its newline is still being written and is left for next time.
+        """
+        fname = os.path.abspath(fname)
+        sources = self.manifest["sources"]
+        src_idx = next((i for i, s in enumerate(sources) if s["path"] == fname), None)
+        if src_idx is None:
+            sources.append({"path": fname, "indexed_bytes": 0})
+            src_idx = len(sources) - 1
+        source = sources[src_idx]
+        size = os.path.getsize(fname)
+        if size < source["indexed_bytes"]:
+            print(f"⚠️ {fname} shrank since it was indexed — rebuild the index to pick it up.")
+            return 0
+
+        doc_id = self.manifest["n_docs"]
+        added = 0
+        postings = {}
+        docs_path = os.path.join(self.index_dir, DOCS_FILE)
+        docs_out = open(docs_path, "r+b" if os.path.exists(docs_path) else "wb")
+        try:
+            # drop doc records written after the last manifest save (crashed run)
+            docs_out.truncate(doc_id * DOC_RECORD.size)
+            docs_out.seek(0, os.SEEK_END)
+            with open(fname, "rb") as fh:
+                fh.seek(source["indexed_bytes"])
+                offset = source["indexed_bytes"]
+                for raw in fh:
+                    if not raw.endswith(b"\n"):
+                        break
+                    line_offset = offset
+                    offset += len(raw)
+                    tokens = tokenize(raw.decode("utf-8", errors="replace"))
+                    if not tokens:
+                        continue
+                    tf = {}
+                    for t in tokens:
+                        tf[t] = tf.get(t, 0) + 1
+                    for t, c in tf.items():
+                        plist = postings.get(t)
+                        if plist is None:
+                            postings[t] = [(doc_id, c)]
+                        else:
+                            plist.append((doc_id, c))
+                    docs_out.write(DOC_RECORD.pack(src_idx, line_offset, len(tokens)))
+                    self.doc_lens.append(len(tokens))
+                    self.manifest["total_len"] += len(tokens)
+                    doc_id += 1
+                    added += 1
+                    if added % SEGMENT_DOCS == 0:
+                        self._flush(postings, doc_id, source, offset, docs_out)
+                        postings = {}
+            self._flush(postings, doc_id, source, offset, docs_out)
+        finally:
+            docs_out.close()
+        return added
+
+    def _flush(self, postings, n_docs, source, offset, docs_out):
+        """Persist a segment, then the manifest that makes it visible."""
+        docs_out.flush()
+        if postings:
+            name = f"seg{len(self.manifest['segments']):05d}"
+            write_segment(self.index_dir, name, postings, self.doc_lens)
+            self.manifest["segments"].append(name)
+            self._open_segment(name)
+        self.manifest["n_docs"] = n_docs
+        source["indexed_bytes"] = offset
+        self._save_manifest()
+
+    # --- querying ---
+
+    def cursor(self, term):
+        """A PostingCursor over `term`, or None if no document has it."""
+        parts = []
+        df = 0
+        for terms, skip, buf in self._segments:
+            entry = terms.get(term)
+            if entry is None:
+                continue
+            n, start, _length, at = entry
+            blocks = -(-n // BLOCK)
+            parts.append((buf, start, skip[at:at + blocks], skip[at + blocks:at + 2 * blocks]))
+            df += n
+        return PostingCursor(parts, df) if parts else None
+
+    def postings(self, term):
+        """Return [(doc_id, tf), ...] for `term` across all segments."""
+        out = []
+        for terms, _skip, buf in self._segments:
+            entry = terms.get(term)
+            if entry is None:
+                continue
+            _df, start, length, _at = entry
+            vals = decode_varints(buf, start, start + length)
+            doc = 0
+            for i in range(0, len(vals), 2):
+                doc += vals[i]
+                out.append((doc, vals[i + 1]))
+        return out
+
+    def doc_ids(self, term):
+        return [d for d, _ in self.postings(term)]
+
+    def _and(self, result, terms):
+        """result (sorted ids, or None for "everything") AND every term in `terms`."""
+        cursors = [] if result is None else [ListCursor(result)]
+        for term in terms:
+            c = self.cursor(term)
+            if c is None:
+                return []
+            cursors.append(c)
+        if len(cursors) == 1 and result is None:
+            return self.doc_ids(terms[0])
+        return intersect(cursors)
+
+    def _not(self, result, term):
+        c = self.cursor(term)
+        if c is None:
+            return result
+        out = []
+        for doc in result:
+            c.advance(doc)
+            if c.doc != doc:
+                out.append(doc)
+        return out
+
+    def search_boolean(self, query):
+        """
+        Evaluate a left-to-right boolean query, e.g.
+          "letrozole AND spotting", "clomid OR letrozole", "spotting NOT clomid".
+        Adjacent terms without an operator are ANDed. Runs of ANDed terms are
+        intersected together, rarest term first.
+        """
+        result = None      # sorted doc ids so far; None until a term has been seen
+        run = []           # terms waiting to be ANDed onto result
+        seen = False
+        op = "AND"
+        for word in query.split():
+            upper = word.upper()
+            if upper in ("AND", "OR", "NOT"):
+                op = upper
+                continue
+            term_tokens = tokenize(word)
+            if not term_tokens:
+                continue
+            term = term_tokens[0]
+            if not seen:
+                seen = True
+                if op == "NOT":
+                    result = []
+                else:
+                    run.append(term)
+            elif op == "AND":
+                run.append(term)
+            else:
+                if run:
+                    result = self._and(result, run)
+                    run = []
+                if op == "OR":
+                    result = sorted(set(result).union(self.doc_ids(term)))
+                else:
+                    result = self._not(result, term)
+            op = "AND"
+        if run:
+            result = self._and(result, run)
+        return result or []
+
+    def search_bm25(self, query, k=10):
+        """
+        Return the top-k [(score, doc_id), ...] by Okapi BM25.
+
+        Max-score pruning: terms are ordered by their score upper bound (from
+        the block max tf / min length). Once the top-k is full, the low-bound
+        terms that together cannot beat the k-th score stop driving the scan
+        and are only probed (via skips) for documents the others produce, and
+        runs of blocks whose bounds cannot beat it are skipped undecoded.
+        """
+        n_docs = self.manifest["n_docs"]
+        if not n_docs or k <= 0:
+            return []
+        avgdl = self.manifest["total_len"] / n_docs
+        doc_lens = self.doc_lens
+        k1 = BM25_K1
+        k1p1 = BM25_K1 + 1
+        base = k1 * (1 - BM25_B)
+        per_len = k1 * BM25_B / avgdl
+
+        terms = []
+        for term in set(tokenize(query)):
+            c = self.cursor(term)
+            if c is None:
+                continue
+            idf = math.log(1 + (n_docs - c.df + 0.5) / (c.df + 0.5))
+            c.bounds = []
+            for terms_, skip, _buf in self._segments:
+                entry = terms_.get(term)
+                if entry is None:
+                    continue
+                n, _start, _length, at = entry
+                blocks = -(-n // BLOCK)
+                c.bounds.append([idf * tf * k1p1 / (tf + base + per_len * dl) for tf, dl in
+                                 zip(skip[at + 2 * blocks:at + 3 * blocks], skip[at + 3 * blocks:at + 4 * blocks])])
+            terms.append((max(map(max, c.bounds)), idf, c))
+        if not terms:
+            return []
+        terms.sort(key=lambda t: t[0])
+        upto = list(accumulate(t[0] for t in terms))   # upto[i] = bound of terms[0..i]
+
+        heap = []          # (score, -doc) min-heap of the current top-k
+        threshold = 0.0
+        first = 0          # terms[first:] are essential: they drive the scan
+        checked = -1       # docs up to here already passed the block-bound test
+        n_terms = len(terms)
+        while first < n_terms:
+            essential = terms[first:]
+            doc = min(c.doc for _, _, c in essential)
+            if doc == END:
+                break
+            if doc > checked and len(heap) == k:
+                # until the first essential block ends, the block bounds cap every score
+                last = min(c.block_last() for _, _, c in essential)
+                bound = upto[first - 1] if first else 0.0
+                for _, _, c in essential:
+                    if c.doc <= last:
+                        bound += c.block_bound()
+                if bound <= threshold:
+                    for _, _, c in essential:
+                        c.advance(last + 1)
+                    continue
+                checked = last
+            norm = base + per_len * doc_lens[doc]
+            score = 0.0
+            for _, idf, c in essential:
+                if c.doc == doc:
+                    tf = c.tf
+                    score += idf * tf * k1p1 / (tf + norm)
+                    c.next()
+            for i in range(first - 1, -1, -1):
+                if score + upto[i] <= threshold:
+                    break
+                _, idf, c = terms[i]
+                c.advance(doc)
+                if c.doc == doc:
+                    tf = c.tf
+                    score += idf * tf * k1p1 / (tf + norm)
+            else:
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -doc))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, -doc))
+                if len(heap) == k:
+                    threshold = heap[0][0]
+                    while first < n_terms and upto[first] <= threshold:
+                        first += 1
+        heap.sort(reverse=True)
+        return [(round(s, 4), -d) for s, d in heap]
+
+    def document(self, doc_id):
+        """Return (source path, original line) for a doc id."""
+        with open(os.path.join(self.index_dir, DOCS_FILE), "rb") as fh:
+            fh.seek(doc_id * DOC_RECORD.size)
+            src_idx, offset, _ = DOC_RECORD.unpack(fh.read(DOC_RECORD.size))
+        path = self.manifest["sources"][src_idx]["path"]
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            return path, fh.readline().decode("utf-8", errors="replace").strip()
+
+
+# --- Checks / benchmark ---
+
+def _reference_boolean(idx, query):
+    """The plain set-based evaluation search_boolean must agree with."""
+    result = None
+    op = "AND"
+    for word in query.split():
+        if word.upper() in ("AND", "OR", "NOT"):
+            op = word.upper()
+            continue
+        ids = set(idx.doc_ids(tokenize(word)[0]))
+        if result is None:
+            result = set() if op == "NOT" else ids
+        elif op == "AND":
+            result &= ids
+        elif op == "OR":
+            result |= ids
+        else:
+            result -= ids
+        op = "AND"
+    return sorted(result or ())
+
+
+def _reference_bm25(idx, query, k):
+    """Exhaustive BM25 scores (top-k values only; ties may pick other docs)."""
+    n_docs = idx.manifest["n_docs"]
+    avgdl = idx.manifest["total_len"] / n_docs
+    scores = {}
+    for term in set(tokenize(query)):
+        plist = idx.postings(term)
+        if not plist:
+            continue
+        idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+        for doc, tf in plist:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * idx.doc_lens[doc] / avgdl)
+            scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return sorted(scores.values(), reverse=True)[:k]
+
+
+def check_index(idx, boolean_queries, bm25_queries, k=10):
+    """Skip/leapfrog and max-score results match the exhaustive evaluations."""
+    for query in boolean_queries:
+        assert idx.search_boolean(query) == _reference_boolean(idx, query), query
+    for query in bm25_queries:
+        got = [s for s, _ in idx.search_bm25(query, k)]
+        want = _reference_bm25(idx, query, k)
+        assert len(got) == len(want) and all(abs(a - b) < 1e-3 for a, b in zip(got, want)), query
+    return True
+
+
+def check_recovery(index_dir):
+    """A partial last line waits for its newline; orphaned doc records are dropped."""
+    corpus = os.path.join(index_dir, "log.txt")
+    with open(corpus, "wb") as fh:
+        fh.write(b"letrozole day 3\nspotting again\nhalf a li")
+    idx = PostIndex(os.path.join(index_dir, "idx"))
+    assert idx.add_file(corpus) == 2
+    docs_path = os.path.join(idx.index_dir, DOCS_FILE)
+    with open(docs_path, "ab") as fh:
+        fh.write(DOC_RECORD.pack(0, 999, 5) * 3)          # a run that died before its manifest
+    with open(corpus, "ab") as fh:
+        fh.write(b"ne letrozole\n")
+    idx = PostIndex(idx.index_dir)
+    assert idx.add_file(corpus) == 1
+    assert os.path.getsize(docs_path) == 3 * DOC_RECORD.size
+    assert idx.document(2)[1] == "half a line letrozole"
+    assert idx.search_boolean("letrozole") == [0, 2]
+    return True
+
+
+def benchmark(n_docs=1000000, index_dir="post_index_bench"):
+    """Build an index over synthetic posts and compare query time to a linear scan."""
+    import random
+    import shutil
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.makedirs(index_dir)
+    check_recovery(index_dir)
+    print("✅ partial last line deferred, orphaned doc records truncated")
+
+    words = ("clomid metformin letrozole ivf iui cramps acne spotting cycle day "
+             "doctor period weight insulin hope tired ovulated opk positive negative "
+             "bbt cm eggwhite dry creamy started month test blood").split()
+    rng = random.Random(7)
+    corpus = os.path.join(index_dir, "corpus.txt")
+    with open(corpus, "w", encoding="utf-8") as fh:
+        for i in range(n_docs):
+            fh.write(" ".join(rng.choice(words) for _ in range(8)) + f" user{i % 5000}\n")
+
+    start = time.perf_counter()
+    idx = PostIndex(os.path.join(index_dir, "idx_bench"))
+    idx.add_file(corpus)
+    print(f"Indexed {n_docs:,} docs in {time.perf_counter() - start:.1f}s")
+
+    pat_a = re.compile(r"\bletrozole\b")
+    pat_b = re.compile(r"\buser42\b")
+    start = time.perf_counter()
+    with open(corpus, encoding="utf-8") as fh:
+        scan = [i for i, line in enumerate(fh) if pat_a.search(line) and pat_b.search(line)]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = idx.search_boolean("letrozole AND user42")
+    bool_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    common = idx.search_boolean("letrozole AND spotting AND cramps")
+    common_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = idx.search_bm25("user42 spotting", k=10)
+    bm25_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top_common = idx.search_bm25("letrozole spotting", k=10)
+    bm25_common_time = time.perf_counter() - start
+
+    assert hits == scan
+    check_index(idx, ["letrozole AND user42", "user42 spotting NOT clomid", "user42 OR user43 AND acne",
+                      "NOT clomid user42", "letrozole AND spotting AND cramps AND user7"],
+                ["user42 spotting", "letrozole spotting", "user42 user43 acne"])
+    print("✅ boolean and BM25 results match the exhaustive evaluations")
+    print(f"Linear scan:             {len(scan)} hits in {scan_time * 1000:.1f} ms")
+    print(f"Boolean rare AND common: {len(hits)} hits in {bool_time * 1000:.1f} ms")
+    print(f"Boolean 3 common terms:  {len(common):,} hits in {common_time * 1000:.1f} ms")
+    print(f"BM25 top-10 rare+common: {len(top)} results in {bm25_time * 1000:.1f} ms")
+    print(f"BM25 top-10 two common:  {len(top_common)} results in {bm25_common_time * 1000:.1f} ms")
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources = [os.path.join(here, "forum_posts.txt")]
+    for chapter in ("chapter07", "chapter08", "chapter09", "chapter10"):
+        sources.append(os.path.join(here, "..", chapter, "cycle_notes.txt"))
+
+    idx = PostIndex(INDEX_DIR)
+    for src in sources:
+        if os.path.exists(src):
+            added = idx.add_file(src)
+            if added:
+                print(f"Indexed {added} new lines from {os.path.relpath(src, here)}")
+    print(f"Index holds {idx.manifest['n_docs']} documents.\n")
+
+    while True:
+        query = input("Search (e.g. 'letrozole AND spotting', or 'quit'): ").strip()
+        if query.lower() == "quit":
+            break
+        if not query:
+            continue
+        if any(op in query.split() for op in ("AND", "OR", "NOT")):
+            results = [(None, d) for d in idx.search_boolean(query)[:10]]
+        else:
+            results = idx.search_bm25(query)
+        if not results:
+            print("No matches.\n")
+            continue
+        for score, doc_id in results:
+            path, text = idx.document(doc_id)
+            label = f"{score:6.2f}" if score is not None else "   ---"
+            print(f"{label}  [{os.path.basename(os.path.dirname(path))}] {text}")
+        print()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
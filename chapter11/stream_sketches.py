@@ -0,0 +1,662 @@
+# Chapter 11 add-on: Bounded-memory term and user statistics (sketches)
+# count_mentions() keeps one exact counter per keyword, which is fine for nine
+# keywords but not for open-vocabulary term counts or "how many distinct users
+# mentioned letrozole" over billions of lines. These sketches have fixed size
+# chosen from the error you can accept:
+#   - CountMinSketch: frequency of any term, overestimate <= epsilon * N with
+#     probability 1 - delta
+#   - HeavyHitters: the top-k terms, tracked on top of a Count-Min Sketch
+#   - HyperLogLog: number of distinct items, relative error ~1.04 / sqrt(m)
+# All of them merge exactly (sketch of shard A + sketch of shard B == sketch of
+# A+B) and serialize to bytes, so shards can be counted separately and combined.
+# Merging is only for disjoint inputs: a sketch cannot tell which posts it has
+# already seen, so re-running on a grown file resumes from the saved byte offset
+# (like mention_trends) instead of merging the old sketch of the same file.
+
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+
+from PCOS_data_miner import keywords
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from incremental_notes import file_identity, same_file   # noqa: E402  (Chapter 8)
+
+MASK64 = (1 << 64) - 1
+
+_clean = re.compile(r"[^a-z0-9\s]")
+
+
+def hash64(key):
+    """
+    Stable 64-bit hash (8-byte BLAKE2b). CRC32 is affine over GF(2), so keys
+    differing in the same bits collide in structured ways no finalizer fixes.
+    """
+    raw = key.encode() if isinstance(key, str) else key
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+def _le(arr):
+    """Array bytes in little-endian order."""
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(typecode, buf):
+    arr = array(typecode)
+    arr.frombytes(buf)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+# --- Count-Min Sketch ---
+
+class CountMinSketch:
+    """depth rows x width counters; estimate(x) >= true count, <= it + epsilon * total."""
+
+    HEADER = struct.Struct("<4sIIQ")         # magic, width, depth, total
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array("Q", bytes(8 * width * depth))
+
+    @classmethod
+    def from_error(cls, epsilon=0.001, delta=0.01):
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _cells(self, h):
+        # double hashing: row i uses h1 + i * h2 (Kirsch & Mitzenmacher)
+        h1, h2, w = h & 0xFFFFFFFF, (h >> 32) | 1, self.width
+        return [i * w + (h1 + i * h2) % w for i in range(self.depth)]
+
+    def add_hash(self, h, count=1):
+        """Add by precomputed hash64(); return the key's new estimate."""
+        table, w = self.table, self.width
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        est = MASK64
+        for base in range(0, self.depth * w, w):
+            c = base + h1 % w
+            v = table[c] = table[c] + count
+            if v < est:
+                est = v
+            h1 += h2
+        self.total += count
+        return est
+
+    def add(self, key, count=1):
+        return self.add_hash(hash64(key), count)
+
+    def update(self, counts):
+        """Add a {key: count} mapping (e.g. a Counter of one batch)."""
+        for key, count in counts.items():
+            self.add_hash(hash64(key), count)
+
+    def estimate(self, key):
+        table = self.table
+        return min(table[c] for c in self._cells(hash64(key)))
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("can only merge Count-Min Sketches of the same shape")
+        table = self.table
+        for i, v in enumerate(other.table):
+            if v:
+                table[i] += v
+        self.total += other.total
+        return self
+
+    def nbytes(self):
+        return self.HEADER.size + 8 * len(self.table)
+
+    def to_bytes(self):
+        return self.HEADER.pack(b"CMS2", self.width, self.depth, self.total) + _le(self.table)
+
+    @classmethod
+    def from_bytes(cls, buf, pos=0):
+        """Return (sketch, position after it)."""
+        magic, width, depth, total = cls.HEADER.unpack_from(buf, pos)
+        if magic != b"CMS2":
+            raise ValueError("not a Count-Min Sketch (CMS1 files used the old hash; rebuild them)")
+        pos += cls.HEADER.size
+        sketch = cls(width, depth)
+        sketch.total = total
+        end = pos + 8 * width * depth
+        sketch.table = _from_le("Q", buf[pos:end])
+        return sketch, end
+
+
+# --- Heavy hitters ---
+
+class HeavyHitters:
+    """Top-k terms by Count-Min estimate; candidates are re-ranked after a merge."""
+
+    def __init__(self, k=20, epsilon=0.001, delta=0.01, sketch=None):
+        self.k = k
+        self.sketch = sketch or CountMinSketch.from_error(epsilon, delta)
+        self.top = {}                 # candidate -> estimate when last touched
+        self._min = None              # candidate with the lowest estimate (lazy)
+
+    def add_hash(self, key, h, count=1):
+        self._offer(key, self.sketch.add_hash(h, count))
+
+    def add(self, key, count=1):
+        self._offer(key, self.sketch.add(key, count))
+
+    def update(self, counts):
+        for key, count in counts.items():
+            self._offer(key, self.sketch.add_hash(hash64(key), count))
+
+    def _offer(self, key, est):
+        top = self.top
+        if key in top:
+            top[key] = est
+            if key == self._min:
+                self._min = None
+            return
+        if len(top) < self.k:
+            top[key] = est
+            self._min = None
+            return
+        if self._min is None:
+            self._min = min(top, key=top.get)
+        if est > top[self._min]:
+            del top[self._min]
+            top[key] = est
+            self._min = None
+
+    def most_common(self, n=None):
+        ranked = sorted(self.top.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:n] if n else ranked
+
+    def merge(self, other):
+        if self.k != other.k:
+            raise ValueError("can only merge heavy hitters with the same k")
+        self.sketch.merge(other.sketch)
+        candidates = set(self.top) | set(other.top)
+        self.top = {}
+        self._min = None
+        for key in sorted(candidates):
+            self._offer(key, self.sketch.estimate(key))
+        return self
+
+    def to_bytes(self):
+        parts = [struct.pack("<4sII", b"TOPK", self.k, len(self.top))]
+        for key in sorted(self.top):
+            raw = key.encode("utf-8")
+            parts += [struct.pack("<H", len(raw)), raw]
+        parts.append(self.sketch.to_bytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, buf, pos=0):
+        magic, k, n = struct.unpack_from("<4sII", buf, pos)
+        if magic != b"TOPK":
+            raise ValueError("not a heavy-hitters sketch")
+        pos += 12
+        keys = []
+        for _ in range(n):
+            (length,) = struct.unpack_from("<H", buf, pos)
+            keys.append(buf[pos + 2:pos + 2 + length].decode("utf-8"))
+            pos += 2 + length
+        sketch, pos = CountMinSketch.from_bytes(buf, pos)
+        hh = cls(k, sketch=sketch)
+        hh.top = {key: sketch.estimate(key) for key in keys}
+        return hh, pos
+
+
+# --- HyperLogLog ---
+
+class HyperLogLog:
+    """2**p one-byte registers; cardinality estimate with relative error ~1.04 / sqrt(2**p)."""
+
+    HEADER = struct.Struct("<4sB")
+
+    def __init__(self, p=14):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @classmethod
+    def from_error(cls, rel_error=0.01):
+        return cls(min(max(math.ceil(2 * math.log2(1.04 / rel_error)), 4), 18))
+
+    @property
+    def rel_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, key):
+        self.add_hash(hash64(key))
+
+    def add_hash(self, h):
+        bits = 64 - self.p
+        idx = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def estimate(self):
+        m = self.m
+        regs = self.registers
+        z = sum(regs.count(r) * 2.0 ** -r for r in range(66 - self.p) if r in regs)
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        e = alpha * m * m / z
+        zeros = regs.count(0)
+        if e <= 2.5 * m and zeros:
+            e = m * math.log(m / zeros)          # linear counting for small sets
+        return round(e)
+
+    def __len__(self):
+        return self.estimate()
+
+    def merge(self, other):
+        if self.p != other.p:
+            raise ValueError("can only merge HyperLogLogs with the same precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def nbytes(self):
+        return self.HEADER.size + self.m
+
+    def to_bytes(self):
+        return self.HEADER.pack(b"HLL2", self.p) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, buf, pos=0):
+        magic, p = cls.HEADER.unpack_from(buf, pos)
+        if magic != b"HLL2":
+            raise ValueError("not a HyperLogLog (HLL1 files used the old hash; rebuild them)")
+        pos += cls.HEADER.size
+        hll = cls(p)
+        hll.registers = bytearray(buf[pos:pos + hll.m])
+        return hll, pos + hll.m
+
+
+# --- Forum statistics ---
+
+class ForumSketch:
+    """Term frequencies, top terms, vocabulary size, distinct users and per-keyword mentioners."""
+
+    def __init__(self, k=20, epsilon=0.001, delta=0.01, hll_error=0.01, keywords=keywords):
+        self.terms = HeavyHitters(k, epsilon, delta)
+        self.vocabulary = HyperLogLog.from_error(hll_error)
+        self.users = HyperLogLog.from_error(hll_error)
+        self.mentioners = {kw: HyperLogLog.from_error(hll_error) for kw in keywords}
+        self._pattern = keyword_pattern(keywords)
+        self.posts = 0
+        self.source = None         # {"identity", "offset"} of the input file
+
+    def add_posts(self, posts, batch=50000):
+        """Add (user, cleaned text) pairs. Terms are pre-aggregated per batch (CMS is linear)."""
+        counts = Counter()
+        for n, (user, text) in enumerate(posts, 1):
+            words = text.split()
+            counts.update(words)
+            if user is not None:
+                h = hash64(user)
+                self.users.add_hash(h)
+                if self._pattern:
+                    for kw in set(self._pattern.findall(text)):
+                        self.mentioners[kw].add_hash(h)
+            self.posts += 1
+            if n % batch == 0:
+                self._flush(counts)
+        self._flush(counts)
+
+    def _flush(self, counts):
+        terms, vocabulary = self.terms, self.vocabulary
+        for term, count in counts.items():
+            h = hash64(term)
+            terms.add_hash(term, h, count)
+            vocabulary.add_hash(h)
+        counts.clear()
+
+    def merge(self, other):
+        """Add a sketch of *different* posts (another shard or file); the result has no source."""
+        if self.source and other.source and _same_input(self.source, other.source):
+            raise ValueError("both sketches were built from the same file; "
+                             "resume with update_from_file instead of merging")
+        self.source = None
+        self.terms.merge(other.terms)
+        self.vocabulary.merge(other.vocabulary)
+        self.users.merge(other.users)
+        for kw, hll in self.mentioners.items():
+            hll.merge(other.mentioners[kw])
+        self.posts += other.posts
+        return self
+
+    def report(self, n=10):
+        return {
+            "posts": self.posts,
+            "terms": self.terms.sketch.total,
+            "distinct_terms": self.vocabulary.estimate(),
+            "distinct_users": self.users.estimate(),
+            "top_terms": self.terms.most_common(n),
+            "users_mentioning": {kw: hll.estimate() for kw, hll in self.mentioners.items()},
+        }
+
+    def to_bytes(self):
+        source = json.dumps(self.source).encode("utf-8")
+        parts = [struct.pack("<4sQI", b"FSK2", self.posts, len(self.mentioners)),
+                 struct.pack("<I", len(source)), source,
+                 self.terms.to_bytes(), self.vocabulary.to_bytes(), self.users.to_bytes()]
+        for kw, hll in self.mentioners.items():
+            raw = kw.encode("utf-8")
+            parts += [struct.pack("<H", len(raw)), raw, hll.to_bytes()]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, buf):
+        magic, posts, n_kw = struct.unpack_from("<4sQI", buf, 0)
+        if magic not in (b"FSK1", b"FSK2"):
+            raise ValueError("not a forum sketch")
+        pos = 16
+        fs = cls(keywords=())
+        fs.posts = posts
+        if magic == b"FSK2":
+            (length,) = struct.unpack_from("<I", buf, pos)
+            fs.source = json.loads(buf[pos + 4:pos + 4 + length])
+            pos += 4 + length
+        fs.terms, pos = HeavyHitters.from_bytes(buf, pos)
+        fs.vocabulary, pos = HyperLogLog.from_bytes(buf, pos)
+        fs.users, pos = HyperLogLog.from_bytes(buf, pos)
+        for _ in range(n_kw):
+            (length,) = struct.unpack_from("<H", buf, pos)
+            kw = buf[pos + 2:pos + 2 + length].decode("utf-8")
+            fs.mentioners[kw], pos = HyperLogLog.from_bytes(buf, pos + 2 + length)
+        fs._pattern = keyword_pattern(fs.mentioners)
+        return fs
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fh:
+            return cls.from_bytes(fh.read())
+
+
+def _same_input(a, b):
+    """True if two saved sources name the same file (device and inode)."""
+    return (a["identity"]["dev"], a["identity"]["ino"]) == (b["identity"]["dev"], b["identity"]["ino"])
+
+
+def _complete_lines(fh):
+    """Lines ending in a newline; a partial last line is left for the next run."""
+    for line in fh:
+        if not line.endswith(b"\n"):
+            return
+        yield line
+
+
+def update_from_file(fs, fname):
+    """Add the posts appended to `fname` since the sketch was last updated; return how many."""
+    src = fs.source
+    if src is None:
+        if fs.posts:
+            raise ValueError("this sketch is a merge of other files; start a new sketch for "
+                             f"{fname}")
+        offset = 0
+    elif same_file(fname, src):
+        offset = src["offset"]
+    else:
+        raise ValueError(f"{fname} is not the file this sketch was built from (or was rewritten); "
+                         "start a new sketch")
+    before = fs.posts
+    with open(fname, "rb") as fh:
+        fh.seek(offset)
+        read = 0
+        lines = []
+        for line in _complete_lines(fh):
+            read += len(line)
+            lines.append(line.decode("utf-8"))
+            if len(lines) == 50000:
+                fs.add_posts(read_user_posts(lines))
+                lines.clear()
+        fs.add_posts(read_user_posts(lines))
+    fs.source = {"identity": file_identity(fname), "offset": offset + read}
+    return fs.posts - before
+
+
+def keyword_pattern(keywords):
+    """One whole-word alternation (longest first) instead of a regex per keyword."""
+    if not keywords:
+        return None
+    alternatives = "|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True))
+    return re.compile(r"\b(?:" + alternatives + r")\b")
+
+
+def read_user_posts(fh):
+    """Yield (user, cleaned text) from lines of 'user<TAB>post' (user is None without a tab)."""
+    for line in fh:
+        user, sep, text = line.rstrip("\n").partition("\t")
+        if not sep:
+            user, text = None, user
+        text = _clean.sub("", text.strip().lower())
+        if text.strip():
+            yield user, text
+
+
+# --- Accuracy checks & benchmark ---
+
+def synthetic_corpus(n_posts, n_users=20000, vocab=50000, words_per_post=12, seed=11):
+    """Zipf-distributed words; every post is (user, text)."""
+    import bisect
+    import random
+    rng = random.Random(seed)
+    weights = [1 / (r + 1) ** 1.1 for r in range(vocab)]
+    cum, acc = [], 0.0
+    for w in weights:
+        acc += w
+        cum.append(acc)
+    words = [f"w{r}" for r in range(vocab)]
+    fixed = keywords[:]
+    posts = []
+    for _ in range(n_posts):
+        text = [words[bisect.bisect(cum, rng.random() * acc)] for _ in range(words_per_post)]
+        if rng.random() < 0.05:
+            text.append(rng.choice(fixed))
+        user = f"user{int(rng.paretovariate(1.2)) % n_users}"
+        posts.append((user, " ".join(text)))
+    return posts
+
+
+def check_accuracy(n_posts=60000, shards=4, epsilon=0.0005, delta=0.01, hll_error=0.01, k=20):
+    """Sketch answers vs exact counts; merged shards must equal the single-pass sketch."""
+    posts = synthetic_corpus(n_posts)
+    exact = Counter()
+    users, mentioners = set(), {kw: set() for kw in keywords}
+    for user, text in posts:
+        exact.update(text.split())
+        users.add(user)
+        for kw in keywords:
+            if re.search(r"\b" + re.escape(kw) + r"\b", text):
+                mentioners[kw].add(user)
+    whole = ForumSketch(k, epsilon, delta, hll_error)
+    whole.add_posts(posts)
+
+    # Count-Min: never under, and over by more than epsilon * N for at most ~delta of keys
+    sketch = whole.terms.sketch
+    bound = sketch.epsilon * sketch.total
+    errors = [sketch.estimate(w) - c for w, c in exact.items()]
+    assert min(errors) >= 0 and sketch.total == sum(exact.values())
+    over = sum(e > bound for e in errors) / len(errors)
+    assert over <= delta, over
+
+    # heavy hitters: the true top-k (by a clear margin) are found
+    true_top = [w for w, _ in exact.most_common(k)]
+    found = {w for w, _ in whole.terms.most_common()}
+    recall = len(found & set(true_top)) / k
+    assert all(w in found for w in true_top[:k // 2]), (true_top, found)
+
+    # HyperLogLog: within 4 standard errors
+    rel = []
+    for est, true in [(whole.vocabulary.estimate(), len(exact)), (whole.users.estimate(), len(users))] + \
+            [(whole.mentioners[kw].estimate(), len(s)) for kw, s in mentioners.items()]:
+        rel.append(abs(est - true) / true)
+        assert abs(est - true) <= 4 * whole.vocabulary.rel_error * true + 2, (est, true)
+
+    # shards: merge == one pass, and bytes round-trip
+    parts = []
+    for i in range(shards):
+        part = ForumSketch(k, epsilon, delta, hll_error)
+        part.add_posts(posts[i::shards])
+        parts.append(ForumSketch.from_bytes(part.to_bytes()))
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.terms.sketch.table == whole.terms.sketch.table
+    assert merged.vocabulary.registers == whole.vocabulary.registers
+    assert merged.users.registers == whole.users.registers
+    assert merged.report()["users_mentioning"] == whole.report()["users_mentioning"]
+    assert {w for w, _ in merged.terms.most_common()} >= set(true_top[:k // 2])
+    return {"terms": sketch.total, "distinct_terms": len(exact), "cms_bound": round(bound, 1),
+            "cms_over_bound": over, "cms_max_error": max(errors), "topk_recall": recall,
+            "hll_max_rel_error": round(max(rel), 4)}
+
+
+def check_resume(folder, n_posts=3000):
+    """Resuming a grown file == one pass over it; merging a sketch of the same file is refused."""
+    posts = synthetic_corpus(n_posts, vocab=2000, seed=13)
+    path = os.path.join(folder, "sketch_check.txt")
+    lines = [f"{user}\t{text}\n" for user, text in posts]
+    cut = n_posts * 2 // 3
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.writelines(lines[:cut])
+        fh.write(lines[cut][:5])                       # a partial line, finished later
+    first = ForumSketch()
+    update_from_file(first, path)
+    assert first.posts == cut
+    resumed = ForumSketch.from_bytes(first.to_bytes())
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(lines[cut][5:])
+        fh.writelines(lines[cut + 1:])
+    assert update_from_file(resumed, path) == n_posts - cut
+    whole = ForumSketch()
+    update_from_file(whole, path)
+    assert resumed.posts == whole.posts == n_posts
+    assert resumed.terms.sketch.table == whole.terms.sketch.table
+    assert resumed.users.registers == whole.users.registers
+    try:
+        resumed.merge(first)
+        raise AssertionError("merged two sketches of the same file")
+    except ValueError:
+        pass
+    os.remove(path)
+    return True
+
+
+def benchmark(n_posts=200000):
+    import tempfile
+    folder = tempfile.mkdtemp(prefix="sketch_")
+    assert check_resume(folder)
+    os.rmdir(folder)
+    print("✅ a grown file resumes from its offset; same-file sketches are not merged")
+    print("Accuracy vs exact counts (60k posts, 4 shards merged):")
+    for key, value in check_accuracy().items():
+        print(f"  {key}: {value}")
+
+    posts = synthetic_corpus(n_posts, vocab=200000, seed=12)
+    start = time.perf_counter()
+    fs = ForumSketch()
+    fs.add_posts(posts)
+    t_sketch = time.perf_counter() - start
+    start = time.perf_counter()
+    exact = Counter()
+    for _user, text in posts:
+        exact.update(text.split())
+    t_exact = time.perf_counter() - start
+    exact_bytes = sys.getsizeof(exact) + sum(sys.getsizeof(w) + 28 for w in exact)
+    sketch_bytes = len(fs.to_bytes())
+    print(f"{n_posts:,} posts, {fs.terms.sketch.total:,} terms, {len(exact):,} distinct:")
+    print(f"  sketch {t_sketch:.2f}s, {sketch_bytes / 1024:,.0f} KB (fixed) | "
+          f"exact Counter {t_exact:.2f}s, ~{exact_bytes / 1024:,.0f} KB (grows with vocabulary)")
+    print(f"  distinct terms ≈ {fs.vocabulary.estimate():,} (exact {len(exact):,})")
+
+
+def print_report(fs):
+    report = fs.report()
+    print("=== Forum Sketch ===")
+    print(f"posts: {report['posts']}, terms: {report['terms']}, "
+          f"distinct terms ≈ {report['distinct_terms']}, distinct users ≈ {report['distinct_users']}")
+    print("\nTop terms (estimated counts):")
+    for term, count in report["top_terms"]:
+        print(f"  {term}: {count}")
+    if report["distinct_users"]:
+        print("\nDistinct users mentioning:")
+        for kw, n in report["users_mentioning"].items():
+            print(f"  {kw}: ≈{n}")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    if "--merge" in sys.argv:
+        # combine sketches of different shards / files into merged.sketch
+        paths = input("Enter sketch files to combine (space separated): ").split()
+        if not paths:
+            print("❌ no sketch files given")
+            return
+        try:
+            fs = ForumSketch.load(paths[0])
+            for path in paths[1:]:
+                fs.merge(ForumSketch.load(path))
+        except (OSError, ValueError) as e:
+            print("❌", e)
+            return
+        fs.save("merged.sketch")
+        print_report(fs)
+        print(f"\n💾 {len(paths)} sketches combined into merged.sketch")
+        return
+
+    fname = input("Enter file name (lines of 'user<TAB>post' or plain posts): ")
+    if len(fname) < 1:
+        fname = "forum_posts.txt"
+    sketch_path = os.path.splitext(fname)[0] + ".sketch"
+
+    fs = ForumSketch.load(sketch_path) if os.path.exists(sketch_path) else ForumSketch()
+    try:
+        added = update_from_file(fs, fname)
+    except (OSError, ValueError) as e:
+        print("❌", e)
+        return
+    fs.save(sketch_path)
+
+    print_report(fs)
+    print(f"\n💾 Sketch ({len(fs.to_bytes()) / 1024:.0f} KB, {added} new posts) written to {sketch_path}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -10,39 +10,40 @@ nutrition data for any food entered by the user. It then displays calories,
 macronutrients, and a PCOS-friendly note based on fiber content.
 """
 
-import urllib.request
-import urllib.parse
-import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter15"))
+from nutrition_client import NutritionClient, RequestError   # noqa: E402  (Chapter 15: deadlines, hedging, breaker)
+
+BASE_URL = "https://api.edamam.com/api/food-database/v2/parser"
+APP_ID = "4fb0f986"                            # your Edamam Application ID
+APP_KEY = "665a4a71517cd9b7e08704a6d4542b4f"   # your Edamam Application Key
+
+client = None   # created by get_client() in main(): importing this module opens no pool or cache
+
+
+def get_client():
+    """The shared NutritionClient, created on first use."""
+    global client
+    if client is None:
+        client = NutritionClient(BASE_URL, APP_ID, APP_KEY)
+    return client
+
 
 def fetch_food_data(food):
     """Fetch nutrition data for a food item from Edamam API."""
-    app_id = "4fb0f986"  # your Edamam Application ID
-    app_key = "665a4a71517cd9b7e08704a6d4542b4f"  # your Edamam Application Key
-    base_url = "https://api.edamam.com/api/food-database/v2/parser"
-
-    # Build URL query parameters
-    params = {
-        "app_id": app_id,
-        "app_key": app_key,
-        "ingr": food,
-        "nutrition-type": "logging"
-    }
-
-    url = base_url + "?" + urllib.parse.urlencode(params)
     print(f"\n🔎 Fetching data for '{food}' ...")
 
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read().decode()
-            js = json.loads(data)
-            return js
-    except urllib.error.HTTPError as e:
-        print(f"❌ HTTP Error: {e.code} — Check your API credentials or quota.")
-    except urllib.error.URLError as e:
-        print(f"❌ Connection Error: {e.reason}")
-    except Exception as e:
-        print("❌ Unexpected Error:", e)
-    return None
+    client = get_client()
+    js = client.lookup(food)
+    if js is None and isinstance(client.last_error, RequestError):
+        print(f"❌ HTTP Error: {client.last_error} — Check your API credentials or quota.")
+    elif js is None:
+        print(f"❌ Connection Error: {client.last_error}")
+    elif client.last_source == "cache":
+        print(f"📦 Using cached data ({client.last_error})")
+    return js
 
 
 def show_nutrition(js):
@@ -79,6 +80,7 @@ def show_nutrition(js):
 
 
 def main():
+    client = get_client()
     print("\n🥗 Welcome to the PCOS Food & Nutrition Finder!")
     print("Type any food name to get its nutrition info.")
     print("Type 'quit' anytime to exit.\n")
@@ -86,6 +88,7 @@ def main():
     while True:
         food = input("Enter a food name (or 'quit' to exit): ").strip()
         if food.lower() == "quit":
+            client.close()
             print("\nGoodbye 👋 Stay mindful and eat nourishing foods!")
             break
         if not food:
@@ -98,4 +101,6 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -5,8 +5,13 @@ Fetches nutrition info automatically from Edamam API,
 estimates Glycemic Index & Insulin Risk, and stores results in SQLite.
 """
 
+import os
+import sys
 import sqlite3
-import urllib.request, urllib.parse, json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter15"))
+from food_name_index import FoodNameIndex, choose_name, normalize_food_log   # noqa: E402  (Chapter 15)
+from nutrition_client import NutritionClient, extract_food   # noqa: E402  (Chapter 15)
 
 # --- API CONFIG ---
 APP_ID = "4fb0f986"
@@ -38,37 +43,36 @@ def create_table():
 
 
 # --- API FETCH ---
+client = None   # created by get_client() in main(): importing this module opens no pool or cache
+
+
+def get_client():
+    """The shared NutritionClient, created on first use."""
+    global client
+    if client is None:
+        client = NutritionClient(BASE_URL, APP_ID, APP_KEY)
+    return client
+
+
 def fetch_food_data(food_name):
     """Fetch food info from Edamam API."""
-    params = {
-        "app_id": APP_ID,
-        "app_key": APP_KEY,
-        "ingr": food_name,
-        "nutrition-type": "logging"
-    }
-    url = BASE_URL + "?" + urllib.parse.urlencode(params)
     print(f"\n🔎 Fetching data for '{food_name}'...")
 
+    client = get_client()
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read().decode()
-            js = json.loads(data)
-            if "parsed" not in js or not js["parsed"]:
-                print("⚠️ Food not found. Try a different name.")
-                return None
-            item = js["parsed"][0]["food"]
-            nutrients = item["nutrients"]
-            return {
-                "name": item["label"],
-                "calories": nutrients.get("ENERC_KCAL", 0),
-                "carbs": nutrients.get("CHOCDF", 0),
-                "fiber": nutrients.get("FIBTG", 0),
-                "fat": nutrients.get("FAT", 0),
-                "protein": nutrients.get("PROCNT", 0)
-            }
+        js = client.lookup(food_name)
     except Exception as e:
         print("❌ Error fetching data:", e)
         return None
+    if js is None:
+        print("❌ Error fetching data:", client.last_error)
+        return None
+    if client.last_source == "cache":
+        print(f"📦 Using cached data ({client.last_error})")
+    food = extract_food(js)
+    if food is None:
+        print("⚠️ Food not found. Try a different name.")
+    return food
 
 
 # --- GI & INSULIN LOGIC ---
@@ -106,13 +110,17 @@ def show_summary(cur):
         print(row)
 
     print("\n🥇 Top 5 lowest-GI foods (best for PCOS):")
-    for row in cur.execute('SELECT food, gi FROM food_log ORDER BY gi ASC LIMIT 5'):
+    for row in cur.execute('SELECT food, ROUND(AVG(gi),1) AS avg_gi FROM food_log '
+                           'GROUP BY food ORDER BY avg_gi ASC LIMIT 5'):
         print(f"  • {row[0].title()} — GI {row[1]}")
 
 
 # --- MAIN PROGRAM ---
 def main():
     conn, cur = create_table()
+    client = get_client()
+    names = FoodNameIndex.from_db(cur, client.cache)
+    normalize_food_log(conn, names)
     print("\n🥗 Welcome to the PCOS Food Tracker (Auto Version)!")
     print("Type your food name to fetch data, or 'quit' to stop.\n")
 
@@ -121,9 +129,10 @@ def main():
         if food.lower() == "quit":
             break
 
-        data = fetch_food_data(food)
+        data = fetch_food_data(choose_name(names, food))
         if not data:
             continue
+        data["name"] = names.canonical(data["name"])
 
         # Compute scores
         data["gi"] = estimate_gi(data)
@@ -140,9 +149,12 @@ def main():
         print(f"💾 Saved {data['name']} to your PCOS food log!\n")
 
     show_summary(cur)
+    client.close()
     conn.close()
     print("\n🌿 Data saved in 'food_log.sqlite'. Goodbye, Basrah! 🩷")
 
 
 if __name__ == "__main__":
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,445 @@
+"""
+Bulk Food Diary Import — Chapter 15 add-on
+------------------------------------------
+Loads a CSV export from another food diary app into food_log.sqlite without
+typing every line into the tracker's input() loop:
+
+• the diary is streamed, never loaded whole
+• each batch looks up every distinct unknown food once, in parallel
+• GI / GL / insulin come from the tracker's own functions
+• each batch is written in one transaction, together with the byte offset
+  reached, so a crash or an API quota stop resumes exactly where it ended
+  without duplicating rows
+• nobody is there to confirm a typo fix, so names only merge with known foods
+  on a normalized match; fuzzy candidates are listed in the summary instead
+
+Recognized columns (case-insensitive): food / name / item / description,
+an optional date / timestamp, and optional calories, carbs, fiber, fat and
+protein — rows that carry their own nutrients skip the API lookup.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pcos_daily_gl_tracker as tracker
+from food_name_index import FoodNameIndex, normalize_name
+from nutrition_client import RequestError, extract_food
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "chapter08"))
+from incremental_notes import file_identity, same_file   # noqa: E402  (Chapter 8)
+
+BATCH_SIZE = 200
+WORKERS = 4
+
+FOOD_COLUMNS = ("food", "food_name", "name", "item", "description")
+TIME_COLUMNS = ("timestamp", "datetime", "date", "logged_at", "time")
+NUTRIENT_COLUMNS = {
+    "calories": ("calories", "kcal", "energy"),
+    "carbs": ("carbs", "carbohydrates", "carbs_g"),
+    "fiber": ("fiber", "fibre", "fiber_g"),
+    "fat": ("fat", "fat_g"),
+    "protein": ("protein", "protein_g"),
+}
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M",
+                "%Y-%m-%d", "%m/%d/%Y %H:%M", "%m/%d/%Y", "%d.%m.%Y")
+
+PROGRESS_DDL = '''
+CREATE TABLE IF NOT EXISTS diary_import (
+    source TEXT PRIMARY KEY,
+    identity TEXT,
+    offset INTEGER,
+    imported INTEGER,
+    skipped INTEGER,
+    done INTEGER
+)
+'''
+INSERT_SQL = '''
+INSERT INTO food_log (food, calories, carbs, fiber, fat, protein, gi, insulin_score, gl, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+'''
+
+
+# --- Reading the diary ---
+
+def _pick(header, candidates):
+    for name in candidates:
+        if name in header:
+            return name
+    return None
+
+
+def parse_time(value):
+    """Diary date/time -> 'YYYY-MM-DD HH:MM:SS' (None if missing or unknown)."""
+    value = (value or "").strip()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def read_header(path):
+    """(lower-cased column names, byte offset of the first data row)."""
+    with open(path, "rb") as fh:
+        line = fh.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]), [])
+    return [h.strip().lower() for h in header], len(line)
+
+
+def read_rows(path, header, offset):
+    """Yield (row dict, byte offset just past the row) starting at `offset`."""
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        pos, pending = offset, b""
+        for line in fh:
+            pos += len(line)
+            pending += line
+            if pending.count(b'"') % 2:
+                continue                        # quoted field spans lines
+            text, pending = pending.decode("utf-8"), b""
+            if text.strip():
+                yield dict(zip(header, next(csv.reader([text])))), pos
+
+
+def given_nutrients(row, columns):
+    """Nutrients carried by the row itself, or None if any are missing."""
+    out = {}
+    for field, col in columns.items():
+        try:
+            out[field] = float(row[col])
+        except (TypeError, ValueError, KeyError):
+            return None
+    return out
+
+
+# --- Progress (stored in the same database, updated in the same transaction) ---
+
+def load_progress(cur, source):
+    cur.execute("SELECT identity, offset, imported, skipped, done FROM diary_import WHERE source = ?",
+                (source,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {"identity": json.loads(row[0]), "offset": row[1], "imported": row[2],
+            "skipped": row[3], "done": row[4]}
+
+
+def save_progress(cur, source, identity, offset, imported, skipped, done):
+    cur.execute("INSERT OR REPLACE INTO diary_import VALUES (?, ?, ?, ?, ?, ?)",
+                (source, json.dumps(identity), offset, imported, skipped, int(done)))
+
+
+# --- Import ---
+
+def resolve_batch(foods, client, memo, workers=WORKERS):
+    """
+    Look up every name in `foods` not yet in memo; return {name: error} for the
+    lookups that failed. Only "no such food" is memoized as None (a skip); an
+    outage or a rejected request (401 bad API key, 403 quota, ...) must pause
+    the import, or resuming with a working key would find those rows gone.
+    """
+    todo = [f for f in foods if f not in memo]
+    failed = {}
+    if not todo:
+        return failed
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for food, (js, source, error) in zip(todo, pool.map(client.fetch, todo)):
+            if isinstance(error, RequestError) and error.status == 404:
+                memo[food] = None               # the API has no such food
+            elif js is None:
+                failed[food] = error
+            else:
+                memo[food] = extract_food(js)   # None = the API has no such food
+    return failed
+
+
+def note_fuzzy(names, food, fuzzy):
+    """Record the closest known name for a food about to be added as new, for review."""
+    guess = names.resolve(food) or names.suggest(food)
+    if guess:
+        fuzzy[normalize_name(food)] = guess
+
+
+def import_diary(path, db_path="food_log.sqlite", client=None, batch_size=BATCH_SIZE,
+                 workers=WORKERS, restart=False, max_batches=None):
+    """
+    Import (or resume importing) a diary CSV. Returns a stats dict whose
+    "status" is "done", "paused" (upstream failing or rejecting our requests;
+    "error" says why, run again later) or "stopped" (max_batches reached),
+    and whose "fuzzy" maps each new food name that looks like a known one to
+    that name.
+    """
+    client = client or tracker.get_client()
+    source = os.path.abspath(path)
+    conn, cur = tracker.create_table(db_path)
+    cur.execute(PROGRESS_DDL)
+
+    header, data_start = read_header(path)
+    food_col = _pick(header, FOOD_COLUMNS)
+    if food_col is None:
+        conn.close()
+        raise ValueError(f"{path}: no food column (expected one of {', '.join(FOOD_COLUMNS)})")
+    time_col = _pick(header, TIME_COLUMNS)
+    nutrient_cols = {f: _pick(header, names) for f, names in NUTRIENT_COLUMNS.items()}
+    if None in nutrient_cols.values():
+        nutrient_cols = None
+
+    progress = load_progress(cur, source)
+    if progress and not restart:
+        if not same_file(path, progress):
+            conn.close()
+            raise ValueError(f"{path} changed since it was last imported; use restart=True to import again")
+        offset, imported, skipped = progress["offset"], progress["imported"], progress["skipped"]
+    else:
+        offset, imported, skipped = data_start, 0, 0
+    identity = file_identity(path)
+
+    names = FoodNameIndex.from_db(cur)
+    memo = {}
+    fuzzy = {}
+    stats = {"status": "done", "imported": 0, "skipped": 0, "lookups": 0, "batches": 0,
+             "fuzzy": fuzzy, "error": None}
+    start = time.perf_counter()
+    rows = read_rows(path, header, offset)
+    try:
+        while True:
+            batch = []
+            for item in rows:
+                batch.append(item)
+                if len(batch) == batch_size:
+                    break
+            if not batch:
+                break
+            if max_batches is not None and stats["batches"] >= max_batches:
+                stats["status"] = "stopped"
+                break
+
+            # which rows need the API, by the name they will be looked up under
+            keyed = []
+            for row, end in batch:
+                food = (row.get(food_col) or "").strip()
+                given = given_nutrients(row, nutrient_cols) if nutrient_cols and food else None
+                lookup = None if given or not food else (names.known(food) or normalize_name(food))
+                keyed.append((row, end, food, given, lookup))
+            before = len(memo)
+            failed = resolve_batch({k[4] for k in keyed if k[4]}, client, memo, workers)
+            stats["lookups"] += len(memo) - before + len(failed)
+
+            records = []
+            for row, end, food, given, lookup in keyed:
+                if lookup in failed:
+                    stats["status"] = "paused"      # resume from this row next time
+                    stats["error"] = failed[lookup]
+                    break
+                data = dict(given, name=food) if given else memo.get(lookup) if lookup else None
+                if data is None:
+                    skipped += 1
+                    stats["skipped"] += 1
+                else:
+                    if names.known(data["name"]) is None:
+                        note_fuzzy(names, data["name"], fuzzy)
+                    data = dict(data, name=names.add(data["name"]))   # normalized match or new name
+                    gi = tracker.estimate_gi(data)
+                    records.append((data["name"], data["calories"], data["carbs"], data["fiber"],
+                                    data["fat"], data["protein"], gi, tracker.insulin_risk(data),
+                                    tracker.estimate_gl(gi, data["carbs"]),
+                                    parse_time(row.get(time_col)) if time_col else None))
+                offset = end
+
+            # rows + checkpoint commit together: a crash loses the whole batch or none of it
+            cur.executemany(INSERT_SQL, records)
+            imported += len(records)
+            stats["imported"] += len(records)
+            stats["batches"] += 1
+            save_progress(cur, source, identity, offset, imported, skipped, False)
+            conn.commit()
+            if stats["status"] == "paused":
+                break
+        if stats["status"] == "done":
+            save_progress(cur, source, identity, offset, imported, skipped, True)
+            conn.commit()
+    finally:
+        rows.close()
+        conn.close()
+    stats.update(offset=offset, total_imported=imported, total_skipped=skipped,
+                 seconds=time.perf_counter() - start)
+    return stats
+
+
+# --- Checks / benchmark ---
+
+def check_no_fuzzy_merge(root):
+    """Typos are imported as written and reported, never merged into a known food."""
+    import sqlite3
+    from nutrition_client import NutritionClient, StubServer
+
+    diary = os.path.join(root, "typos.csv")
+    with open(diary, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Date", "Food"])
+        for food in ("brown rice", "Rice, brown", "brwn rice", "white rice", "milk", "mlk"):
+            w.writerow(["2025-01-01", food])
+    db = os.path.join(root, "typos.sqlite")
+    with StubServer() as stub:
+        client = NutritionClient(stub.url, "id", "key", cache_path=None)
+        s = import_diary(diary, db, client)
+        client.close()
+    conn = sqlite3.connect(db)
+    stored = sorted(r[0] for r in conn.execute("SELECT food FROM food_log"))
+    conn.close()
+    assert stored == ["brown rice", "brown rice", "brwn rice", "milk", "mlk", "white rice"], stored
+    assert s["fuzzy"]["brwn rice"] == "brown rice", s["fuzzy"]
+    assert "brown rice" not in s["fuzzy"] and "milk" not in s["fuzzy"], s["fuzzy"]
+    return True
+
+
+def check_rejected_pauses(root):
+    """A rejected API key pauses at the first lookup; a later run with a good key imports everything."""
+    from nutrition_client import NutritionClient, StubServer
+
+    diary = os.path.join(root, "auth.csv")
+    with open(diary, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Date", "Food"])
+        for food in ("oats", "lentils", "no such food", "oats"):
+            w.writerow(["2025-01-01", food])
+    db = os.path.join(root, "auth.sqlite")
+    with StubServer(not_found={"no such food"}) as stub:
+        stub.reject_status = 401
+        client = NutritionClient(stub.url, "id", "expired", cache_path=None)
+        s = import_diary(diary, db, client)
+        assert s["status"] == "paused" and s["total_imported"] == s["total_skipped"] == 0, s
+        assert isinstance(s["error"], RequestError) and s["error"].status == 401, s["error"]
+        assert s["offset"] == read_header(diary)[1], s["offset"]
+        client.close()
+
+        stub.reject_status = None
+        client = NutritionClient(stub.url, "id", "key", cache_path=None)
+        s = import_diary(diary, db, client)
+        client.close()
+    assert s["status"] == "done" and s["total_imported"] == 3 and s["total_skipped"] == 1, s
+    return True
+
+
+def write_synthetic_diary(path, n_rows=20000, n_foods=300, seed=12):
+    """A diary CSV whose foods are introduced gradually (like a real history)."""
+    import random
+    rng = random.Random(seed)
+    # distinct made-up names (numbered names would fuzzy-match each other)
+    foods = ["".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+             for _ in range(n_foods)]
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Date", "Food", "Meal", "Notes"])
+        for i in range(n_rows):
+            seen = max(5, n_foods * (i + 1) // n_rows)
+            day = datetime.fromordinal(738000 + i // 6)
+            w.writerow([day.strftime("%Y-%m-%d"), foods[rng.randrange(seen)],
+                        rng.choice(["breakfast", "lunch", "dinner", "snack"]),
+                        "felt fine,\nno bloating" if i % 97 == 0 else ""])
+
+
+def benchmark(n_rows=20000):
+    import shutil
+    import sqlite3
+    import tempfile
+    from nutrition_client import NutritionClient, StubServer
+
+    root = tempfile.mkdtemp(prefix="diary_import_")
+    diary = os.path.join(root, "diary.csv")
+    write_synthetic_diary(diary, n_rows)
+    try:
+        check_no_fuzzy_merge(root)
+        print("✅ typos imported as written and reported, not merged")
+        check_rejected_pauses(root)
+        print("✅ a rejected API key (HTTP 401) pauses the import; nothing is skipped")
+        with open(diary, encoding="utf-8") as fh:
+            missing = next(r["Food"] for r in csv.DictReader(fh))
+        with StubServer(not_found={missing}) as stub:
+            # baseline: the input() loop path — one lookup + one commit per entry
+            n_base = 300
+            client = NutritionClient(stub.url, "id", "key", cache_path=None)
+            conn, cur = tracker.create_table(os.path.join(root, "baseline.sqlite"))
+            header, data_start = read_header(diary)
+            start = time.perf_counter()
+            for (row, _end), _ in zip(read_rows(diary, header, data_start), range(n_base)):
+                data = extract_food(client.lookup(row["food"]))
+                if data:
+                    data["gi"] = tracker.estimate_gi(data)
+                    data["insulin"] = tracker.insulin_risk(data)
+                    data["gl"] = tracker.estimate_gl(data["gi"], data["carbs"])
+                    tracker.insert_food(cur, data)
+                    conn.commit()
+            per_row = (time.perf_counter() - start) / n_base
+            conn.close()
+            print(f"input()-loop path: {1 / per_row:,.0f} rows/sec")
+
+            db = os.path.join(root, "food_log.sqlite")
+            client = NutritionClient(stub.url, "id", "key", cache_path=None)
+            s = import_diary(diary, db, client, max_batches=20)
+            print(f"run 1 (killed after 20 batches): {s['imported']:,} rows, status {s['status']}")
+            stub.error_rate = 1.0                  # quota exhausted / upstream down
+            s = import_diary(diary, db, client)
+            print(f"run 2 (upstream failing): +{s['imported']:,} rows, status {s['status']}, "
+                  f"breaker {client.breaker.state}")
+            stub.error_rate = 0.0
+            client = NutritionClient(stub.url, "id", "key", cache_path=None)
+            s = import_diary(diary, db, client)
+            print(f"run 3 (resumed): +{s['imported']:,} rows in {s['seconds']:.2f}s "
+                  f"({s['imported'] / s['seconds']:,.0f} rows/sec, {s['lookups']} lookups), "
+                  f"status {s['status']}")
+            s = import_diary(diary, db, client)
+            print(f"run 4 (already done): +{s['imported']} rows")
+
+        conn = sqlite3.connect(db)
+        stored = conn.execute("SELECT COUNT(*) FROM food_log").fetchone()[0]
+        conn.close()
+        print(f"food_log rows: {stored:,} = {n_rows:,} diary rows - {s['total_skipped']} not found "
+              f"→ {'OK, no duplicates' if stored == n_rows - s['total_skipped'] else 'MISMATCH'}")
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    path = input("Diary CSV to import: ").strip()
+    db_path = input("Database (default food_log.sqlite): ").strip() or "food_log.sqlite"
+    try:
+        stats = import_diary(path, db_path)
+    except (OSError, ValueError) as e:
+        print("❌", e)
+        return
+    finally:
+        if tracker.client is not None:
+            tracker.client.close()
+
+    print(f"\n📥 Imported {stats['imported']} rows ({stats['skipped']} skipped: no match) "
+          f"in {stats['seconds']:.1f}s — {stats['total_imported']} from this diary so far")
+    candidates = stats["fuzzy"]
+    if candidates:
+        print(f"🤔 {len(candidates)} foods were kept as written but look like known ones "
+              f"(rename them in the tracker if they are the same):")
+        for food, known in sorted(candidates.items())[:20]:
+            print(f"   '{food}' → '{known}'?")
+    if stats["status"] == "paused" and isinstance(stats["error"], RequestError):
+        print(f"⏸ The nutrition API rejected the lookups ({stats['error']}). "
+              "Check your API credentials or quota, then run the import again to resume.")
+    elif stats["status"] == "paused":
+        print("⏸ The nutrition API is unavailable; run the import again later to resume.")
+    else:
+        print("✅ Diary fully imported.")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
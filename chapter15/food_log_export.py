@@ -0,0 +1,491 @@
+"""
+Columnar Export of food_log — Chapter 15 add-on
+-----------------------------------------------
+The Chapter 14/15 printers read food_log as Python tuples. For cohort
+analysis this module streams the table out as columns instead:
+
+• iter_batches() reads fixed-size batches and packs each column into one
+  contiguous typed buffer (array.array) — REAL -> float64 (NULL = NaN),
+  INTEGER -> int64 (NULL = -2**63), DATETIME -> int64 seconds
+  (NULL = NaT), TEXT -> int32 codes into a dictionary shared by all batches.
+  SQLite keeps text that is not a number in REAL / INTEGER columns
+  (calories = 'abc'); such values are exported as NaN / NaT like NULL and
+  counted per column in ColumnBatch.coerced
+• ColumnBatch.to_numpy() / .to_arrow() wrap those buffers without copying
+  the values (numpy / pyarrow are optional); Arrow only adds a 1-bit-per-row
+  validity bitmap for the NaT / missing-code sentinels
+• snapshot() writes .npz (no numpy needed) or .parquet (pyarrow) batch by
+  batch, so peak memory follows the batch size, not the table size
+
+sqlite3 can only hand rows over as tuples; here at most one batch of them
+exists at a time and they are dropped as soon as the batch is packed.
+"""
+
+import ast
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from array import array
+from datetime import datetime, timedelta
+
+try:
+    import numpy
+except ImportError:  # optional
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+except ImportError:  # optional
+    pyarrow = None
+
+BATCH_SIZE = 8192
+NAT = -2 ** 63                       # numpy's "not a time" for datetime64
+EPOCH = datetime(1970, 1, 1)
+nan = float("nan")
+
+# column kind -> (array typecode, .npy descr)
+KINDS = {"float": ("d", "<f8"), "int": ("q", "<i8"), "time": ("q", "<M8[s]"), "text": ("i", "<i4")}
+
+
+def column_kinds(conn, table="food_log", columns=None):
+    """[(name, kind)] from the table's declared column types."""
+    kinds = []
+    for _cid, name, decl, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        decl = (decl or "").upper()
+        if "INT" in decl:
+            kind = "int"
+        elif any(t in decl for t in ("REAL", "FLOA", "DOUB", "NUM")):
+            kind = "float"
+        elif "DATE" in decl or "TIME" in decl:
+            kind = "time"
+        else:
+            kind = "text"
+        kinds.append((name, kind))
+    if columns:
+        by_name = dict(kinds)
+        kinds = [(c, by_name[c]) for c in columns]
+    return kinds
+
+
+_day_seconds = {}                    # 'YYYY-MM-DD' -> epoch seconds at midnight
+
+
+def _epoch_seconds(value):
+    """SQLite 'YYYY-MM-DD HH:MM:SS' text -> seconds since 1970 (NAT if missing/invalid)."""
+    if value is None:
+        return NAT
+    try:
+        if len(value) == 19 and value[13] == ":":
+            day = _day_seconds.get(value[:10])
+            if day is None:
+                day = _day_seconds[value[:10]] = int((datetime.fromisoformat(value[:10]) - EPOCH).total_seconds())
+            return day + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+        return int((datetime.fromisoformat(value) - EPOCH).total_seconds())
+    except (TypeError, ValueError):
+        return NAT
+
+
+def _numbers(typecode, values, missing):
+    """(array, n_coerced): NULL and values the typecode cannot hold become `missing`."""
+    try:
+        return array(typecode, values), 0        # fast path: no NULLs, all numbers
+    except (TypeError, OverflowError):
+        pass
+    try:
+        return array(typecode, [missing if v is None else v for v in values]), 0
+    except (TypeError, OverflowError):
+        pass
+    col = array(typecode)                        # something is not a number: go value by value
+    append = col.append
+    coerced = 0
+    for v in values:
+        if v is None:
+            append(missing)
+            continue
+        try:
+            append(v)
+        except (TypeError, OverflowError):       # 'abc' in REAL, 2.5 in INTEGER, blobs
+            append(missing)
+            coerced += 1
+    return col, coerced
+
+
+class ColumnBatch:
+    """One batch of rows as typed column buffers (+ the shared text dictionaries)."""
+
+    def __init__(self, kinds, columns, num_rows, dictionaries, coerced=None):
+        self.kinds = kinds
+        self.columns = columns
+        self.num_rows = num_rows
+        self.dictionaries = dictionaries
+        self.coerced = coerced or {}      # name -> non-NULL values exported as NaN / NaT
+
+    def to_numpy(self):
+        """{name: numpy array}; numeric columns are views on the same memory."""
+        if numpy is None:
+            raise RuntimeError("numpy is not installed")
+        out = {}
+        for name, kind in self.kinds:
+            out[name] = numpy.frombuffer(self.columns[name], dtype=KINDS[kind][1])
+            if kind == "text":
+                out[name + "__categories"] = numpy.array(self.dictionaries[name], dtype=str)
+        return out
+
+    def to_arrow(self):
+        """
+        pyarrow.RecordBatch on the same value buffers (text as dictionary arrays).
+        NaT / -1 sentinels become nulls through a new validity bitmap; the
+        values themselves are not copied. Float NULLs stay NaN.
+        """
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        pa, pc = pyarrow, pyarrow.compute
+        n = self.num_rows
+        arrays, names = [], []
+        for name, kind in self.kinds:
+            buf = pa.py_buffer(self.columns[name])
+            if kind == "float":
+                arr = pa.Array.from_buffers(pa.float64(), n, [None, buf])
+            elif kind in ("int", "time"):
+                raw = pa.Array.from_buffers(pa.int64(), n, [None, buf])
+                valid = pc.not_equal(raw, NAT).buffers()[1]
+                arr = pa.Array.from_buffers(pa.int64() if kind == "int" else pa.timestamp("s"),
+                                            n, [valid, buf])
+            else:
+                raw = pa.Array.from_buffers(pa.int32(), n, [None, buf])
+                valid = pc.not_equal(raw, -1).buffers()[1]
+                codes = pa.Array.from_buffers(pa.int32(), n, [valid, buf])
+                arr = pa.DictionaryArray.from_arrays(codes, pa.array(self.dictionaries[name], pa.string()))
+            arrays.append(arr)
+            names.append(name)
+        return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def iter_batches(conn, table="food_log", columns=None, where="", params=(), batch_size=BATCH_SIZE):
+    """Yield ColumnBatch objects of up to batch_size rows (see ColumnBatch.coerced)."""
+    kinds = column_kinds(conn, table, columns)
+    dictionaries = {name: [] for name, kind in kinds if kind == "text"}
+    lookups = {name: {} for name in dictionaries}
+    sql = f"SELECT {', '.join(n for n, _ in kinds)} FROM {table} {where}"
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        columns, coerced = {}, {}
+        for (name, kind), values in zip(kinds, zip(*rows)):
+            bad = 0
+            if kind == "float":
+                col, bad = _numbers("d", values, nan)
+            elif kind == "int":
+                col, bad = _numbers("q", values, NAT)
+            elif kind == "time":
+                col = array("q", map(_epoch_seconds, values))
+                bad = col.count(NAT) - values.count(None)
+            else:
+                index, words = lookups[name], dictionaries[name]
+                add = index.setdefault
+                col = array("i", [-1 if v is None else add(v, len(index)) for v in values])
+                if len(index) > len(words):
+                    words.extend(list(index)[len(words):])
+            columns[name] = col
+            if bad:
+                coerced[name] = bad
+        n = len(rows)
+        del rows
+        yield ColumnBatch(kinds, columns, n, dictionaries, coerced)
+
+
+def _add_coerced(total, batch):
+    if total is not None:
+        for name, n in batch.coerced.items():
+            total[name] = total.get(name, 0) + n
+
+
+# --- NPZ snapshot (plain .npy members, written without numpy) ---
+
+NPY_HEADER_BYTES = 128
+
+
+def _npy_header(descr, length):
+    header = repr({"descr": descr, "fortran_order": False, "shape": (length,)})
+    header = header.ljust(NPY_HEADER_BYTES - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+class _NpyColumnFile:
+    """Appends raw little-endian values to a temp .npy; the header is patched on close."""
+
+    def __init__(self, folder, name, descr):
+        self.path = os.path.join(folder, name + ".npy")
+        self.descr = descr
+        self.length = 0
+        self.fh = open(self.path, "wb")
+        self.fh.write(_npy_header(descr, 0))
+
+    def append(self, col):
+        if sys.byteorder != "little":
+            col = array(col.typecode, col)
+            col.byteswap()
+        col.tofile(self.fh)
+        self.length += len(col)
+
+    def close(self):
+        self.fh.seek(0)
+        self.fh.write(_npy_header(self.descr, self.length))
+        self.fh.close()
+
+
+def _write_npy_strings(folder, name, words):
+    """A fixed-width '<U' array (numpy's string dtype) from a list of str."""
+    width = max((len(w) for w in words), default=1) or 1
+    path = os.path.join(folder, name + ".npy")
+    with open(path, "wb") as fh:
+        fh.write(_npy_header(f"<U{width}", len(words)))
+        for w in words:
+            fh.write(w.ljust(width, "\0").encode("utf-32-le"))
+    return path
+
+
+def snapshot_npz(conn, path, table="food_log", batch_size=BATCH_SIZE, compress=False, coerced=None):
+    """
+    Write the table to an .npz archive; text columns become <name> codes +
+    <name>__categories. If `coerced` is a dict it receives the per-column
+    counts of values exported as NaN / NaT.
+    """
+    folder = tempfile.mkdtemp(prefix="food_log_npz_", dir=os.path.dirname(os.path.abspath(path)))
+    files = {}
+    rows = 0
+    try:
+        batches = iter_batches(conn, table, batch_size=batch_size)
+        kinds = column_kinds(conn, table)
+        for name, kind in kinds:
+            files[name] = _NpyColumnFile(folder, name, KINDS[kind][1])
+        dictionaries = {}
+        for batch in batches:
+            for name, _kind in kinds:
+                files[name].append(batch.columns[name])
+            _add_coerced(coerced, batch)
+            rows += batch.num_rows
+            dictionaries = batch.dictionaries
+        members = []
+        for f in files.values():
+            f.close()
+            members.append(f.path)
+        for name, kind in kinds:
+            if kind == "text":
+                members.append(_write_npy_strings(folder, name + "__categories", dictionaries.get(name, [])))
+        mode = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(path + ".tmp", "w", mode, allowZip64=True) as zf:
+            for member in members:
+                zf.write(member, os.path.basename(member))
+        os.replace(path + ".tmp", path)
+    finally:
+        for f in files.values():
+            if not f.fh.closed:
+                f.fh.close()
+        for leftover in os.listdir(folder):
+            os.remove(os.path.join(folder, leftover))
+        os.rmdir(folder)
+    return rows
+
+
+def load_npz_columns(path):
+    """Read an .npz written by snapshot_npz() back into arrays / lists (no numpy needed)."""
+    out = {}
+    with zipfile.ZipFile(path) as zf:
+        for member in zf.namelist():
+            data = zf.read(member)
+            header_len = int.from_bytes(data[8:10], "little")
+            header = ast.literal_eval(data[10:10 + header_len].decode("latin1"))
+            body = data[10 + header_len:]
+            descr, name = header["descr"], member[:-4]
+            if descr.startswith("<U"):
+                width = int(descr[2:]) * 4
+                out[name] = [body[i:i + width].decode("utf-32-le").rstrip("\0")
+                             for i in range(0, len(body), width)]
+                continue
+            col = array({"<f8": "d", "<i8": "q", "<M8[s]": "q", "<i4": "i"}[descr])
+            col.frombytes(body)
+            if sys.byteorder != "little":
+                col.byteswap()
+            out[name] = col
+    return out
+
+
+def snapshot_parquet(conn, path, table="food_log", batch_size=BATCH_SIZE, coerced=None):
+    """Write the table to Parquet one record batch at a time (requires pyarrow)."""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is not installed")
+    writer = None
+    rows = 0
+    try:
+        for batch in iter_batches(conn, table, batch_size=batch_size):
+            rb = batch.to_arrow()
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, rb.schema)
+            writer.write_batch(rb)
+            _add_coerced(coerced, batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def snapshot(conn, path, table="food_log", batch_size=BATCH_SIZE, coerced=None):
+    """Snapshot to .parquet or .npz, chosen by the file extension."""
+    if path.endswith(".parquet"):
+        return snapshot_parquet(conn, path, table, batch_size, coerced=coerced)
+    return snapshot_npz(conn, path, table, batch_size, coerced=coerced)
+
+
+# --- Benchmark ---
+
+def make_synthetic_db(path, n_rows=300000, seed=21):
+    import random
+    from pcos_daily_gl_tracker import create_table
+    rng = random.Random(seed)
+    foods = ["oats", "lentils", "white rice", "apple", "quinoa", "bagel", "greek yogurt",
+             "sweet potato", "chickpeas", "cornflakes", "broccoli", "salmon"]
+    conn, cur = create_table(path)
+    cur.executemany(
+        "INSERT INTO food_log (food, calories, carbs, fiber, fat, protein, gi, insulin_score, gl, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((rng.choice(foods), round(rng.uniform(50, 500), 1), round(rng.uniform(0, 80), 1),
+          round(rng.uniform(0, 12), 1), round(rng.uniform(0, 25), 1), round(rng.uniform(0, 30), 1),
+          round(rng.uniform(10, 95), 1), round(rng.uniform(0, 10), 1),
+          None if i % 50 == 0 else round(rng.uniform(0, 40), 1),
+          datetime.fromtimestamp(1700000000 + i * 600).strftime("%Y-%m-%d %H:%M:%S"))
+         for i in range(n_rows)))
+    conn.commit()
+    return conn
+
+
+def verify_npz(conn, path, table="food_log"):
+    """Assert an .npz snapshot holds exactly what SELECT returns."""
+    cols = load_npz_columns(path)
+    for name, kind in column_kinds(conn, table):
+        values = [v for (v,) in conn.execute(f"SELECT {name} FROM {table}")]
+        got = cols[name]
+        if kind == "text":
+            words = cols[name + "__categories"]
+            got = [None if c < 0 else words[c] for c in got]
+        elif kind == "time":
+            got = [None if s == NAT else (EPOCH + timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S")
+                   for s in got]
+        elif kind == "float":
+            got = [None if v != v else v for v in got]
+        else:
+            got = list(got)
+        assert got == values, f"column {name} does not round-trip"
+    return True
+
+
+def check_coercion():
+    """Text in numeric / DATETIME columns becomes NaN / NaT and is counted, not a TypeError."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (calories REAL, portions INTEGER, timestamp DATETIME, food TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", [
+        (120.5, 1, "2025-01-02 08:00:00", "oats"),
+        ("abc", "two", "yesterday", "apple"),
+        (None, None, None, None),
+        ("95", 2.5, "2025-01-03", "oats"),           # '95' is stored as 95.0 by REAL affinity
+    ])
+    coerced = {}
+    batches = list(iter_batches(conn, "t", batch_size=3))
+    for b in batches:
+        _add_coerced(coerced, b)
+    cal = [v for b in batches for v in b.columns["calories"]]
+    portions = [v for b in batches for v in b.columns["portions"]]
+    times = [v for b in batches for v in b.columns["timestamp"]]
+    assert cal[0] == 120.5 and cal[1] != cal[1] and cal[2] != cal[2] and cal[3] == 95.0, cal
+    assert portions == [1, NAT, NAT, NAT], portions
+    assert times[1] == times[2] == NAT and times[3] != NAT, times
+    assert coerced == {"calories": 1, "portions": 2, "timestamp": 1}, coerced
+    conn.close()
+    return True
+
+
+def benchmark(n_rows=300000):
+    import tracemalloc
+    check_coercion()
+    print("✅ non-numeric text in REAL / INTEGER / DATETIME columns: NaN / NaT, counted")
+    folder = tempfile.mkdtemp(prefix="food_log_export_")
+    db = os.path.join(folder, "food_log.sqlite")
+    try:
+        conn = make_synthetic_db(db, n_rows)
+        print(f"food_log with {n_rows:,} rows")
+
+        def run(label, fn):
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()                  # second pass: memory only (tracing slows it down)
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<34} {elapsed:6.2f}s, peak {peak / 1e6:7.1f} MB")
+            return result
+
+        def fetchall_columns():
+            rows = conn.execute("SELECT * FROM food_log").fetchall()
+            return [list(c) for c in zip(*rows)]
+
+        def batch_sum():
+            total = 0.0
+            for b in iter_batches(conn):
+                total += sum(v for v in b.columns["gl"] if v == v)
+            return total
+
+        run("fetchall() + transpose (tuples)", fetchall_columns)
+        for bs in (1024, 8192):
+            run(f"iter_batches(batch_size={bs})", lambda: sum(1 for _ in iter_batches(conn, batch_size=bs)))
+        run("iter_batches + sum(gl)", batch_sum)
+        npz = os.path.join(folder, "food_log.npz")
+        run("snapshot .npz", lambda: snapshot(conn, npz))
+        print(f"    .npz size {os.path.getsize(npz) / 1e6:.1f} MB "
+              f"(sqlite file {os.path.getsize(db) / 1e6:.1f} MB); round trip: {verify_npz(conn, npz)}")
+        if pyarrow is not None:
+            pq = os.path.join(folder, "food_log.parquet")
+            run("snapshot .parquet", lambda: snapshot(conn, pq))
+            print(f"    .parquet size {os.path.getsize(pq) / 1e6:.1f} MB")
+        else:
+            print("  (pyarrow not installed: Arrow / Parquet skipped)")
+        conn.close()
+    finally:
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    db = input("Database (default food_log.sqlite): ").strip() or "food_log.sqlite"
+    out = input("Snapshot file (.npz or .parquet, default food_log.npz): ").strip() or "food_log.npz"
+    conn = sqlite3.connect(db)
+    coerced = {}
+    try:
+        rows = snapshot(conn, out, coerced=coerced)
+    except (RuntimeError, sqlite3.Error) as e:
+        print("❌", e)
+        return
+    finally:
+        conn.close()
+    print(f"📦 Exported {rows} rows to {out}")
+    for name, n in coerced.items():
+        print(f"⚠️ {name}: {n} value(s) that are not valid for the column type exported as NaN / NaT")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
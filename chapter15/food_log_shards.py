@@ -0,0 +1,344 @@
+"""
+Sharded Food Log — Chapter 15 add-on
+------------------------------------
+One food_log.sqlite for every user means SQLite's single writer lock
+serializes everyone. This module spreads users over N shard files (same
+food_log table, plus a `user` column) and routes each user to one shard
+with rendezvous hashing, so adding a shard moves only ~1/N of the users.
+
+• writes go through one writer thread per shard, so different shards
+  commit concurrently (sqlite3 releases the GIL while it works)
+• cross-user queries fan out to every shard in parallel and merge
+• rebalance() moves users whose shard changed after resizing
+
+Layout: <root>/shards.json plus <root>/food_log.NN.sqlite
+
+The single-user trackers still write food_log.sqlite directly; this router
+is for multi-user ingestion that calls ShardedFoodLog.add() itself.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pcos_daily_gl_tracker import create_table
+
+CONFIG = "shards.json"
+DEFAULT_ROOT = "food_log_shards"
+COLUMNS = ("food", "calories", "carbs", "fiber", "fat", "protein", "gi", "insulin_score", "gl")
+
+
+def shard_path(root, i):
+    return os.path.join(root, f"food_log.{i:02d}.sqlite")
+
+
+def route(user, n_shards):
+    """Rendezvous (highest random weight) hashing: the shard with the top score wins."""
+    best, best_score = 0, -1
+    for i in range(n_shards):
+        score = int.from_bytes(hashlib.blake2b(f"{i}:{user}".encode(), digest_size=8).digest(), "big")
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+def open_shard(path):
+    """food_log (Chapter 15 schema) plus a user column and index."""
+    conn, cur = create_table(path)
+    cur.execute("PRAGMA journal_mode=WAL")
+    cols = [row[1] for row in cur.execute("PRAGMA table_info(food_log)")]
+    if "user" not in cols:
+        cur.execute("ALTER TABLE food_log ADD COLUMN user TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS food_log_user ON food_log (user)")
+    conn.commit()
+    return conn
+
+
+def load_config(root):
+    path = os.path.join(root, CONFIG)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_config(root, n_shards):
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, CONFIG + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "shards": n_shards}, fh)
+    os.replace(tmp, os.path.join(root, CONFIG))
+
+
+# --- Writers ---
+
+_STOP = object()
+
+
+class ShardWriter(threading.Thread):
+    """Owns one shard connection; applies queued inserts, committing per `commit_every`."""
+
+    INSERT = (f"INSERT INTO food_log (user, {', '.join(COLUMNS)}) "
+              f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})")
+
+    def __init__(self, path, commit_every=1):
+        super().__init__(daemon=True)
+        self.path = path
+        self.commit_every = commit_every
+        self.queue = queue.Queue()
+        self.error = None
+        self.rows = 0
+
+    def run(self):
+        try:
+            conn = open_shard(self.path)
+        except sqlite3.Error as e:
+            self.error = e
+            self._drain()
+            return
+        cur = conn.cursor()
+        pending = 0
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    break
+                cur.execute(self.INSERT, item)
+                self.rows += 1
+                pending += 1
+                if pending >= self.commit_every or self.queue.empty():
+                    conn.commit()
+                    pending = 0
+            except sqlite3.Error as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+        conn.commit()
+        conn.close()
+
+    def _drain(self):
+        """Shard unusable: acknowledge queued rows (flush() reports the error) until stopped."""
+        while True:
+            item = self.queue.get()
+            self.queue.task_done()
+            if item is _STOP:
+                return
+
+
+# --- Router ---
+
+class ShardedFoodLog:
+    """Routes per-user food log writes and cohort queries over shard files."""
+
+    def __init__(self, root=DEFAULT_ROOT, n_shards=None, commit_every=1):
+        config = load_config(root)
+        if config is None:
+            n_shards = n_shards or 4
+            save_config(root, n_shards)
+        elif n_shards and n_shards != config["shards"]:
+            raise ValueError(f"{root} has {config['shards']} shards; call rebalance() to resize")
+        else:
+            n_shards = config["shards"]
+        self.root = root
+        self.n_shards = n_shards
+        self.routes = {}
+        for i in range(n_shards):                   # schema exists before any read or write
+            open_shard(shard_path(root, i)).close()
+        self.writers = [ShardWriter(shard_path(root, i), commit_every) for i in range(n_shards)]
+        for w in self.writers:
+            w.start()
+        self.readers = ThreadPoolExecutor(max_workers=n_shards, thread_name_prefix="shard-read")
+
+    def shard_of(self, user):
+        i = self.routes.get(user)
+        if i is None:
+            i = self.routes[user] = route(user, self.n_shards)
+        return i
+
+    def add(self, user, data):
+        """Queue one tracker-style entry (name, calories, ..., gi, insulin, gl) for `user`."""
+        row = (user, data["name"], data["calories"], data["carbs"], data["fiber"], data["fat"],
+               data["protein"], data["gi"], data["insulin"], data["gl"])
+        self.writers[self.shard_of(user)].queue.put(row)
+
+    def flush(self):
+        """Wait until every queued write is committed."""
+        for w in self.writers:
+            w.queue.join()
+        errors = [w.error for w in self.writers if w.error]
+        for w in self.writers:
+            w.error = None                          # reported once
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        self.flush()
+        for w in self.writers:
+            w.queue.put(_STOP)
+        for w in self.writers:
+            w.join()
+        self.readers.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- reads ---
+
+    def _query(self, i, sql, params):
+        uri = pathlib.Path(shard_path(self.root, i)).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)       # never create a missing shard
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def fan_out(self, sql, params=()):
+        """Run `sql` on every shard in parallel; return the per-shard row lists."""
+        return list(self.readers.map(lambda i: self._query(i, sql, params), range(self.n_shards)))
+
+    def user_entries(self, user, limit=10):
+        """A single user's latest entries (one shard only)."""
+        return self._query(self.shard_of(user),
+                           "SELECT food, gi, gl, insulin_score, timestamp FROM food_log "
+                           "WHERE user = ? ORDER BY id DESC LIMIT ?", (user, limit))
+
+    def lowest_gl_foods(self, limit=5, min_entries=1):
+        """Cohort-wide lowest average GL foods: per-shard sums/counts merged exactly."""
+        totals = {}
+        for rows in self.fan_out("SELECT food, SUM(gl), COUNT(gl) FROM food_log "
+                                 "WHERE gl IS NOT NULL GROUP BY food"):
+            for food, gl_sum, n in rows:
+                t = totals.setdefault(food, [0.0, 0])
+                t[0] += gl_sum
+                t[1] += n
+        ranked = sorted((round(s / n, 1), food, n) for food, (s, n) in totals.items() if n >= min_entries)
+        return [(food, avg, n) for avg, food, n in ranked[:limit]]
+
+    def cohort_summary(self):
+        """Users / entries / average GL over all shards."""
+        users = entries = 0
+        gl_sum = 0.0
+        for rows in self.fan_out("SELECT COUNT(DISTINCT user), COUNT(*), TOTAL(gl) FROM food_log"):
+            u, n, s = rows[0]
+            users, entries, gl_sum = users + u, entries + n, gl_sum + s
+        return {"users": users, "entries": entries,
+                "avg_gl": round(gl_sum / entries, 1) if entries else None}
+
+
+# --- Rebalancing ---
+
+def rebalance(root, n_shards):
+    """
+    Resize to n_shards and move every user whose route changed. Run it with no
+    writers open. Each user is copied (replacing any partial copy) and committed
+    on the new shard before being deleted from the old one, so an interrupted
+    rebalance can simply be run again. Returns the number of users moved.
+    """
+    config = load_config(root)
+    old_n = config["shards"] if config else 0
+    save_config(root, n_shards)                  # new routes apply from here on
+    conns = [open_shard(shard_path(root, i)) for i in range(max(old_n, n_shards))]
+    moved = 0
+    cols = "user, " + ", ".join(COLUMNS) + ", timestamp"
+    try:
+        for src, conn in enumerate(conns):
+            users = [u for (u,) in conn.execute("SELECT DISTINCT user FROM food_log")]
+            for user in users:
+                dst = route(user, n_shards)
+                if dst == src:
+                    continue
+                rows = conn.execute(f"SELECT {cols} FROM food_log WHERE user = ? ORDER BY id",
+                                    (user,)).fetchall()
+                with conns[dst]:
+                    conns[dst].execute("DELETE FROM food_log WHERE user = ?", (user,))
+                    conns[dst].executemany(f"INSERT INTO food_log ({cols}) VALUES "
+                                           f"({', '.join('?' * (len(COLUMNS) + 2))})", rows)
+                with conn:
+                    conn.execute("DELETE FROM food_log WHERE user = ?", (user,))
+                moved += 1
+    finally:
+        for conn in conns:
+            conn.close()
+    for i in range(n_shards, old_n):             # emptied shards are no longer routed to
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(shard_path(root, i) + suffix):
+                os.remove(shard_path(root, i) + suffix)
+    return moved
+
+
+# --- Benchmark ---
+
+def _entry(rng):
+    carbs = round(rng.uniform(0, 60), 1)
+    gi = round(rng.uniform(20, 90), 1)
+    return {"name": rng.choice(["oats", "lentils", "white rice", "apple", "quinoa", "bagel",
+                                "greek yogurt", "sweet potato", "chickpeas", "cornflakes"]),
+            "calories": 150.0, "carbs": carbs, "fiber": 3.0, "fat": 2.0, "protein": 5.0,
+            "gi": gi, "insulin": 3.0, "gl": round(gi * carbs / 100, 1)}
+
+
+def benchmark(n_users=400, per_user=25):
+    """Concurrent write throughput (one commit per entry) vs shard count."""
+    import random
+    import shutil
+    import tempfile
+    total = n_users * per_user
+    print(f"{total:,} entries from {n_users} users, one commit per entry (like the tracker)")
+    for n in (1, 2, 4, 8):
+        root = tempfile.mkdtemp(prefix="food_shards_")
+        rng = random.Random(n)
+        try:
+            log = ShardedFoodLog(root, n)
+            start = time.perf_counter()
+            for k in range(per_user):
+                for u in range(n_users):
+                    log.add(f"user{u:04d}", _entry(rng))
+            log.flush()
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            best = log.lowest_gl_foods()
+            t_query = time.perf_counter() - start
+            summary = log.cohort_summary()
+            log.close()
+            print(f"  {n} shard(s): {total / elapsed:8,.0f} writes/sec | fan-out query "
+                  f"{t_query * 1000:.1f} ms | {summary['entries']:,} rows, best {best[0][0]!r}")
+            if n == 4:
+                moved = rebalance(root, 5)
+                with ShardedFoodLog(root) as log5:
+                    after = log5.cohort_summary()
+                print(f"  rebalance 4→5 shards: moved {moved}/{n_users} users "
+                      f"({moved / n_users:.0%}), rows {after['entries']:,} (unchanged: "
+                      f"{after['entries'] == summary['entries']})")
+        finally:
+            shutil.rmtree(root)
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    root = input(f"Shard folder (default {DEFAULT_ROOT}): ").strip() or DEFAULT_ROOT
+    with ShardedFoodLog(root) as log:
+        summary = log.cohort_summary()
+        print(f"\n🗂 {log.n_shards} shards — {summary['users']} users, {summary['entries']} entries, "
+              f"average GL {summary['avg_gl']}")
+        print("\n🌿 Cohort top 5 lowest-GL foods:")
+        for food, avg, n in log.lowest_gl_foods():
+            print(f"  • {food} — GL {avg} ({n} entries)")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,337 @@
+"""
+Food Name Index — Chapter 15 add-on
+-----------------------------------
+A tiny local index over food names we have already seen (past food_log
+entries, cached nutrition labels). It resolves typos ("brocoli") and
+word-order variants ("Oats, rolled") to a known name and offers prefix
+autocomplete — all in memory, before any API round trip — and gives every
+stored entry one canonical name so GL rankings group correctly.
+
+Only near-exact matches are applied automatically: the same words in any
+order, or small typos inside words ("brocoli", "greek yoghurt"). A word is
+never swapped for a different one ("coconut milk" is not "coconut oil",
+"whole bread" is not "white bread"), and "soy milk" is a different food from
+"milk", so weaker matches are only offered by suggest() for the user to confirm.
+"""
+
+import math
+import re
+import time
+from bisect import bisect_left
+
+MATCH_THRESHOLD = 0.55     # Dice similarity over trigrams needed to suggest a match
+
+_non_word = re.compile(r"[^a-z0-9\s]")
+
+
+def normalize_name(name):
+    """Lowercase, drop punctuation and undo 'Oats, rolled' style inversion."""
+    name = name.strip().lower()
+    if name.count(",") == 1:
+        head, tail = (p.strip() for p in name.split(","))
+        if head and tail and len(tail.split()) <= 2:
+            name = f"{tail} {head}"
+    return " ".join(_non_word.sub(" ", name).split())
+
+
+def name_key(name):
+    """Order-insensitive key, so 'rolled oats' and 'oats rolled' collide."""
+    return " ".join(sorted(normalize_name(name).split()))
+
+
+def trigrams(text):
+    """Padded character trigrams of each word."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def size_of(text):
+    """Characters + words: one edit (or splitting a word) changes it by at most 1."""
+    return len(text) - text.count(" ") + len(text.split())
+
+
+def max_edits(text):
+    """Edits allowed for an automatic match: none for short names ("pear" vs "peas")."""
+    n = len(text)
+    return 0 if n <= 4 else 1 if n < 10 else 2
+
+
+def word_typos(query_words, name_words, known_words):
+    """
+    Total edits if the two names differ only by typos inside words (word by
+    word, same count), else None. A query word that is a known word is a
+    different word, not a typo, and short words (<= 4 letters) must match.
+    """
+    if len(query_words) != len(name_words):
+        return None
+    total = 0
+    for a, b in zip(query_words, name_words):
+        if a == b:
+            continue
+        k = max_edits(a)
+        if k == 0 or a in known_words:
+            return None
+        d = edit_distance(a, b, k)
+        if d > k:
+            return None
+        total += d
+    return total
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance (adjacent swaps cost 1), or limit + 1 if larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if cost and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+class FoodNameIndex:
+    """Trigram postings for fuzzy lookup + sorted tokens for autocomplete."""
+
+    def __init__(self, names=()):
+        self.names = []           # id -> canonical display name
+        self.by_key = {}          # name_key -> id
+        self.grams = []           # id -> trigram set
+        self.postings = {}        # trigram -> {size_of(name): set of ids}
+        self.df = {}              # trigram -> number of names containing it
+        self.prefixes = []        # sorted (token or full name, id)
+        self.words = set()        # every word of a known name
+        for n in names:
+            self.add(n)
+
+    @classmethod
+    def from_db(cls, cur, cache=None):
+        """Build from the distinct food names in food_log (plus cached API labels)."""
+        cur.execute("SELECT DISTINCT food FROM food_log WHERE food IS NOT NULL")
+        index = cls(row[0] for row in cur.fetchall())
+        if cache:
+            index.add_cached_labels(cache)
+        return index
+
+    def add_cached_labels(self, cache):
+        """Register the food labels of cached nutrition responses ({query: json})."""
+        for js in cache.values():
+            if js and js.get("parsed"):
+                self.add(js["parsed"][0]["food"]["label"])
+
+    def add(self, name):
+        """Register a name; return the canonical name it maps to."""
+        norm = normalize_name(name)
+        if not norm:
+            return name
+        key = name_key(norm)
+        existing = self.by_key.get(key)
+        if existing is not None:
+            return self.names[existing]
+        fid = len(self.names)
+        self.names.append(norm)
+        self.by_key[key] = fid
+        grams = trigrams(norm)
+        self.grams.append(grams)
+        size = size_of(norm)
+        for g in grams:
+            self.postings.setdefault(g, {}).setdefault(size, set()).add(fid)
+            self.df[g] = self.df.get(g, 0) + 1
+        self.words.update(norm.split())
+        for entry in {norm, *norm.split()}:
+            i = bisect_left(self.prefixes, (entry, fid))
+            self.prefixes.insert(i, (entry, fid))
+        return norm
+
+    def known(self, query):
+        """Known name for `query` by normalized (order-insensitive) match only, else None."""
+        fid = self.by_key.get(name_key(query))
+        return self.names[fid] if fid is not None else None
+
+    def resolve(self, query):
+        """Known name for `query` if it is the same food: exact, reordered or typos inside words."""
+        norm = normalize_name(query)
+        if not norm:
+            return None
+        key = name_key(norm)
+        exact = self.by_key.get(key)
+        if exact is not None:
+            return self.names[exact]
+        k = max_edits(norm)
+        if k == 0:
+            return None
+        # Count filter: k edits destroy at most 3k of the query's trigrams, so a
+        # match shares one of its 3k + 1 rarest ones; sizes differ by <= k.
+        q = trigrams(norm)
+        size = size_of(norm)
+        rare_first = sorted(q, key=lambda g: self.df.get(g, 0))
+        candidates = set()
+        for g in rare_first[:3 * k + 1]:
+            by_size = self.postings.get(g)
+            if by_size:
+                for s in range(size - k, size + k + 1):
+                    candidates.update(by_size.get(s, ()))
+        words, key_words = norm.split(), key.split()
+        best, best_d = None, k + 1
+        for fid in candidates:
+            name = self.names[fid]
+            # word by word, in the typed order or in name_key order (reordered + typo)
+            found = [d for d in (word_typos(words, name.split(), self.words),
+                                 word_typos(key_words, name_key(name).split(), self.words))
+                     if d is not None]
+            if not found:
+                continue
+            d = min(found)
+            if d < best_d or (d == best_d and best is not None and name < self.names[best]):
+                best, best_d = fid, d
+        return self.names[best] if best is not None else None
+
+    def suggest(self, query, threshold=MATCH_THRESHOLD):
+        """Closest known name by trigram similarity, for the user to confirm (or None)."""
+        norm = normalize_name(query)
+        if not norm:
+            return None
+        q = trigrams(norm)
+        # Prefix filter: Dice >= t needs at least ceil(t*|q|/2) shared trigrams,
+        # so any match must contain one of the |q| - need + 1 rarest ones.
+        need = math.ceil(threshold * len(q) / 2)
+        rare_first = sorted(q, key=lambda g: self.df.get(g, 0))
+        candidates = set()
+        for g in rare_first[:len(q) - need + 1]:
+            for ids in self.postings.get(g, {}).values():
+                candidates.update(ids)
+        best, best_score = None, 0.0
+        for fid in candidates:
+            grams = self.grams[fid]
+            score = 2 * len(q & grams) / (len(q) + len(grams))
+            if score > best_score:
+                best, best_score = fid, score
+        if best is None or best_score < threshold or self.names[best] == norm:
+            return None
+        return self.names[best]
+
+    def canonical(self, name):
+        """Name to store: the same known food if there is one, else a new name."""
+        return self.resolve(name) or self.add(name)
+
+    def complete(self, prefix, limit=8):
+        """Known names with a word (or the whole name) starting with prefix."""
+        prefix = normalize_name(prefix)
+        out = []
+        i = bisect_left(self.prefixes, (prefix, -1))
+        while i < len(self.prefixes) and len(out) < limit:
+            entry, fid = self.prefixes[i]
+            if not entry.startswith(prefix):
+                break
+            name = self.names[fid]
+            if name not in out:
+                out.append(name)
+            i += 1
+        return out
+
+    def readline_completer(self):
+        """A completer function for the readline module."""
+        matches = []
+
+        def complete(text, state):
+            if state == 0:
+                matches[:] = self.complete(text)
+            return matches[state] if state < len(matches) else None
+        return complete
+
+
+def choose_name(index, query, ask=input):
+    """Name to look up for typed input: near-exact matches apply, weaker ones need a 'y'."""
+    known = index.resolve(query)
+    if known:
+        if known != normalize_name(query):
+            print(f"🔤 Using '{known}' for '{query}'")
+        return known
+    guess = index.suggest(query)
+    if guess and ask(f"🤔 Did you mean '{guess}'? (y/n): ").strip().lower() in ("y", "yes"):
+        return guess
+    return query
+
+
+def normalize_food_log(conn, index):
+    """Rewrite stored food names to their canonical form; return rows changed."""
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT food FROM food_log WHERE food IS NOT NULL")
+    changed = 0
+    for (food,) in cur.fetchall():
+        canon = index.canonical(food)
+        if canon != food:
+            cur.execute("UPDATE food_log SET food = ? WHERE food = ?", (canon, food))
+            changed += cur.rowcount
+    conn.commit()
+    return changed
+
+
+def check_matches():
+    """Typos and reorderings resolve; different foods are only suggested, never merged."""
+    idx = FoodNameIndex(["milk", "white rice", "brown rice", "chicken thigh", "apple",
+                         "banana bread", "broccoli", "greek yogurt", "sweet potato", "quinoa",
+                         "rolled oats", "pear"])
+    same = {"brocoli": "broccoli", "Oats, rolled": "rolled oats", "greek yoghurt": "greek yogurt",
+            "sweet potatoe": "sweet potato", "quinao": "quinoa", "Brown  Rice!": "brown rice",
+            "yogurt greek": "greek yogurt"}
+    idx.add("coconut oil")
+    idx.add("almond oil")
+    idx.add("white bread")
+    different = ["coconut milk", "soy milk", "rice milk", "wild rice", "rice", "chicken wings",
+                 "apple pie", "bread", "peas", "almond milk", "whole bread"]
+    for query, expected in same.items():
+        assert idx.resolve(query) == expected, (query, idx.resolve(query))
+    for query in different:
+        assert idx.resolve(query) is None, (query, idx.resolve(query))
+        assert idx.canonical(query) == normalize_name(query)     # stored as a new food
+    assert idx.suggest("banana bred") == "banana bread"
+    return True
+
+
+def benchmark(n_queries=2000):
+    """Resolve / autocomplete latency as the number of known names grows."""
+    import random
+    rng = random.Random(8)
+    base = ["broccoli", "oats", "rolled oats", "brown rice", "white rice", "lentils",
+            "chickpeas", "greek yogurt", "almonds", "salmon", "chicken breast",
+            "sweet potato", "quinoa", "spinach", "avocado", "blueberries"]
+    queries = ["brocoli", "Oats, rolled", "greek yoghurt", "sweet potatoe", "quinao", "soy milk"]
+    for n_names in (500, 5000, 20000):
+        # worst case for trigrams: every extra name repeats a base food word
+        names = base + [f"{rng.choice(base)} {rng.choice(['raw', 'cooked', 'baked', 'organic'])} {i}"
+                        for i in range(n_names)]
+        idx = FoodNameIndex(names)
+        start = time.perf_counter()
+        for i in range(n_queries):
+            idx.resolve(queries[i % len(queries)])
+        per_resolve = (time.perf_counter() - start) / n_queries
+        start = time.perf_counter()
+        for i in range(n_queries):
+            idx.complete("bro")
+        per_complete = (time.perf_counter() - start) / n_queries
+        start = time.perf_counter()
+        for i in range(n_queries):
+            idx.suggest(queries[i % len(queries)])
+        per_suggest = (time.perf_counter() - start) / n_queries
+        print(f"{len(idx.names):,} names: resolve {per_resolve * 1e3:.3f} ms, "
+              f"suggest {per_suggest * 1e3:.3f} ms, complete {per_complete * 1e3:.3f} ms")
+    for q in queries:
+        print(f"  {q!r} → {idx.resolve(q)!r} (suggest {idx.suggest(q)!r})")
+    check_matches()
+    print("✅ typos resolve; different foods (soy milk / milk, wild / white rice, ...) are not merged")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,506 @@
+"""
+Resilient Nutrition Client — Chapter 15 add-on
+----------------------------------------------
+fetch_food_data() used to call urlopen() with no timeout, so one slow Edamam
+response froze the whole input() loop. This client wraps the lookup with:
+
+• a per-call deadline (the whole lookup, including any hedge, must finish in it)
+• a hedged second request, sent when the first is slower than the observed p95
+• a circuit breaker that fails fast to cached answers while upstream is degraded
+• latency histograms that can be exported as JSON
+
+A 4xx answer or an unreadable body is a RequestError: it is returned to
+the caller but says nothing about upstream health, so it never trips the
+breaker. StubServer is a local stand-in for the API that injects delays and
+errors; `python nutrition_client.py --bench` checks the client against it.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from nutrition_projection import project_food
+
+DEADLINE_S = 4.0           # total budget for one lookup
+HEDGE_MIN_SAMPLES = 20     # use the default hedge delay until p95 is meaningful
+HEDGE_DEFAULT_S = 1.0
+FAILURE_THRESHOLD = 5      # consecutive failures that open the breaker
+RESET_AFTER_S = 30.0       # how long the breaker stays open before a probe
+CACHE_FILE = "nutrition_cache.json"
+
+# bucket upper bounds in ms (roughly x1.5 per step), last bucket is +inf
+BUCKETS_MS = [5, 10, 15, 25, 40, 60, 100, 150, 250, 400, 600, 1000, 1500,
+              2500, 4000, 6000, 10000, float("inf")]
+
+
+class UpstreamError(Exception):
+    """The API answered badly (5xx / 429) or not at all."""
+
+
+class RequestError(Exception):
+    """Our request or its answer was unusable (4xx, bad JSON); upstream is fine."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status          # HTTP status (401 = bad API key, 404 = no such food) or None
+
+
+# --- Latency histogram ---
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (ms) with approximate percentiles."""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = list(bounds)
+        self.counts = [0] * len(self.bounds)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self.lock:
+            self.counts[bisect_left(self.bounds, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+
+    def percentile(self, p):
+        """Upper bound (ms) of the bucket holding the p-th percentile."""
+        with self.lock:
+            if not self.total:
+                return None
+            rank = p / 100 * self.total
+            seen = 0
+            for bound, count in zip(self.bounds, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return self.bounds[-1]
+
+    def to_dict(self):
+        with self.lock:
+            buckets = {("+Inf" if b == float("inf") else str(b)): c
+                       for b, c in zip(self.bounds, self.counts) if c}
+            return {"count": self.total, "sum_ms": round(self.sum_ms, 1), "buckets_ms": buckets}
+
+
+# --- Circuit breaker ---
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open probe after a pause."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_after=RESET_AFTER_S, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """May a request go upstream now? (one probe at a time when half-open)"""
+        with self.lock:
+            state = self.state
+            if state == "half-open":
+                self.opened_at = self.clock()       # re-arm: only this caller probes
+                return True
+            return state == "closed"
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+# --- Client ---
+
+class NutritionClient:
+    """Edamam food-database lookups with deadline, hedging, breaker and cache."""
+
+    def __init__(self, base_url, app_id, app_key, deadline=DEADLINE_S, hedge=True,
+                 cache_path=CACHE_FILE, breaker=None, project=True):
+        self.base_url = base_url
+        self.app_id = app_id
+        self.app_key = app_key
+        self.deadline = deadline
+        self.hedge = hedge
+        self.project = project                     # parse only parsed[0].food (see nutrition_projection)
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyHistogram()          # individual upstream requests
+        self.lookup_latency = LatencyHistogram()   # what the caller waited
+        self.counters = {"live": 0, "hedged": 0, "hedge_wins": 0, "cache": 0,
+                         "failed": 0, "rejected": 0, "breaker_rejects": 0}
+        self.counter_lock = threading.Lock()
+        self.cache_path = cache_path
+        self.cache = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as fh:
+                self.cache = json.load(fh)
+        self.pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="nutrition")
+        self.last_source = None
+        self.last_error = None
+
+    def url_for(self, food):
+        params = {"app_id": self.app_id, "app_key": self.app_key,
+                  "ingr": food, "nutrition-type": "logging"}
+        return self.base_url + "?" + urllib.parse.urlencode(params)
+
+    def hedge_delay(self):
+        if self.latency.total < HEDGE_MIN_SAMPLES:
+            return min(HEDGE_DEFAULT_S, self.deadline / 2)
+        return min(self.latency.percentile(95) / 1000, self.deadline / 2)
+
+    def _request(self, url, timeout):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                if self.project:
+                    return project_food(response)
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code >= 500 or e.code == 429:
+                raise UpstreamError(f"HTTP {e.code}") from e
+            raise RequestError(f"HTTP {e.code}", e.code) from e    # 4xx: our fault, not upstream's
+        except ValueError as e:                            # JSONDecodeError / projection
+            raise RequestError(f"unreadable response: {e}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise UpstreamError(str(getattr(e, "reason", e))) from e
+        finally:
+            self.latency.record(time.perf_counter() - start)
+
+    def _race(self, url):
+        """Primary request plus at most one hedge; first good answer wins.
+
+        A RequestError ends the race at once: the hedge would get the same answer.
+        """
+        end = time.monotonic() + self.deadline
+        primary = self.pool.submit(self._request, url, self.deadline)
+        pending = {primary}
+        hedged = False
+        error = None
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = remaining if hedged or not self.hedge else min(remaining, self.hedge_delay())
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result = fut.result()
+                except UpstreamError as e:
+                    error = e
+                    continue
+                if fut is not primary:
+                    self._count("hedge_wins")
+                return result, hedged
+            if self.hedge and not hedged and end - time.monotonic() > 0:
+                # primary is slow (or already failed): send one more
+                pending.add(self.pool.submit(self._request, url, max(end - time.monotonic(), 0.01)))
+                hedged = True
+        raise error or UpstreamError(f"no answer within {self.deadline:.1f}s")
+
+    def fetch(self, food):
+        """
+        (json, source, error) for `food`; safe to call from several threads.
+        source is "live", "hedged", "cache" or None (failed, json is None).
+        A RequestError comes back as (None, None, error) and leaves the breaker alone.
+        """
+        start = time.perf_counter()
+        key = food.strip().lower()
+        try:
+            if not self.breaker.allow():
+                self._count("breaker_rejects")
+                raise UpstreamError("circuit open (upstream degraded)")
+            try:
+                js, hedged = self._race(self.url_for(food))
+            except UpstreamError:
+                self.breaker.failure()
+                raise
+            except RequestError as e:
+                self.breaker.success()             # upstream answered; the request was bad
+                self._count("rejected")
+                return None, None, e
+            self.breaker.success()
+            source = "hedged" if hedged else "live"
+            self._count(source)
+            self.cache[key] = js
+            return js, source, None
+        except UpstreamError as e:
+            if key in self.cache:
+                self._count("cache")
+                return self.cache[key], "cache", e
+            self._count("failed")
+            return None, None, e
+        finally:
+            self.lookup_latency.record(time.perf_counter() - start)
+
+    def lookup(self, food):
+        """Raw API JSON for `food`, live if possible, else cached; None on failure."""
+        js, self.last_source, self.last_error = self.fetch(food)
+        return js
+
+    def _count(self, name):
+        with self.counter_lock:
+            self.counters[name] += 1
+
+    # --- persistence & metrics ---
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.cache, fh)
+        os.replace(tmp, self.cache_path)
+
+    def metrics(self):
+        with self.counter_lock:
+            counters = dict(self.counters)
+        return {
+            "breaker": self.breaker.state,
+            "counters": counters,
+            "request_latency": self.latency.to_dict(),
+            "lookup_latency": self.lookup_latency.to_dict(),
+            "lookup_p50_ms": self.lookup_latency.percentile(50),
+            "lookup_p95_ms": self.lookup_latency.percentile(95),
+            "lookup_p99_ms": self.lookup_latency.percentile(99),
+        }
+
+    def export_metrics(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.metrics(), fh, indent=2)
+
+    def close(self):
+        self.save_cache()
+        self.pool.shutdown(wait=False)
+
+
+def extract_food(js):
+    """The food dict the trackers use, from an API response (None if no match)."""
+    if not js or not js.get("parsed"):
+        return None
+    item = js["parsed"][0]["food"]
+    n = item["nutrients"]
+    return {
+        "name": item["label"],
+        "calories": n.get("ENERC_KCAL", 0),
+        "carbs": n.get("CHOCDF", 0),
+        "fiber": n.get("FIBTG", 0),
+        "fat": n.get("FAT", 0),
+        "protein": n.get("PROCNT", 0)
+    }
+
+
+# --- Local stub server (delay / error injection) ---
+
+class StubServer:
+    """
+    A tiny stand-in for the Edamam parser endpoint on 127.0.0.1.
+    `slow_rate` of requests sleep `slow_s`, `error_rate` answer HTTP 503,
+    everything else answers after `base_s` with a canned food (or no match for
+    names in `not_found`). Names in `bad_request` get HTTP 400 and names in
+    `garbled` a body that is not JSON. `script` is a list of "slow" / "error"
+    / "ok" actions used, in order, before falling back to the random rolls.
+    Setting `reject_status` (e.g. 401, a bad API key) answers every request with it.
+    """
+
+    def __init__(self, base_s=0.01, slow_rate=0.0, slow_s=2.0, error_rate=0.0, seed=5, not_found=(),
+                 bad_request=(), garbled=()):
+        import random
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.base_s, self.slow_rate, self.slow_s, self.error_rate = base_s, slow_rate, slow_s, error_rate
+        self.not_found = set(not_found)
+        self.bad_request = set(bad_request)
+        self.garbled = set(garbled)
+        self.script = []
+        self.reject_status = None
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                food = query.get("ingr", ["food"])[0]
+                with stub.rng_lock:
+                    stub.requests += 1
+                    roll = stub.rng.random()
+                    action = stub.script.pop(0) if stub.script else None
+                if action is None:
+                    action = ("error" if roll < stub.error_rate else
+                              "slow" if roll < stub.error_rate + stub.slow_rate else "ok")
+                if action == "error":
+                    self.send_error(503, "injected failure")
+                    return
+                if stub.reject_status:
+                    self.send_error(stub.reject_status, "rejected")
+                    return
+                if food in stub.bad_request:
+                    self.send_error(400, "bad request")
+                    return
+                time.sleep(stub.slow_s if action == "slow" else stub.base_s)
+                parsed = [] if food in stub.not_found else [{"food": {
+                    "label": food.title(),
+                    "nutrients": {"ENERC_KCAL": 100.0, "CHOCDF": 20.0, "FIBTG": 4.0,
+                                  "FAT": 1.5, "PROCNT": 3.0}}}]
+                body = json.dumps({"text": food, "parsed": parsed, "hints": []}).encode()
+                if food in stub.garbled:
+                    body = b"<html>upstream proxy error</html>"
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass                       # client already gave up on us
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/food-database/v2/parser"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Checks / benchmark ---
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(client, n):
+    ok = 0
+    for i in range(n):
+        ok += client.lookup(f"food {i % 25}") is not None
+    return ok
+
+
+def check_client():
+    """Hedge win, breaker open / half-open / closed, cache fallback, 4xx and bad JSON."""
+    with StubServer(slow_s=2.0, bad_request={"bad"}, garbled={"garbled"}) as stub:
+        # a stalled primary loses to the hedge sent after the hedge delay
+        client = NutritionClient(stub.url, "id", "key", deadline=3.0, cache_path=None)
+        stub.script = ["slow"]
+        start = time.perf_counter()
+        js, source, error = client.fetch("oats")
+        elapsed = time.perf_counter() - start
+        assert source == "hedged" and error is None and extract_food(js)["name"] == "Oats", (source, error)
+        assert client.counters["hedge_wins"] == 1 and elapsed < stub.slow_s, (client.counters, elapsed)
+        client.close()
+
+        # 4xx and unreadable bodies are returned, not raised, and never open the breaker
+        clock = _FakeClock()
+        client = NutritionClient(stub.url, "id", "key", deadline=1.0, cache_path=None,
+                                 breaker=CircuitBreaker(clock=clock))
+        for _ in range(FAILURE_THRESHOLD * 2):
+            for food in ("bad", "garbled"):
+                js, source, error = client.fetch(food)
+                assert js is None and source is None and isinstance(error, RequestError), (food, error)
+        assert client.breaker.state == "closed" and client.breaker.failures == 0
+
+        # outage: failures open the breaker, cached foods are still served, nothing goes upstream
+        assert client.fetch("lentils")[1] == "live"
+        stub.error_rate = 1.0
+        for _ in range(FAILURE_THRESHOLD):
+            assert client.fetch("quinoa")[1] is None
+        assert client.breaker.state == "open"
+        before = stub.requests
+        js, source, error = client.fetch("lentils")
+        assert source == "cache" and extract_food(js)["name"] == "Lentils" and isinstance(error, UpstreamError)
+        assert client.fetch("quinoa")[0] is None
+        assert stub.requests == before and client.counters["breaker_rejects"] == 2
+
+        # after reset_after one probe goes through; a good answer closes the breaker
+        clock.now += RESET_AFTER_S
+        assert client.breaker.state == "half-open"
+        stub.error_rate = 0.0
+        assert client.fetch("quinoa")[1] == "live" and client.breaker.state == "closed"
+
+        # a failed probe re-opens it for another reset_after
+        stub.error_rate = 1.0
+        for _ in range(FAILURE_THRESHOLD):
+            client.fetch("quinoa")
+        clock.now += RESET_AFTER_S
+        before = stub.requests
+        assert client.fetch("quinoa")[1] == "cache" and client.breaker.state == "open"
+        assert stub.requests > before
+        client.close()
+    return True
+
+
+def benchmark(n=200):
+    """Tail latency with and without hedging, then the behaviour checks."""
+    print(f"{n} lookups per run; stub answers in 10 ms, 3% of calls stall for 2 s")
+    for hedge in (False, True):
+        with StubServer(slow_rate=0.03) as stub:
+            client = NutritionClient(stub.url, "id", "key", deadline=3.0, hedge=hedge, cache_path=None)
+            start = time.perf_counter()
+            ok = _run(client, n)
+            elapsed = time.perf_counter() - start
+            m = client.metrics()
+            print(f"  hedging {'on ' if hedge else 'off'}: {ok}/{n} ok in {elapsed:.1f}s | "
+                  f"p50 {m['lookup_p50_ms']} ms, p95 {m['lookup_p95_ms']} ms, p99 {m['lookup_p99_ms']} ms | "
+                  f"{stub.requests} upstream requests, hedge wins {m['counters']['hedge_wins']}")
+            client.close()
+
+    check_client()
+    print("✅ hedge win, breaker open/half-open/closed, cache fallback, 4xx / bad JSON kept off the breaker")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+
+    print("Resilient Nutrition Client — Chapter 15 (local stub demo)\n")
+    check_client()
+    print("✅ client checks passed (hedge, breaker, cache fallback, 4xx / bad JSON)\n")
+    with StubServer(slow_rate=0.1, error_rate=0.05) as stub:
+        client = NutritionClient(stub.url, "id", "key", deadline=2.5, cache_path=None)
+        for food in ["oats", "lentils", "broccoli", "salmon", "quinoa"] * 6:
+            food_data = extract_food(client.lookup(food))
+            print(f"  {food:<9} via {client.last_source or 'failed':<6} → {food_data}")
+        print("\nMetrics:", json.dumps(client.metrics(), indent=2))
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
@@ -0,0 +1,274 @@
+"""
+Nutrition Response Projection — Chapter 15 add-on
+-------------------------------------------------
+An Edamam parser response is mostly the `hints` array (dozens of foods with
+their measures), but the trackers only use parsed[0].food.label and a few
+nutrients. project_food() scans the raw bytes as they arrive, skips every
+value it does not need without building it, and stops reading as soon as
+parsed[0].food is complete — `hints` is usually never even downloaded.
+
+The result has the same shape as the full response (minus everything
+else), so extract_food() and show_nutrition() work on it unchanged.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+CHUNK = 16384
+
+_ws = re.compile(rb"[ \t\r\n]*")
+# Jump to the next bracket, stepping over complete strings; a lone '"' means
+# a string runs past the end of the buffer.
+_token = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}"])')
+_string_end = re.compile(rb'["\\]')
+_scalar = re.compile(rb"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+
+
+class _Scanner:
+    """Forward-only cursor over a byte stream, refilled in chunks on demand."""
+
+    def __init__(self, source, chunk=CHUNK):
+        if isinstance(source, (bytes, bytearray)):
+            self.buf, self.read = bytes(source), None
+        else:
+            self.buf, self.read = b"", source.read
+        self.pos = 0
+        self.chunk = chunk
+        self.bytes_read = len(self.buf)
+
+    def _more(self):
+        """Append the next chunk, dropping bytes before pos; False at EOF."""
+        if self.read is None:
+            return False
+        data = self.read(self.chunk)
+        if not data:
+            self.read = None
+            return False
+        self.bytes_read += len(data)
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _ws.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            if not self._more():
+                raise ValueError("unexpected end of JSON")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at byte {self.pos}")
+        self.pos += 1
+
+    # Scanning positions are kept as offsets from pos, because _more() moves
+    # the buffer. With keep=False (skipping) pos follows the scan, so the
+    # buffer never holds more than about one chunk of a skipped value.
+
+    def _refill(self, at, keep):
+        """Refill with the scan at absolute index `at`; return its new offset from pos."""
+        if keep:
+            rel = at - self.pos
+        else:
+            self.pos, rel = at, 0
+        if not self._more():
+            raise ValueError("unexpected end of JSON")
+        return rel
+
+    def _string_end(self, rel, keep):
+        """Offset (from pos) just past the string whose opening quote is at offset rel."""
+        rel += 1
+        while True:
+            m = _string_end.search(self.buf, self.pos + rel)
+            if m is None:
+                rel = self._refill(len(self.buf), keep)
+            elif m.group() == b'"':
+                return m.end() - self.pos
+            elif m.end() >= len(self.buf):          # backslash is the last byte
+                rel = self._refill(m.start(), keep)
+            else:
+                rel = m.end() + 1 - self.pos        # skip the escaped character
+
+    def _value_end(self, keep):
+        """Offset (from pos) just past the value starting at pos."""
+        first = self.peek()
+        if first == b'"':
+            return self._string_end(0, keep)
+        if first not in (b"[", b"{"):
+            while True:
+                m = _scalar.match(self.buf, self.pos)
+                if m is None:
+                    raise ValueError(f"bad JSON value at byte {self.pos}")
+                if m.end() < len(self.buf) or not self._more():
+                    return m.end() - self.pos
+        depth, rel = 0, 0
+        while True:
+            for m in _token.finditer(self.buf, self.pos + rel):
+                c = m.group(1)
+                if c == b'"':
+                    rel = self._refill(m.start(1), keep)
+                    break
+                depth += 1 if c in b"[{" else -1
+                if depth == 0:
+                    return m.end() - self.pos
+            else:
+                rel = self._refill(len(self.buf), keep)
+
+    def skip(self):
+        """Skip one value without building it."""
+        end = self._value_end(keep=False)
+        self.pos += end
+
+    def value(self):
+        """Read one (small) value fully."""
+        end = self._value_end(keep=True)
+        raw = self.buf[self.pos:self.pos + end]
+        self.pos += end
+        return json.loads(raw)
+
+    def members(self):
+        """Iterate the keys of the object at the cursor; caller consumes each value."""
+        self.expect(b"{")
+        if self.peek() == b"}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(b":")
+            yield key
+            c = self.peek()
+            self.pos += 1
+            if c == b"}":
+                return
+            if c != b",":
+                raise ValueError(f"expected ',' or '}}' at byte {self.pos - 1}")
+
+
+def _first_food(sc):
+    """Inside parsed[]: project element 0's food to {label, nutrients}."""
+    sc.expect(b"[")
+    if sc.peek() == b"]":
+        return None
+    food = {}
+    for key in sc.members():                 # parsed[0]
+        if key != "food":
+            sc.skip()
+            continue
+        for fkey in sc.members():
+            if fkey in ("label", "nutrients"):
+                food[fkey] = sc.value()
+            else:
+                sc.skip()
+        break                                # nothing else in parsed[0] matters
+    return food
+
+
+def project_food(source, chunk=CHUNK):
+    """
+    Extract {"parsed": [{"food": {"label", "nutrients"}}]} from a JSON body
+    given as bytes or a binary file-like object (e.g. an HTTP response).
+    Returns {"parsed": []} when there is no parsed match.
+    """
+    sc = _Scanner(source, chunk)
+    for key in sc.members():
+        if key == "parsed":
+            food = _first_food(sc)
+            return {"parsed": [{"food": food}] if food else []}
+        sc.skip()
+    return {"parsed": []}
+
+
+# --- Benchmark ---
+
+def synthetic_response(n_hints=400, seed=3):
+    """An Edamam-shaped response with a large hints array."""
+    import random
+    rng = random.Random(seed)
+
+    def food(i):
+        return {"foodId": f"food_{i:08x}", "label": f"Food \"{i}\" — rolled oats",
+                "knownAs": "oats", "category": "Generic foods", "categoryLabel": "food",
+                "image": f"https://example.invalid/{i}.jpg",
+                "nutrients": {"ENERC_KCAL": round(rng.uniform(20, 400), 1),
+                              "PROCNT": round(rng.uniform(0, 30), 2), "FAT": round(rng.uniform(0, 20), 2),
+                              "CHOCDF": round(rng.uniform(0, 80), 2), "FIBTG": round(rng.uniform(0, 12), 2)}}
+
+    return {
+        "text": "rolled oats",
+        "parsed": [{"food": food(0)}],
+        "hints": [{"food": food(i), "measures": [
+            {"uri": f"https://example.invalid/measure_{m}", "label": m, "weight": rng.uniform(1, 300),
+             "qualified": [{"qualifiers": [{"uri": "q", "label": "large"}], "weight": 50.0}]}
+            for m in ("Serving", "Cup", "Gram", "Ounce", "Pound", "Kilogram", "Tablespoon")]}
+            for i in range(1, n_hints + 1)],
+        "_links": {"next": {"title": "Next page", "href": "https://example.invalid/next"}},
+    }
+
+
+def check_equivalence():
+    """project_food() must agree with json.loads() on every shape we care about."""
+    import io
+    full = synthetic_response(30)
+    variants = [full,
+                {"hints": full["hints"][:5], "text": "x", "parsed": full["parsed"]},
+                {"text": "nothing", "parsed": [], "hints": []},
+                {"text": "no parsed key"},
+                {"parsed": [{"measure": {"a": [1, {"b": "}]"}]}, "food": {"label": "a\\\"bé",
+                                                                          "nutrients": {}}}]}]
+    for js in variants:
+        body = json.dumps(js).encode()
+        expected = [{"food": {k: js["parsed"][0]["food"][k] for k in ("label", "nutrients")}}] \
+            if js.get("parsed") else []
+        for chunk in (1, 7, 64, CHUNK):
+            got = project_food(io.BytesIO(body), chunk=chunk)
+            assert got == {"parsed": expected}, (js.get("text"), chunk, got)
+    return True
+
+
+def benchmark(n_hints=400, repeat=200):
+    import io
+    import tracemalloc
+    full_js = synthetic_response(n_hints)
+    hints_first = {"hints": full_js["hints"], "text": full_js["text"], "parsed": full_js["parsed"]}
+    for label, js in (("parsed before hints", full_js), ("hints before parsed", hints_first)):
+        body = json.dumps(js).encode()
+        print(f"Response ({label}): {len(body) / 1024:.0f} KB, {n_hints} hints; {repeat} parses each")
+
+        def full():
+            return json.loads(io.BytesIO(body).read().decode())
+
+        def projected():
+            return project_food(io.BytesIO(body))
+
+        for name, fn in (("json.loads (full)", full), ("project_food", projected)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            per_call = (time.perf_counter() - start) / repeat
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {name:<18} {per_call * 1000:7.3f} ms/response, peak alloc {peak / 1024:8.1f} KB")
+        stream = io.BytesIO(body)
+        project_food(stream)
+        print(f"  project_food read {stream.tell() / 1024:.0f} KB of {len(body) / 1024:.0f} KB")
+
+
+def main():
+    if "--bench" in sys.argv:
+        benchmark()
+        return
+    check_equivalence()
+    print("✅ project_food matches json.loads on all test responses")
+    benchmark()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
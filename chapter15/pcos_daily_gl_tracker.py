@@ -16,18 +16,20 @@ Features:
 """
 
 import sqlite3
-import urllib.request, urllib.parse, json
 from datetime import datetime, date
 
+from food_name_index import FoodNameIndex, choose_name, normalize_food_log
+from nutrition_client import NutritionClient, extract_food
+
 # --- API CONFIG ---
 APP_ID = "4fb0f986"
 APP_KEY = "665a4a71517cd9b7e08704a6d4542b4f"
 BASE_URL = "https://api.edamam.com/api/food-database/v2/parser"
 
 # --- DATABASE SETUP ---
-def create_table():
+def create_table(db_path='food_log.sqlite'):
     """Create SQLite database and table."""
-    conn = sqlite3.connect('food_log.sqlite')
+    conn = sqlite3.connect(db_path)
     cur = conn.cursor()
     cur.execute('''
     CREATE TABLE IF NOT EXISTS food_log (
@@ -48,37 +50,35 @@ def create_table():
     return conn, cur
 
 # --- API FETCH ---
+client = None   # created by get_client() in main(): importing this module opens no pool or cache
+
+
+def get_client():
+    """The shared NutritionClient, created on first use."""
+    global client
+    if client is None:
+        client = NutritionClient(BASE_URL, APP_ID, APP_KEY)
+    return client
+
 def fetch_food_data(food_name):
     """Fetch nutrition data for a given food using Edamam API."""
-    params = {
-        "app_id": APP_ID,
-        "app_key": APP_KEY,
-        "ingr": food_name,
-        "nutrition-type": "logging"
-    }
-    url = BASE_URL + "?" + urllib.parse.urlencode(params)
     print(f"\n🔎 Fetching data for '{food_name}'...")
 
+    client = get_client()
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read().decode()
-            js = json.loads(data)
-            if "parsed" not in js or not js["parsed"]:
-                print("⚠️ Food not found. Try another name.")
-                return None
-            item = js["parsed"][0]["food"]
-            n = item["nutrients"]
-            return {
-                "name": item["label"],
-                "calories": n.get("ENERC_KCAL", 0),
-                "carbs": n.get("CHOCDF", 0),
-                "fiber": n.get("FIBTG", 0),
-                "fat": n.get("FAT", 0),
-                "protein": n.get("PROCNT", 0)
-            }
+        js = client.lookup(food_name)
     except Exception as e:
         print("❌ Error fetching data:", e)
         return None
+    if js is None:
+        print("❌ Error fetching data:", client.last_error)
+        return None
+    if client.last_source == "cache":
+        print(f"📦 Using cached data ({client.last_error})")
+    food = extract_food(js)
+    if food is None:
+        print("⚠️ Food not found. Try another name.")
+    return food
 
 # --- METABOLIC CALCULATIONS ---
 def estimate_gi(n):
@@ -121,13 +121,30 @@ def show_today_summary(cur):
 
 def show_best_foods(cur):
     print("\n🌿 --- Top 5 Lowest GL Foods ---")
-    cur.execute('SELECT food, gl FROM food_log ORDER BY gl ASC LIMIT 5')
+    cur.execute('SELECT food, ROUND(AVG(gl),1) AS avg_gl FROM food_log '
+                'GROUP BY food ORDER BY avg_gl ASC LIMIT 5')
     for row in cur.fetchall():
         print(f"  • {row[0]} — GL {row[1]}")
 
+def setup_food_names(conn, cur):
+    """Index known food names, canonicalize old entries, enable Tab completion."""
+    names = FoodNameIndex.from_db(cur, get_client().cache)
+    fixed = normalize_food_log(conn, names)
+    if fixed:
+        print(f"🔤 Merged {fixed} entries under canonical food names")
+    try:
+        import readline
+        readline.set_completer_delims("")
+        readline.set_completer(names.readline_completer())
+        readline.parse_and_bind("tab: complete")
+    except ImportError:  # e.g. Windows without pyreadline
+        pass
+    return names
+
 # --- MAIN PROGRAM ---
 def main():
     conn, cur = create_table()
+    names = setup_food_names(conn, cur)
 
     print("\n🥗 Welcome to the PCOS Food Tracker 2.0!")
     print("Type any food name to log it, or 'quit' to stop.\n")
@@ -137,9 +154,11 @@ def main():
         if food.lower() == "quit":
             break
 
-        data = fetch_food_data(food)
+        # Resolve typos / word order locally before calling the API
+        data = fetch_food_data(choose_name(names, food))
         if not data:
             continue
+        data["name"] = names.canonical(data["name"])
 
         # Compute metrics
         data["gi"] = estimate_gi(data)
@@ -158,8 +177,14 @@ def main():
     show_today_summary(cur)
     show_best_foods(cur)
 
+    get_client().close()
     conn.close()
     print("\n🌸 All data saved in 'food_log.sqlite'. Goodbye, Basrah! 🩷")
 
 if __name__ == "__main__":
-    main()
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from pcos_profiler import run_main
+    run_main(main)
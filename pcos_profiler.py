@@ -0,0 +1,137 @@
+"""
+Opt-in profiling for the chapter CLIs
+-------------------------------------
+Every chapter script ends with:
+
+    run_main(main)
+
+Normally that just calls main(). Passing `--profile` (or `--profile=PREFIX`)
+on the command line, or setting the PCOS_PROFILE environment variable
+(to "1" or to an output prefix), runs main() under:
+
+- cProfile                 -> PREFIX.prof          (load with pstats / snakeviz)
+- tracemalloc top allocs   -> PREFIX.alloc.txt
+- a stack sampler          -> PREFIX.folded        (collapsed stacks for
+                                                    flamegraph.pl / speedscope)
+
+The default PREFIX is "<script name>_profile" in the current folder.
+When profiling is off nothing is imported or hooked, so there is no overhead.
+"""
+
+import os
+import sys
+
+PROFILE_ENV = "PCOS_PROFILE"
+PROFILE_FLAG = "--profile"
+
+
+def _profile_prefix(argv, environ):
+    """Return the output prefix if profiling was requested, else None.
+
+    Strips the --profile flag from argv so main() never sees it.
+    """
+    script = os.path.splitext(os.path.basename(argv[0] if argv else "main"))[0]
+    default = f"{script}_profile"
+    for i, arg in enumerate(argv[1:], start=1):
+        if arg == PROFILE_FLAG:
+            del argv[i]
+            return default
+        if arg.startswith(PROFILE_FLAG + "="):
+            del argv[i]
+            return arg.split("=", 1)[1] or default
+    value = environ.get(PROFILE_ENV, "").strip()
+    if not value or value.lower() in ("0", "false", "no", "off"):
+        return None
+    if value.lower() in ("1", "true", "yes", "on"):
+        return default
+    return value
+
+
+# --- Stack sampler (collapsed-stack output) ---
+
+class StackSampler:
+    """Sample the main thread's stack every `interval` seconds.
+
+    Counts are kept as {"file:func;file:func;...": samples}, which is the
+    "folded" format that flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = {}
+        self._stop = None
+        self._thread = None
+
+    def start(self):
+        import threading
+        self._target = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, n in sorted(self.counts.items()):
+                fh.write(f"{stack} {n}\n")
+
+
+# --- Runner ---
+
+def profile_call(func, prefix, top_allocs=25):
+    """Run func() under cProfile + tracemalloc + the stack sampler."""
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    tracemalloc.start(10)
+    sampler.start()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        profiler.dump_stats(prefix + ".prof")
+        sampler.write(prefix + ".folded")
+        with open(prefix + ".alloc.txt", "w", encoding="utf-8") as fh:
+            fh.write(f"Top {top_allocs} allocation sites (tracemalloc)\n")
+            for stat in snapshot.statistics("lineno")[:top_allocs]:
+                fh.write(f"{stat}\n")
+            fh.write("\nTop functions by cumulative time (cProfile)\n")
+            pstats.Stats(profiler, stream=fh).sort_stats("cumulative").print_stats(25)
+        print(f"\n📈 Profile written to {prefix}.prof, {prefix}.alloc.txt, {prefix}.folded",
+              file=sys.stderr)
+
+
+def run_main(main, argv=None, environ=None):
+    """Call main(), profiling it only when --profile / PCOS_PROFILE is set."""
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    prefix = _profile_prefix(argv, environ)
+    if prefix is None:
+        return main()
+    return profile_call(main, prefix)